@@ -0,0 +1,49 @@
+"""Shared helpers for the benchmark scripts."""
+import json
+import os
+import random
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_DIR not in sys.path:
+    # src/ 下的模块使用平铺导入（与 python src/monitor.py 的运行方式一致）
+    sys.path.insert(0, SRC_DIR)
+
+
+def make_symbols(count):
+    """Generate ``count`` distinct fake ticker symbols."""
+    return [f"SYM{i:05d}" for i in range(count)]
+
+
+def synthetic_frames(n_frames, symbols, trades_per_frame=40, seed=7, start_ms=1_700_000_000_000):
+    """
+    Generate Finnhub-style ``trade`` frames as raw JSON strings.
+
+    Prices follow a small random walk per symbol so the output looks like a
+    busy session recording.
+    """
+    rng = random.Random(seed)
+    prices = {symbol: rng.uniform(20, 500) for symbol in symbols}
+    ts = start_ms
+    frames = []
+    for _ in range(n_frames):
+        trades = []
+        for _ in range(trades_per_frame):
+            symbol = rng.choice(symbols)
+            prices[symbol] *= 1 + rng.gauss(0, 0.0005)
+            ts += rng.randint(0, 3)
+            trades.append({
+                'p': round(prices[symbol], 4),
+                's': symbol,
+                't': ts,
+                'v': rng.randint(1, 500),
+                'c': None,
+            })
+        frames.append(json.dumps({'type': 'trade', 'data': trades}))
+    return frames
+
+
+def load_frames(path):
+    """Load recorded frames (one raw WebSocket message per line)."""
+    with open(path, 'r') as file:
+        return [line.rstrip('\n') for line in file if line.strip()]
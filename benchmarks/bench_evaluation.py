@@ -0,0 +1,89 @@
+"""
+Latency of evaluating a micro-batch of price updates: the per-tick dict
+driven checks versus the vectorized ThresholdEvaluator.
+
+Usage:
+    python benchmarks/bench_evaluation.py [--symbols 5000] [--batch 5000]
+"""
+import argparse
+import random
+import time
+
+from _common import make_symbols
+from evaluation import ThresholdEvaluator
+from tick_batch import SymbolUpdate
+
+
+def scalar_evaluate(alerts, prices, updates):
+    """旧实现：逐个tick查字典计算"""
+    breaches = 0
+    for update in updates:
+        symbol = update.symbol
+        current_price = update.price
+        if symbol in prices:
+            previous_price = prices[symbol]
+            price_change = current_price - previous_price
+            percentage_change = (price_change / previous_price) * 100
+            thresholds = alerts[symbol]
+            if (abs(price_change) >= thresholds['price_change'] or
+                    abs(percentage_change) >= thresholds['percentage_change']):
+                breaches += 1
+        prices[symbol] = current_price
+    return breaches
+
+
+def make_batches(symbols, batch_size, count, seed=11):
+    rng = random.Random(seed)
+    prices = {symbol: rng.uniform(20, 500) for symbol in symbols}
+    batches = []
+    for _ in range(count):
+        batch = []
+        for _ in range(batch_size):
+            symbol = rng.choice(symbols)
+            prices[symbol] *= 1 + rng.gauss(0, 0.002)
+            batch.append(SymbolUpdate(symbol, prices[symbol]))
+        batches.append(batch)
+    return batches
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=5000)
+    parser.add_argument('--batch', type=int, default=5000, help='updates per micro-batch')
+    parser.add_argument('--batches', type=int, default=50)
+    args = parser.parse_args()
+
+    symbols = make_symbols(args.symbols)
+    alerts = {symbol: {'price_change': 5.0, 'percentage_change': 0.5} for symbol in symbols}
+    batches = make_batches(symbols, args.batch, args.batches)
+
+    prices = {}
+    scalar_times, scalar_breaches = [], 0
+    for batch in batches:
+        started = time.perf_counter()
+        scalar_breaches += scalar_evaluate(alerts, prices, batch)
+        scalar_times.append(time.perf_counter() - started)
+
+    evaluator = ThresholdEvaluator(alerts)
+    vector_times, vector_breaches = [], 0
+    for batch in batches:
+        started = time.perf_counter()
+        evaluation = evaluator.evaluate(batch)
+        vector_breaches += int(evaluation.breach.sum())
+        vector_times.append(time.perf_counter() - started)
+
+    assert scalar_breaches == vector_breaches, (scalar_breaches, vector_breaches)
+    print(f"symbols: {args.symbols}, batch: {args.batch} updates, breaches: {vector_breaches}")
+    for label, times in (('dict', scalar_times), ('vectorized', vector_times)):
+        print(f"{label:<11} p50 {percentile(times, 0.5) * 1000:7.2f}ms  "
+              f"p99 {percentile(times, 0.99) * 1000:7.2f}ms  "
+              f"{args.batch * len(times) / sum(times):>12,.0f} updates/s")
+
+
+if __name__ == '__main__':
+    main()
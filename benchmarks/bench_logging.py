@@ -0,0 +1,72 @@
+"""
+Ticks/sec through StockMonitor.on_message and the evaluation stage with
+logging at INFO (per-frame and per-tick records suppressed) versus DEBUG
+(every frame and tick logged). Output goes to /dev/null so the numbers
+measure the logging layer itself, not the terminal.
+
+Usage:
+    python benchmarks/bench_logging.py [--frames recorded.jsonl]
+"""
+import argparse
+import os
+import time
+
+from _common import load_frames, make_symbols, synthetic_frames
+from log_config import setup_logging, shutdown_logging
+from monitor import StockMonitor
+
+
+def make_config(symbols):
+    return {
+        'stocks': [
+            {'symbol': symbol, 'type': 'stock', 'alerts': {'price_change': 5.0, 'percentage_change': 0.5}}
+            for symbol in symbols
+        ],
+        'settings': {'interval': 10, 'sound_file': None, 'finnhub_api_key': 'bench'},
+        'alert_dispatch': {'sinks': []},
+    }
+
+
+def run(level, frames, symbols, devnull):
+    monitor = StockMonitor(make_config(symbols))
+    categories = {category: level for category in ('frames', 'ticks', 'alerts', 'latency')}
+    setup_logging({'level': level, 'categories': categories}, stream=devnull)
+
+    ticks = 0
+    started = time.perf_counter()
+    for message in frames:
+        monitor.on_message(None, message)
+        # 每帧处理后立即评估，模拟处理线程跟上接收速度的情况
+        while True:
+            batch = monitor.price_queue.get(timeout=0)
+            if batch is None:
+                break
+            ticks += len(batch.updates)
+            monitor._process_updates(batch.updates)
+            monitor.price_queue.task_done()
+    hot_path = time.perf_counter() - started
+    shutdown_logging()
+    total = time.perf_counter() - started
+    monitor.alert_manager.close()
+    return ticks, hot_path, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', help='JSONL file of recorded WebSocket messages')
+    parser.add_argument('--count', type=int, default=5000, help='synthetic frame count')
+    parser.add_argument('--symbols', type=int, default=50)
+    args = parser.parse_args()
+
+    symbols = make_symbols(args.symbols)
+    frames = load_frames(args.frames) if args.frames else synthetic_frames(args.count, symbols)
+
+    with open(os.devnull, 'w') as devnull:
+        for level in ('INFO', 'DEBUG'):
+            ticks, hot_path, total = run(level, frames, symbols, devnull)
+            print(f"{level:<6} {ticks / hot_path:>12,.0f} ticks/s on the hot path  "
+                  f"{ticks / total:>12,.0f} ticks/s including log flush")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Throughput of tick evaluation in one thread versus ParallelEvaluator with
+1/2/4/8 worker processes (threshold checks plus the PriceMovementValidator).
+
+Usage:
+    python benchmarks/bench_parallel.py [--symbols 20000] [--updates 400000] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import random
+import time
+
+from _common import make_symbols
+from evaluation import ThresholdEvaluator
+from parallel import ParallelEvaluator
+from price_validator import PriceMovementValidator, from_epoch_ns
+from tick_batch import SymbolUpdate
+
+TRIGGER_CONDITIONS = {
+    'time_window_minutes': 2,
+    'min_data_points': 3,
+    'price_movement': {
+        'absolute': {'up': 5.0, 'down': -5.0},
+        'percentage': {'up': 3.0, 'down': -3.0},
+    },
+    'debounce': {'cool_down_minutes': 30},
+}
+
+
+def make_batches(symbols, total, batch_size, seed=5, start_ms=1_700_000_000_000):
+    rng = random.Random(seed)
+    prices = {symbol: rng.uniform(20, 500) for symbol in symbols}
+    ts = start_ms
+    batches = []
+    for _ in range(total // batch_size):
+        batch = []
+        for _ in range(batch_size):
+            symbol = rng.choice(symbols)
+            prices[symbol] *= 1 + rng.gauss(0, 0.002)
+            ts += rng.randint(0, 2)
+            batch.append(SymbolUpdate(symbol, prices[symbol], rng.randint(1, 500), ts))
+        batches.append(batch)
+    return batches
+
+
+def run_single(alerts, batches):
+    """旧实现：一个线程内完成阈值评估和价格窗口验证"""
+    evaluator = ThresholdEvaluator(alerts)
+    validator = PriceMovementValidator(TRIGGER_CONDITIONS)
+    started = time.perf_counter()
+    for updates in batches:
+        evaluation = evaluator.evaluate(updates)
+        for _ in evaluator.breaches(evaluation):
+            pass
+        latest_ns = 0
+        for update in updates:
+            timestamp_ns = update.timestamp * 1_000_000
+            validator.add_price_ns(update.symbol, update.price, timestamp_ns)
+            latest_ns = max(latest_ns, timestamp_ns)
+        current_time = from_epoch_ns(latest_ns)
+        for symbol in {update.symbol for update in updates}:
+            validator.should_trigger_news_search(symbol, current_time)
+    return time.perf_counter() - started
+
+
+def run_parallel(alerts, batches, workers):
+    alerts_seen = []
+    evaluator = ParallelEvaluator(alerts, workers, on_alert=lambda *args: alerts_seen.append(args),
+                                  on_news=lambda *args: None, trigger_conditions=TRIGGER_CONDITIONS,
+                                  ring_capacity=1 << 18)
+    evaluator.start()
+    try:
+        started = time.perf_counter()
+        for updates in batches:
+            evaluator.submit(updates, time.perf_counter_ns())
+        evaluator.join()
+        elapsed = time.perf_counter() - started
+        dropped = evaluator.dropped
+    finally:
+        evaluator.stop()
+    return elapsed, len(alerts_seen), dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=20000)
+    parser.add_argument('--updates', type=int, default=400000)
+    parser.add_argument('--batch', type=int, default=2000, help='updates per micro-batch')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    symbols = make_symbols(args.symbols)
+    alerts = {symbol: {'price_change': 5.0, 'percentage_change': 0.5} for symbol in symbols}
+    batches = make_batches(symbols, args.updates, args.batch)
+    total = len(batches) * args.batch
+
+    print(f"symbols: {args.symbols}, updates: {total}, batch: {args.batch}, CPU cores: {os.cpu_count()}")
+    elapsed = run_single(alerts, batches)
+    print(f"{'1 thread':<11} {total / elapsed:>12,.0f} ticks/s")
+    for workers in args.workers:
+        elapsed, alert_count, dropped = run_parallel(alerts, batches, workers)
+        print(f"{workers:>2} workers  {total / elapsed:>12,.0f} ticks/s  alerts: {alert_count}  dropped: {dropped}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Memory footprint and GC cost of price history: the legacy object-per-tick
+layout (a PricePoint with a float and a datetime per tick) versus the
+columnar RollingWindow used by PriceMovementValidator.
+
+Usage:
+    python benchmarks/bench_price_memory.py [--symbols 1000 10000] [--points 120]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from _common import make_symbols
+from price_validator import PriceMovementValidator
+
+CONFIG = {
+    'time_window_minutes': 2,
+    'min_data_points': 3,
+    'price_movement': {},
+    'debounce': {'cool_down_minutes': 30},
+}
+
+
+class LegacyPricePoint:
+    """旧版数据结构：每个tick一个对象"""
+
+    def __init__(self, price, timestamp):
+        self.price = price
+        self.timestamp = timestamp
+
+
+def build_legacy(symbols, points, start):
+    windows = {}
+    for n, symbol in enumerate(symbols):
+        windows[symbol] = [
+            LegacyPricePoint(100.0 + n + i * 0.01, start + timedelta(seconds=i))
+            for i in range(points)
+        ]
+    return windows
+
+
+def build_columnar(symbols, points, start):
+    validator = PriceMovementValidator(CONFIG)
+    for n, symbol in enumerate(symbols):
+        for i in range(points):
+            validator.add_price_point(symbol, 100.0 + n + i * 0.01, start + timedelta(seconds=i))
+    return validator
+
+
+def measure(builder, *args):
+    gc.collect()
+    tracemalloc.start()
+    result = builder(*args)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    started = time.perf_counter()
+    gc.collect()
+    gc_time = time.perf_counter() - started
+    return result, current, gc_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--points', type=int, default=120, help='ticks per symbol inside the window')
+    args = parser.parse_args()
+
+    start = datetime(2026, 1, 5, 10, 0, 0)
+    print(f"{'symbols':>8} {'layout':<10} {'memory':>12} {'bytes/tick':>11} {'full gc':>10}")
+    for count in args.symbols:
+        symbols = make_symbols(count)
+        ticks = count * args.points
+
+        legacy, legacy_bytes, legacy_gc = measure(build_legacy, symbols, args.points, start)
+        print(f"{count:>8} {'objects':<10} {legacy_bytes / 2**20:>9.1f} MB "
+              f"{legacy_bytes / ticks:>11.1f} {legacy_gc * 1000:>8.1f}ms")
+        del legacy
+
+        validator, columnar_bytes, columnar_gc = measure(build_columnar, symbols, args.points, start)
+        print(f"{count:>8} {'columnar':<10} {columnar_bytes / 2**20:>9.1f} MB "
+              f"{columnar_bytes / ticks:>11.1f} {columnar_gc * 1000:>8.1f}ms")
+
+        # 两种布局的计算结果必须一致
+        movement = validator.get_price_movement(symbols[-1])
+        assert movement['base_price'] == 100.0 + count - 1
+        assert movement['end_time'] == start + timedelta(seconds=args.points - 1)
+        del validator
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Per-tick cost of alert rules: interpreting the rule dicts on every tick
+versus the precompiled per-symbol RuleEngine.
+
+Usage:
+    python benchmarks/bench_rules.py [--symbols 2000] [--updates 500000]
+"""
+import argparse
+import random
+import time
+from collections import deque
+
+from _common import make_symbols
+from rules import RuleEngine
+from tick_batch import SymbolUpdate
+
+RULES = [
+    {'type': 'absolute', 'up': 3.0, 'down': -5.0},
+    {'type': 'percentage', 'up': 0.8, 'down': -0.6},
+    {'type': 'band', 'upper': 300.0, 'lower': 100.0},
+    {'type': 'streak', 'ticks': 6, 'direction': 'either'},
+    {'type': 'volume_spike', 'multiplier': 4.0, 'window': 20},
+]
+
+
+def dict_evaluate(config, state, updates):
+    """旧方式：每个tick都从配置字典中读取规则和阈值"""
+    fired = 0
+    for update in updates:
+        symbol = update.symbol
+        if symbol not in config:
+            continue
+        symbol_state = state.setdefault(symbol, {'previous': None, 'run': 0, 'volumes': deque()})
+        previous = symbol_state['previous']
+        price = update.price
+        hit = False
+        for rule in config[symbol]['rules']:
+            if rule['type'] == 'absolute' and previous is not None:
+                change = price - previous
+                hit |= change >= rule.get('up', float('inf')) or change <= rule.get('down', float('-inf'))
+            elif rule['type'] == 'percentage' and previous:
+                pct = (price - previous) / previous * 100
+                hit |= pct >= rule.get('up', float('inf')) or pct <= rule.get('down', float('-inf'))
+            elif rule['type'] == 'band' and previous is not None:
+                hit |= previous < rule['upper'] <= price or previous > rule['lower'] >= price
+            elif rule['type'] == 'streak' and previous is not None:
+                run = symbol_state['run']
+                if price > previous:
+                    run = run + 1 if run > 0 else 1
+                elif price < previous:
+                    run = run - 1 if run < 0 else -1
+                else:
+                    run = 0
+                symbol_state['run'] = run
+                hit |= run != 0 and abs(run) == rule['ticks']
+            elif rule['type'] == 'volume_spike':
+                volumes = symbol_state['volumes']
+                if len(volumes) == rule['window'] and sum(volumes) > 0:
+                    hit |= update.volume >= rule['multiplier'] * sum(volumes) / len(volumes)
+                    volumes.popleft()
+                volumes.append(update.volume)
+        symbol_state['previous'] = price
+        fired += hit
+    return fired
+
+
+def make_updates(symbols, count, seed=3):
+    rng = random.Random(seed)
+    prices = {symbol: rng.uniform(80, 320) for symbol in symbols}
+    updates = []
+    for _ in range(count):
+        symbol = rng.choice(symbols)
+        prices[symbol] *= 1 + rng.gauss(0, 0.004)
+        volume = rng.randint(1, 500) * (10 if rng.random() < 0.01 else 1)
+        updates.append(SymbolUpdate(symbol, prices[symbol], volume))
+    return updates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=2000)
+    parser.add_argument('--updates', type=int, default=500000)
+    args = parser.parse_args()
+
+    symbols = make_symbols(args.symbols)
+    config = {symbol: {'rules': RULES} for symbol in symbols}
+    updates = make_updates(symbols, args.updates)
+
+    started = time.perf_counter()
+    dict_fired = dict_evaluate(config, {}, updates)
+    dict_elapsed = time.perf_counter() - started
+
+    engine = RuleEngine({symbol: RULES for symbol in symbols})
+    started = time.perf_counter()
+    compiled_fired = sum(1 for _ in engine.evaluate(updates))
+    compiled_elapsed = time.perf_counter() - started
+
+    assert dict_fired == compiled_fired, (dict_fired, compiled_fired)
+    print(f"symbols: {args.symbols}, updates: {len(updates)}, rules per symbol: {len(RULES)}, "
+          f"alerts: {compiled_fired}")
+    for label, elapsed in (('dict', dict_elapsed), ('compiled', compiled_elapsed)):
+        print(f"{label:<9} {elapsed / len(updates) * 1e9:8.0f} ns/tick  {len(updates) / elapsed:>12,.0f} ticks/s")
+
+
+if __name__ == '__main__':
+    main()
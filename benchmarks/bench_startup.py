@@ -0,0 +1,198 @@
+"""
+Time from process start to the first WebSocket subscription.
+
+Each run spawns a fresh interpreter that imports the monitor, builds a
+StockMonitor from a config file and starts it against a local WebSocket
+stub; the stub records when the first ``subscribe`` message arrives. The
+``minimal`` config only streams prices, ``full`` also enables news
+enrichment, index polling, metrics, the tick journal and snapshots.
+``eager`` runs ``minimal`` after importing every optional subsystem up
+front, which is what the entry point used to do.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--symbols 50]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import yaml
+
+from _common import SRC_DIR, make_symbols
+
+# 旧入口在导入 monitor 时会一并导入的可选子系统
+EAGER_MODULES = [
+    'websocket', 'requests', 'aiohttp', 'pytz', 'ws_manager', 'index_poller', 'news_searcher',
+    'enrichment', 'news_coalescer', 'parallel', 'tick_journal', 'snapshot', 'metrics', 'market_calendar',
+]
+HEAVY_MODULES = ['websocket', 'requests', 'aiohttp', 'pytz', 'ssl', 'multiprocessing']
+
+CHILD = """
+import json, os, sys, time
+started_ns = time.time_ns()
+sys.path.insert(0, {src!r})
+for name in {eager!r}:
+    __import__(name)
+from monitor import StockMonitor
+imported_ns = time.time_ns()
+monitor = StockMonitor(config_path={config!r})
+constructed_ns = time.time_ns()
+monitor.start()
+print(json.dumps({{
+    'started_ns': started_ns, 'imported_ns': imported_ns,
+    'constructed_ns': constructed_ns, 'running_ns': time.time_ns(),
+    'modules': [name for name in {heavy!r} if name in sys.modules],
+}}), flush=True)
+time.sleep(60)
+"""
+
+
+class StubFeed:
+    """本地 WebSocket 和 REST 服务，记录第一条订阅消息到达的时间"""
+
+    def __init__(self):
+        self.port = None
+        self.first_subscribe_ns = None
+        self.subscribed = threading.Event()
+        self._ready = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+
+    def reset(self):
+        self.first_subscribe_ns = None
+        self.subscribed.clear()
+
+    def _run(self):
+        from aiohttp import WSMsgType, web
+
+        async def handle(request):
+            if request.headers.get('Upgrade', '').lower() != 'websocket':
+                # 指数轮询的 /quote 请求
+                return web.json_response({'c': 100.0, 'pc': 99.0, 't': int(time.time())})
+            ws = web.WebSocketResponse()
+            await ws.prepare(request)
+            async for message in ws:
+                if message.type == WSMsgType.TEXT and '"subscribe"' in message.data:
+                    if self.first_subscribe_ns is None:
+                        self.first_subscribe_ns = time.time_ns()
+                        self.subscribed.set()
+            return ws
+
+        async def serve():
+            app = web.Application()
+            app.router.add_route('*', '/{tail:.*}', handle)
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            site = web.TCPSite(runner, '127.0.0.1', 0)
+            await site.start()
+            self.port = site._server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await asyncio.Event().wait()
+
+        asyncio.run(serve())
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def make_config(symbols, port, directory, full):
+    stocks = [
+        {'symbol': symbol, 'type': 'stock', 'alerts': {'price_change': 5.0, 'percentage_change': 2.0}}
+        for symbol in symbols
+    ]
+    config = {
+        'stocks': stocks,
+        'settings': {
+            'interval': 10,
+            'sound_file': None,
+            'finnhub_api_key': 'bench',
+            'finnhub_ws_url': f'ws://127.0.0.1:{port}',
+            'finnhub_rest_url': f'http://127.0.0.1:{port}',
+            'config_reload_interval': 0,
+        },
+        'alert_dispatch': {'sinks': []},
+        'logging': {'level': 'WARNING'},
+        'news_alert': {'enabled': False},
+    }
+    if full:
+        stocks.append({'symbol': '^GSPC', 'type': 'index', 'alerts': {'price_change': 50.0, 'percentage_change': 1.0}})
+        config['settings']['config_reload_interval'] = 2
+        config['news_alert'] = {
+            'enabled': True,
+            'deepseek': {'api_key': 'bench', 'base_url': f'http://127.0.0.1:{port}'},
+            'trigger_conditions': {
+                'time_window_minutes': 30,
+                'min_data_points': 3,
+                'price_movement': {'percentage': {'up': 2.0, 'down': -2.0}},
+                'debounce': {'cool_down_minutes': 30},
+            },
+        }
+        config['metrics'] = {'enabled': True, 'port': free_port()}
+        config['journal'] = {'enabled': True, 'directory': os.path.join(directory, 'journal')}
+        config['snapshot'] = {'enabled': True, 'path': os.path.join(directory, 'state.snapshot')}
+    return config
+
+
+def run_once(feed, config_path, eager):
+    feed.reset()
+    code = CHILD.format(src=SRC_DIR, config=config_path, eager=EAGER_MODULES if eager else [],
+                        heavy=HEAVY_MODULES)
+    env = dict(os.environ, FINNHUB_API_KEY='bench')
+    spawned_ns = time.time_ns()
+    child = subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE,
+                             stderr=subprocess.DEVNULL, text=True, env=env)
+    try:
+        report = json.loads(child.stdout.readline() or 'null')
+        if report is None or not feed.subscribed.wait(10):
+            raise RuntimeError('monitor did not subscribe')
+    finally:
+        child.kill()
+        child.wait()
+
+    def ms(ns):
+        return (ns - spawned_ns) / 1e6
+
+    return {
+        'interpreter': ms(report['started_ns']),
+        'imported': ms(report['imported_ns']),
+        'constructed': ms(report['constructed_ns']),
+        'subscribed': ms(feed.first_subscribe_ns),
+        'modules': report['modules'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--symbols', type=int, default=50)
+    args = parser.parse_args()
+
+    feed = StubFeed()
+    symbols = make_symbols(args.symbols)
+    print(f"{'config':<8} {'interpreter':>12} {'imported':>10} {'constructed':>12} {'subscribed':>11}  loaded")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, full, eager in (('minimal', False, False), ('full', True, False), ('eager', False, True)):
+            config_path = os.path.join(directory, f'{label}.yaml')
+            with open(config_path, 'w', encoding='utf-8') as f:
+                yaml.safe_dump(make_config(symbols, feed.port, directory, full), f)
+            runs = [run_once(feed, config_path, eager) for _ in range(args.runs)]
+            medians = {key: statistics.median(run[key] for run in runs)
+                       for key in ('interpreter', 'imported', 'constructed', 'subscribed')}
+            print(f"{label:<8} {medians['interpreter']:10.1f}ms {medians['imported']:8.1f}ms "
+                  f"{medians['constructed']:10.1f}ms {medians['subscribed']:9.1f}ms  "
+                  f"{', '.join(runs[-1]['modules']) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
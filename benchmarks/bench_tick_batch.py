@@ -0,0 +1,102 @@
+"""
+Throughput of WebSocket frame ingestion: legacy per-trade queue puts versus
+the batched TickBatch path used by StockMonitor.on_message.
+
+Both paths parse every frame, read the same trade fields (symbol, price,
+volume, timestamp) and include the processing thread draining the queue,
+so the comparison covers the same work end to end.
+
+Usage:
+    python benchmarks/bench_tick_batch.py [--frames recorded.jsonl]
+"""
+import argparse
+import json
+import time
+from queue import Queue
+
+from _common import load_frames, make_symbols, synthetic_frames
+from tick_batch import TickBatch
+
+
+def drain(queue, on_item):
+    """价格处理线程一侧：逐个取出队列项"""
+    get = queue.get_nowait
+    for _ in range(queue.qsize()):
+        on_item(get())
+
+
+def ingest_per_trade(frames):
+    """每笔成交单独入队（旧实现），处理线程逐笔取出"""
+    queue = Queue()
+    for message in frames:
+        data = json.loads(message)
+        if data['type'] == 'trade':
+            for trade in data['data']:
+                queue.put((trade['s'], float(trade['p']), float(trade.get('v') or 0.0), trade.get('t')))
+    items = queue.qsize()
+    latest = {}
+
+    def on_trade(trade):
+        latest[trade[0]] = trade[1]
+
+    drain(queue, on_trade)
+    return items
+
+
+def ingest_batched(frames):
+    """整帧聚合为TickBatch后一次入队，处理线程按批取出"""
+    queue = Queue()
+    for message in frames:
+        data = json.loads(message)
+        if data['type'] == 'trade':
+            batch = TickBatch.from_trades(data['data'])
+            if batch.updates:
+                queue.put(batch)
+    items = queue.qsize()
+    latest = {}
+
+    def on_batch(batch):
+        for update in batch.updates:
+            latest[update.symbol] = update.price
+
+    drain(queue, on_batch)
+    return items
+
+
+def run(label, func, frames, trade_count, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = func(frames)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<12} {trade_count / best:>14,.0f} trades/s  "
+          f"{len(frames) / best:>12,.0f} frames/s  queue items: {items}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', help='JSONL file of recorded WebSocket messages')
+    parser.add_argument('--count', type=int, default=20000, help='synthetic frame count')
+    parser.add_argument('--symbols', type=int, default=50, help='synthetic symbol count')
+    parser.add_argument('--trades-per-frame', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.frames:
+        frames = load_frames(args.frames)
+    else:
+        frames = synthetic_frames(args.count, make_symbols(args.symbols), args.trades_per_frame)
+
+    trade_count = 0
+    for message in frames:
+        data = json.loads(message)
+        if data.get('type') == 'trade':
+            trade_count += len(data['data'])
+
+    print(f"frames: {len(frames)}, trades: {trade_count}")
+    run('per-trade', ingest_per_trade, frames, trade_count, args.repeat)
+    run('batched', ingest_batched, frames, trade_count, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Startup-to-first-alert after a restart, cold (empty state) versus warm
+(state restored from a snapshot), plus snapshot size and save/load time.
+
+Before the restart every symbol trades for a while; the restarted monitor
+then sees each symbol open with a gap beyond its threshold followed by
+small moves. A cold monitor has no previous price, so the gap is missed
+and it alerts only once a later move happens to breach a threshold.
+
+Usage:
+    python benchmarks/bench_warm_start.py [--symbols 2000] [--frames 200] [--frame-interval-ms 5]
+"""
+import argparse
+import gc
+import os
+import random
+import tempfile
+import threading
+import time
+
+from _common import make_symbols
+from alert import AlertManager
+from alert_dispatcher import AlertSink
+from monitor import StockMonitor
+from replay import NewsTriggerRecorder
+
+TRIGGER_CONDITIONS = {
+    'time_window_minutes': 30,
+    'min_data_points': 3,
+    'price_movement': {'percentage': {'up': 2.0, 'down': -2.0}},
+    'debounce': {'cool_down_minutes': 30},
+}
+
+
+class FirstAlertSink(AlertSink):
+    name = 'bench'
+
+    def __init__(self):
+        super().__init__()
+        self.first_ns = None
+        self.delivered = 0
+        self.done = threading.Event()
+
+    def emit(self, alert):
+        if self.first_ns is None:
+            self.first_ns = time.perf_counter_ns()
+            self.done.set()
+        self.delivered += 1
+
+
+def make_config(symbols, snapshot_path):
+    return {
+        'stocks': [
+            {'symbol': symbol, 'type': 'stock', 'alerts': {'price_change': 1000.0, 'percentage_change': 1.0}}
+            for symbol in symbols
+        ],
+        'settings': {'interval': 10, 'sound_file': None, 'finnhub_api_key': 'bench'},
+        'alert_dispatch': {'sinks': []},
+        'logging': {'level': 'WARNING', 'categories': {'alerts': 'WARNING', 'latency': 'WARNING'}},
+        'news_alert': {'enabled': True, 'deepseek': {'api_key': 'bench'}, 'trigger_conditions': TRIGGER_CONDITIONS},
+        'snapshot': {'enabled': snapshot_path is not None, 'path': snapshot_path, 'interval_seconds': 3600},
+    }
+
+
+def build_monitor(symbols, snapshot_path):
+    monitor = StockMonitor(make_config(symbols, snapshot_path))
+    monitor.alert_manager.close()
+    sink = FirstAlertSink()
+    monitor.alert_manager = AlertManager(None, {}, sinks=[sink])
+    # 不调用 DeepSeek，价格窗口和冷却时间照常维护
+    monitor.enrichment = NewsTriggerRecorder()
+    return monitor, sink
+
+
+def make_frames(symbols, prices, count, trades_per_frame, gap, seed):
+    """每个股票的第一笔成交相对 ``prices`` 跳空 ``gap``，之后小幅波动"""
+    rng = random.Random(seed)
+    prices = dict(prices)
+    opened = set()
+    now_ms = time.time_ns() // 1_000_000
+    frames = []
+    for i in range(count):
+        trades = []
+        for _ in range(trades_per_frame):
+            symbol = rng.choice(symbols)
+            if symbol in opened:
+                prices[symbol] *= 1 + rng.gauss(0, 0.004)
+            else:
+                prices[symbol] *= 1 + gap * rng.choice((1, -1))
+                opened.add(symbol)
+            trades.append({'p': prices[symbol], 's': symbol, 't': now_ms + i, 'v': 100, 'c': None})
+        frames.append({'type': 'trade', 'data': trades})
+    return prices, frames
+
+
+def run_session(symbols, snapshot_path, frames, frame_interval):
+    started = time.perf_counter_ns()
+    monitor, sink = build_monitor(symbols, snapshot_path)
+    monitor.start_processing()
+    ready_ns = time.perf_counter_ns()
+    for frame in frames:
+        monitor.handle_frame(frame)
+        if sink.done.wait(frame_interval):
+            break
+    monitor.wait_idle()
+    monitor.alert_manager.close()
+    first_ms = (sink.first_ns - started) / 1e6 if sink.first_ns else None
+    return monitor, (ready_ns - started) / 1e6, first_ms
+
+
+def run_before_restart(symbols, closes, path, history):
+    """重启前：运行一段时间并保存快照，返回收盘价"""
+    closes, frames = make_frames(symbols, closes, history * len(symbols) // 20, 20, 0.0, seed=1)
+    monitor, _ = build_monitor(symbols, path)
+    monitor.start_processing()
+    for frame in frames:
+        monitor.handle_frame(frame)
+    monitor.wait_idle()
+    monitor.alert_manager.close()
+    monitor.snapshotter.save()
+    points = sum(len(window) for window in monitor.validator.price_windows.values())
+    print(f"symbols: {len(symbols)}, window points: {points:,}, "
+          f"snapshot: {os.path.getsize(path) / 1024:,.0f} KiB, save {monitor.snapshotter.last_duration_ms:.1f}ms")
+    return closes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=2000)
+    parser.add_argument('--history', type=int, default=50, help='ticks per symbol before the restart')
+    parser.add_argument('--frames', type=int, default=200, help='frames fed after the restart')
+    parser.add_argument('--trades-per-frame', type=int, default=20)
+    parser.add_argument('--frame-interval-ms', type=float, default=5.0)
+    parser.add_argument('--gap', type=float, default=0.02, help='opening gap after the restart (fraction)')
+    args = parser.parse_args()
+
+    symbols = make_symbols(args.symbols)
+    rng = random.Random(11)
+    closes = {symbol: rng.uniform(20, 500) for symbol in symbols}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'state.snapshot')
+
+        closes = run_before_restart(symbols, closes, path, args.history)
+        # 释放重启前的数据，避免大量存活对象拖慢后续的垃圾回收
+        gc.collect()
+
+        _, frames = make_frames(symbols, closes, args.frames, args.trades_per_frame, args.gap, seed=2)
+        interval = args.frame_interval_ms / 1000
+        for label, snapshot_path in (('cold', None), ('warm', path)):
+            monitor, ready_ms, first_ms = run_session(symbols, snapshot_path, frames, interval)
+            first = f"{first_ms:8.1f}ms" if first_ms is not None else f"{'none':>10}"
+            print(f"{label:<5} ready {ready_ms:7.1f}ms  first alert {first}  "
+                  f"restored prices {len(monitor.prices) if snapshot_path else 0:,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,358 @@
+"""
+Local stand-ins for the Finnhub and DeepSeek APIs, for load tests.
+
+One aiohttp server provides:
+    /                     Finnhub-style WebSocket: streams trade frames for the
+                          subscribed symbols, with periodic bursts (more trades
+                          and a price shock) and forced disconnects
+    /quote                Finnhub quote REST endpoint (random walk per symbol)
+    /v1/chat/completions  DeepSeek chat completions with configurable latency,
+                          jitter and error rate, plain or streamed (SSE)
+    /stats                Counters of everything served, as JSON
+    /pause                Stop sending trades (connections stay open)
+
+Run standalone to point a monitor at it by hand; it prints one JSON line
+with the URLs once it is listening.
+
+Usage:
+    python benchmarks/fake_services.py [--port 8780] [--trades-per-second 5000] [--news-latency-ms 800]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, Optional
+
+from aiohttp import WSMsgType, web
+
+
+class FakeFinnhub:
+    """
+    Finnhub WebSocket and quote stand-in.
+
+    Trades are spread over all subscribed symbols so the aggregate rate is
+    ``trades_per_second`` whatever the number of connections. Every
+    ``burst_every`` seconds the rate is multiplied by ``burst_factor`` for
+    ``burst_seconds`` and a ``burst_share`` of the symbols jump by
+    ``burst_move``. With ``disconnect_every`` each connection is closed by
+    the server after that many seconds, like an upstream reset.
+    """
+
+    def __init__(self, trades_per_second: float = 5000, frame_interval: float = 0.05,
+                 burst_every: float = 0, burst_seconds: float = 1.0, burst_factor: float = 5.0,
+                 burst_move: float = 0.03, burst_share: float = 0.05, disconnect_every: float = 0,
+                 seed: int = 7):
+        self.trades_per_second = trades_per_second
+        self.frame_interval = frame_interval
+        self.burst_every = burst_every
+        self.burst_seconds = burst_seconds
+        self.burst_factor = burst_factor
+        self.burst_move = burst_move
+        self.burst_share = burst_share
+        self.disconnect_every = disconnect_every
+        self.rng = random.Random(seed)
+
+        self.prices: Dict[str, float] = {}
+        self.subscribed = 0
+        self.paused = False
+        self._started = time.monotonic()
+        self._last_burst = -1
+
+        self.connections = 0
+        self.disconnects = 0
+        self.frames_sent = 0
+        self.trades_sent = 0
+        self.bursts = 0
+        self.quotes = 0
+
+    def add_routes(self, app: web.Application):
+        app.router.add_get('/', self.handle_websocket)
+        app.router.add_get('/quote', self.handle_quote)
+
+    def _price(self, symbol: str) -> float:
+        price = self.prices.get(symbol)
+        if price is None:
+            price = self.prices[symbol] = self.rng.uniform(20, 500)
+        return price
+
+    def _burst_index(self, now: float) -> Optional[int]:
+        """当前所处的突发时段编号，不在突发时段内返回 None"""
+        if not self.burst_every:
+            return None
+        elapsed = now - self._started
+        if elapsed % self.burst_every < self.burst_every - self.burst_seconds:
+            return None
+        return int(elapsed // self.burst_every)
+
+    async def handle_websocket(self, request: web.Request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        symbols = set()
+        sender = asyncio.create_task(self._send_trades(ws, symbols))
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                data = json.loads(message.data)
+                if data.get('type') == 'subscribe' and data['symbol'] not in symbols:
+                    symbols.add(data['symbol'])
+                    self.subscribed += 1
+                elif data.get('type') == 'unsubscribe' and data['symbol'] in symbols:
+                    symbols.discard(data['symbol'])
+                    self.subscribed -= 1
+        finally:
+            sender.cancel()
+            self.subscribed -= len(symbols)
+        return ws
+
+    async def _send_trades(self, ws: web.WebSocketResponse, symbols: set):
+        opened = time.monotonic()
+        next_frame = opened
+        carry = 0.0
+        last_burst = None
+        while not ws.closed:
+            next_frame += self.frame_interval
+            delay = next_frame - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                # 发送落后时不补发，按当前时间重新对齐
+                next_frame = time.monotonic()
+            now = time.monotonic()
+            if self.disconnect_every and now - opened >= self.disconnect_every:
+                self.disconnects += 1
+                await ws.close()
+                return
+            if not symbols or self.paused:
+                continue
+
+            burst = self._burst_index(now)
+            if burst is not None and burst != last_burst:
+                if burst > self._last_burst:
+                    self._last_burst = burst
+                    self.bursts += 1
+                for symbol in symbols:
+                    if self.rng.random() < self.burst_share:
+                        self.prices[symbol] = self._price(symbol) * (1 + self.burst_move * self.rng.choice((1, -1)))
+            last_burst = burst
+
+            # 总速率按本连接订阅的股票占比分摊
+            rate = self.trades_per_second * len(symbols) / max(1, self.subscribed)
+            carry += rate * self.frame_interval * (self.burst_factor if burst is not None else 1.0)
+            count, carry = int(carry), carry - int(carry)
+            if not count:
+                continue
+
+            population = list(symbols)
+            now_ms = time.time_ns() // 1_000_000
+            trades = []
+            for symbol in self.rng.choices(population, k=count):
+                price = self.prices[symbol] = self._price(symbol) * (1 + self.rng.gauss(0, 0.0005))
+                trades.append({'p': round(price, 4), 's': symbol, 't': now_ms,
+                               'v': self.rng.randint(1, 500), 'c': None})
+            try:
+                await ws.send_str(json.dumps({'type': 'trade', 'data': trades}))
+            except ConnectionError:
+                return
+            self.frames_sent += 1
+            self.trades_sent += count
+
+    async def handle_quote(self, request: web.Request):
+        symbol = request.query.get('symbol', '')
+        self.quotes += 1
+        previous = self._price(symbol)
+        price = self.prices[symbol] = previous * (1 + self.rng.gauss(0, 0.001))
+        return web.json_response({
+            'c': round(price, 2), 'd': round(price - previous, 2),
+            'dp': round((price - previous) / previous * 100, 4),
+            'h': round(max(price, previous), 2), 'l': round(min(price, previous), 2),
+            'o': round(previous, 2), 'pc': round(previous, 2), 't': int(time.time()),
+        })
+
+    def stats(self) -> dict:
+        return {
+            'connections': self.connections,
+            'disconnects': self.disconnects,
+            'subscribed': self.subscribed,
+            'frames_sent': self.frames_sent,
+            'trades_sent': self.trades_sent,
+            'bursts': self.bursts,
+            'quotes': self.quotes,
+        }
+
+
+class FakeDeepSeek:
+    """
+    DeepSeek chat-completions stand-in.
+
+    Each answer takes ``latency`` seconds (plus up to ``jitter``) and holds
+    ``articles`` news items in the format NewsSearcher parses. Streamed
+    requests spread the same delay over the chunks. Batched prompts get
+    their items under a ``Symbol: ALL`` header.
+    """
+
+    def __init__(self, latency: float = 0.8, jitter: float = 0.2, error_rate: float = 0.0,
+                 articles: int = 3, chunk_chars: int = 24, seed: int = 11):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.articles = articles
+        self.chunk_chars = chunk_chars
+        self.rng = random.Random(seed)
+
+        self.requests = 0
+        self.streamed = 0
+        self.batched = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def add_routes(self, app: web.Application):
+        app.router.add_post('/v1/chat/completions', self.handle_completion)
+
+    def _answer(self, batched: bool) -> str:
+        lines = ["Symbol: ALL"] if batched else []
+        for i in range(self.articles):
+            lines += [
+                f"Title: \"Load test headline {i + 1}\"",
+                f"Source: Fake Wire | Time: {time.strftime('%Y-%m-%d %H:%M')}",
+                f"Summary: Synthetic news item {i + 1} generated by the load-test server.",
+                "",
+            ]
+        return "\n".join(lines)
+
+    async def handle_completion(self, request: web.Request):
+        body = await request.json()
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            delay = self.latency + self.rng.uniform(0, self.jitter)
+            if self.rng.random() < self.error_rate:
+                self.errors += 1
+                await asyncio.sleep(delay)
+                return web.json_response({'error': {'message': 'fake upstream error'}}, status=500)
+
+            batched = 'Symbol: ALL' in body['messages'][-1]['content']
+            self.batched += batched
+            content = self._answer(batched)
+            if not body.get('stream'):
+                await asyncio.sleep(delay)
+                return web.json_response({'choices': [{'message': {'role': 'assistant', 'content': content}}]})
+
+            self.streamed += 1
+            chunks = [content[i:i + self.chunk_chars] for i in range(0, len(content), self.chunk_chars)]
+            response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+            await response.prepare(request)
+            for chunk in chunks:
+                await asyncio.sleep(delay / len(chunks))
+                event = {'choices': [{'delta': {'content': chunk}}]}
+                await response.write(f"data: {json.dumps(event)}\n\n".encode())
+            await response.write(b"data: [DONE]\n\n")
+            return response
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            'requests': self.requests,
+            'streamed': self.streamed,
+            'batched': self.batched,
+            'errors': self.errors,
+            'max_in_flight': self.max_in_flight,
+        }
+
+
+def build_app(finnhub: FakeFinnhub, deepseek: FakeDeepSeek) -> web.Application:
+    app = web.Application()
+    finnhub.add_routes(app)
+    deepseek.add_routes(app)
+
+    async def handle_stats(request):
+        return web.json_response({'finnhub': finnhub.stats(), 'deepseek': deepseek.stats()})
+
+    async def handle_pause(request):
+        finnhub.paused = True
+        return web.json_response(finnhub.stats())
+
+    app.router.add_get('/stats', handle_stats)
+    app.router.add_post('/pause', handle_pause)
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Options of the fake services, shared with load_test.py."""
+    parser.add_argument('--trades-per-second', type=float, default=5000)
+    parser.add_argument('--frame-interval-ms', type=float, default=50)
+    parser.add_argument('--burst-every', type=float, default=10, help='seconds between bursts (0 = none)')
+    parser.add_argument('--burst-seconds', type=float, default=1.0)
+    parser.add_argument('--burst-factor', type=float, default=5.0, help='trade rate multiplier during a burst')
+    parser.add_argument('--burst-move', type=float, default=0.03, help='price jump at a burst (fraction)')
+    parser.add_argument('--burst-share', type=float, default=0.05, help='share of symbols that jump')
+    parser.add_argument('--disconnect-every', type=float, default=0,
+                        help='server closes each connection after this many seconds (0 = never)')
+    parser.add_argument('--news-latency-ms', type=float, default=800)
+    parser.add_argument('--news-jitter-ms', type=float, default=200)
+    parser.add_argument('--news-error-rate', type=float, default=0.0)
+    parser.add_argument('--news-articles', type=int, default=3)
+
+
+def service_arguments(args: argparse.Namespace) -> list:
+    """Command-line options that reproduce ``args`` for a fake_services.py subprocess."""
+    names = ['trades_per_second', 'frame_interval_ms', 'burst_every', 'burst_seconds', 'burst_factor',
+             'burst_move', 'burst_share', 'disconnect_every', 'news_latency_ms', 'news_jitter_ms',
+             'news_error_rate', 'news_articles']
+    argv = []
+    for name in names:
+        argv += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+    return argv
+
+
+async def serve(args: argparse.Namespace):
+    finnhub = FakeFinnhub(
+        trades_per_second=args.trades_per_second,
+        frame_interval=args.frame_interval_ms / 1000,
+        burst_every=args.burst_every,
+        burst_seconds=args.burst_seconds,
+        burst_factor=args.burst_factor,
+        burst_move=args.burst_move,
+        burst_share=args.burst_share,
+        disconnect_every=args.disconnect_every,
+    )
+    deepseek = FakeDeepSeek(
+        latency=args.news_latency_ms / 1000,
+        jitter=args.news_jitter_ms / 1000,
+        error_rate=args.news_error_rate,
+        articles=args.news_articles,
+    )
+    runner = web.AppRunner(build_app(finnhub, deepseek), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, args.host, args.port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base = f"{args.host}:{port}"
+    print(json.dumps({
+        'finnhub_ws_url': f"ws://{base}",
+        'finnhub_rest_url': f"http://{base}",
+        'deepseek_url': f"http://{base}/v1/chat/completions",
+        'stats_url': f"http://{base}/stats",
+        'pause_url': f"http://{base}/pause",
+    }), flush=True)
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0, help='0 picks a free port')
+    add_arguments(parser)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+"""
+End-to-end load test against local Finnhub and DeepSeek stand-ins.
+
+Starts fake_services.py in a subprocess (so its CPU and memory are not
+counted against the monitor), then runs the real StockMonitor on it:
+sharded WebSocket clients, index polling over REST, the coalescing price
+buffer, evaluation and rules, the PriceMovementValidator, news
+enrichment through NewsSearcher and delivery through AlertManager. At the
+end it reports throughput, latency per pipeline stage, memory and every
+place a tick or trigger can be lost.
+
+Usage:
+    python benchmarks/load_test.py [--symbols 500] [--duration 30] [--trades-per-second 5000]
+        [--disconnect-every 15] [--news-latency-ms 800] [--news-stream] [--json]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import urllib.request
+
+from _common import make_symbols
+from alert import AlertManager
+from fake_services import add_arguments, service_arguments
+from monitor import StockMonitor
+from replay import RecordingSink
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class AlwaysOpen:
+    """交易日历替身：压测不受真实开市时间影响"""
+
+    def is_open(self, now=None):
+        return True
+
+    def is_extended_open(self, now=None):
+        return True
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MiB."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1 << 20)
+    except OSError:
+        # 非 Linux 系统只能取峰值（macOS 单位为字节，Linux 为 KiB）
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def make_config(args, urls):
+    stocks = [
+        {'symbol': symbol, 'type': 'stock', 'alerts': {'price_change': 1000.0, 'percentage_change': 2.0}}
+        for symbol in make_symbols(args.symbols)
+    ]
+    stocks += [
+        {'symbol': f"^IDX{i}", 'type': 'index', 'alerts': {'price_change': 1000.0, 'percentage_change': 1.0}}
+        for i in range(args.indices)
+    ]
+    return {
+        'stocks': stocks,
+        'settings': {
+            'interval': args.index_interval,
+            'sound_file': None,
+            'finnhub_api_key': 'load-test',
+            'finnhub_ws_url': urls['finnhub_ws_url'],
+            'finnhub_rest_url': urls['finnhub_rest_url'],
+            'finnhub_calls_per_minute': 6000,
+            'ws_symbols_per_connection': args.symbols_per_connection,
+            'ws_reconnect_base_seconds': 0.2,
+            'ws_reconnect_max_seconds': 2.0,
+            'eval_workers': args.eval_workers,
+            'price_buffer_symbols': args.buffer_size,
+            'config_reload_interval': 0,
+        },
+        'alert_dispatch': {'sinks': []},
+        'logging': {'level': args.log_level, 'categories': {'alerts': 'WARNING', 'latency': 'WARNING'}},
+        'metrics': {'enabled': True, 'per_symbol': False, 'port': 0},
+        'snapshot': {'enabled': False},
+        'news_alert': {
+            'enabled': True,
+            'deepseek': {'api_key': 'load-test', 'base_url': urls['deepseek_url'], 'stream': args.news_stream},
+            'enrichment': {
+                'concurrency': args.news_concurrency,
+                'max_pending': args.news_max_pending,
+                'coalesce_window_ms': args.coalesce_window_ms,
+            },
+            'trigger_conditions': {
+                'time_window_minutes': 5,
+                'min_data_points': 3,
+                'price_movement': {'percentage': {'up': 2.0, 'down': -2.0}},
+                'debounce': {'cool_down_minutes': 1},
+            },
+        },
+    }
+
+
+def start_services(args):
+    command = [sys.executable, os.path.join(BENCH_DIR, 'fake_services.py')] + service_arguments(args)
+    services = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = services.stdout.readline()
+    if not line:
+        services.wait()
+        raise RuntimeError('fake services did not start')
+    return services, json.loads(line)
+
+
+def build_monitor(config):
+    monitor = StockMonitor(config)
+    monitor._calendar = AlwaysOpen()
+    # 用统计用的输出替换默认输出，新闻警报也走同一个 AlertManager
+    monitor.alert_manager.close()
+    sink = RecordingSink()
+    monitor.alert_manager = AlertManager(None, config['alert_dispatch'], sinks=[sink],
+                                         on_delivered=monitor.metrics.record_alert)
+    monitor.enrichment.alert_manager = monitor.alert_manager
+    return monitor, sink
+
+
+def drain_and_stop(monitor, drain_timeout):
+    """等待已收到的价格和新闻检索处理完，再关闭各组件"""
+    monitor.wait_idle()
+    deadline = time.monotonic() + drain_timeout
+    while monitor.enrichment.stats()['pending'] and time.monotonic() < deadline:
+        time.sleep(0.1)
+    if monitor.parallel:
+        monitor.parallel.stop()
+    monitor.enrichment.stop()
+    monitor.alert_manager.close()
+
+
+def run(args) -> dict:
+    services, urls = start_services(args)
+    try:
+        config = make_config(args, urls)
+        rss_before = rss_mb()
+        monitor, sink = build_monitor(config)
+        monitor.start()
+
+        rss_samples = []
+        started = time.perf_counter()
+        while time.perf_counter() - started < args.duration:
+            time.sleep(1)
+            rss_samples.append(rss_mb())
+        elapsed = time.perf_counter() - started
+        shards = monitor.ws_manager.stats()
+        # 服务端停止发送后稍等在途的消息到达，再比较发送和接收的成交笔数
+        urllib.request.urlopen(urllib.request.Request(urls['pause_url'], method='POST')).close()
+        time.sleep(args.settle)
+        received = monitor.trades_received
+        with urllib.request.urlopen(urls['stats_url']) as response:
+            served = json.loads(response.read())
+        monitor.ws_manager.stop()
+        drain_and_stop(monitor, args.drain_timeout)
+    finally:
+        services.terminate()
+        services.wait()
+
+    buffer_stats = monitor.price_queue.stats()
+    news = monitor.enrichment.stats()
+    dispatch = monitor.alert_manager.stats()
+    finnhub = served['finnhub']
+    return {
+        'symbols': args.symbols,
+        'duration_s': elapsed,
+        'ticks': {
+            'sent': finnhub['trades_sent'],
+            'received': received,
+            'processed': monitor.metrics.ticks,
+            'received_per_s': received / elapsed,
+            # 服务端已发出但客户端没有收到（服务端断开连接时在途的消息）
+            'lost_in_transit': max(0, finnhub['trades_sent'] - received),
+            'buffer_coalesced': buffer_stats['coalesced'],
+            'buffer_dropped': buffer_stats['dropped'],
+        },
+        'connections': {
+            'shards': len(shards),
+            'opened': finnhub['connections'],
+            'server_disconnects': finnhub['disconnects'],
+            'reconnects': sum(shard['reconnects'] for shard in shards),
+            'bursts': finnhub['bursts'],
+            'index_quotes': finnhub['quotes'],
+        },
+        'latency_ms': monitor.metrics.summary(),
+        'alerts': {
+            'submitted': dispatch['submitted'],
+            'delivered': sink.delivered,
+            'collapsed': dispatch['collapsed'],
+            'dropped': dispatch['dropped'],
+        },
+        'news': {
+            'submitted': news['submitted'],
+            'completed': news['completed'],
+            'failed': news['failed'],
+            'dropped': news['dropped'],
+            'pending': news['pending'],
+            'requests': served['deepseek']['requests'],
+            'upstream_errors': served['deepseek']['errors'],
+            'latency_ms': news['latency'],
+            'first_article_ms': news['first_article'],
+        },
+        'memory_mb': {
+            'before': rss_before,
+            'peak': max(rss_samples, default=rss_before),
+            'end': rss_samples[-1] if rss_samples else rss_before,
+        },
+    }
+
+
+def format_report(report: dict) -> str:
+    ticks = report['ticks']
+    connections = report['connections']
+    alerts = report['alerts']
+    news = report['news']
+    memory = report['memory_mb']
+    lines = [
+        f"股票 {report['symbols']}, 运行 {report['duration_s']:.1f} 秒, "
+        f"{connections['shards']} 个WebSocket分片",
+        f"  成交: 发送 {ticks['sent']:,}, 接收 {ticks['received']:,} ({ticks['received_per_s']:,.0f}/s), "
+        f"处理 {ticks['processed']:,}",
+        f"  丢失: 传输中 {ticks['lost_in_transit']:,}, 缓冲区丢弃 {ticks['buffer_dropped']:,} "
+        f"(合并 {ticks['buffer_coalesced']:,})",
+        f"  连接: 建立 {connections['opened']}, 服务端断开 {connections['server_disconnects']}, "
+        f"重连 {connections['reconnects']}, 突发 {connections['bursts']}, 指数报价请求 {connections['index_quotes']}",
+    ]
+    for stage, stats in report['latency_ms'].items():
+        if stats['count']:
+            lines.append(f"  延迟 {stage:<20} p50 {stats['p50_ms']:8.2f}ms  p99 {stats['p99_ms']:8.2f}ms  "
+                         f"max {stats['max_ms']:8.2f}ms  ({stats['count']:,})")
+    lines += [
+        f"  警报: 触发 {alerts['submitted']}, 发出 {alerts['delivered']}, 合并 {alerts['collapsed']}, "
+        f"丢弃 {alerts['dropped']}",
+        f"  新闻: 触发 {news['submitted']}, 完成 {news['completed']}, 失败 {news['failed']}, "
+        f"丢弃 {news['dropped']}, 未完成 {news['pending']}, "
+        f"请求 {news['requests']} (出错 {news['upstream_errors']}), "
+        f"延迟 p50 {news['latency_ms']['p50_ms']:.0f}ms p99 {news['latency_ms']['p99_ms']:.0f}ms",
+        f"  内存(RSS): 启动前 {memory['before']:.1f} MiB, 峰值 {memory['peak']:.1f} MiB, "
+        f"结束 {memory['end']:.1f} MiB",
+    ]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--indices', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load')
+    parser.add_argument('--index-interval', type=float, default=1, help='index polling interval (s)')
+    parser.add_argument('--symbols-per-connection', type=int, default=50)
+    parser.add_argument('--eval-workers', type=int, default=1,
+                        help='evaluation processes (their memory is not included in the RSS figures)')
+    parser.add_argument('--buffer-size', type=int, default=10000, help='price buffer capacity (symbols)')
+    parser.add_argument('--news-stream', action='store_true', help='stream DeepSeek responses')
+    parser.add_argument('--news-concurrency', type=int, default=4)
+    parser.add_argument('--news-max-pending', type=int, default=100)
+    parser.add_argument('--coalesce-window-ms', type=float, default=0)
+    parser.add_argument('--settle', type=float, default=1.0,
+                        help='seconds to wait for in-flight frames after the feed is paused')
+    parser.add_argument('--drain-timeout', type=float, default=10, help='seconds to wait for news lookups at the end')
+    parser.add_argument('--log-level', default='CRITICAL',
+                        help='monitor log level (WARNING shows every disconnect and reconnect)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print(format_report(report))
+
+
+if __name__ == '__main__':
+    main()
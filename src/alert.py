@@ -1,41 +1,36 @@
-import os
-import subprocess
-from datetime import datetime
+from alert_dispatcher import Alert, AlertDispatcher, build_sinks
+
+# 未配置 alert_dispatch 时的默认输出：播放警报音并打印到终端
+DEFAULT_SINKS = [{'type': 'sound'}, {'type': 'stdout'}]
 
 class AlertManager:
-    def __init__(self, sound_file):
-        """初始化警报管理器"""
+    def __init__(self, sound_file, dispatch_config=None, sinks=None, on_delivered=None, on_lane_delivered=None):
+        """初始化警报管理器（sinks 用于直接指定输出，例如回放时统计警报；on_delivered 在快速输出完成后调用，
+        on_lane_delivered 在每个输出组（包括声音、webhook 等慢速输出）完成后调用）"""
         self.sound_file = sound_file
-        self._validate_sound_file()
-
-    def _validate_sound_file(self):
-        """验证声音文件是否存在"""
-        if not os.path.exists(self.sound_file):
-            raise FileNotFoundError(f"警报音文件未找到: {self.sound_file}")
+        dispatch_config = dispatch_config or {}
+        if sinks is None:
+            sinks = build_sinks(dispatch_config.get('sinks', DEFAULT_SINKS), sound_file)
+        self.dispatcher = AlertDispatcher(
+            sinks,
+            max_queue=dispatch_config.get('queue_size', 1000),
+            workers=dispatch_config.get('workers', 2),
+            on_delivered=on_delivered,
+            on_lane_delivered=on_lane_delivered
+        )
+        self.dispatcher.start()
 
-    def _play_sound(self):
-        """使用系统命令播放声音"""
-        try:
-            subprocess.run(['afplay', self.sound_file], check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"播放警报音失败: {e}")
-        except FileNotFoundError:
-            print("警告: 在此系统上找不到 afplay 命令")
+    def trigger_alert(self, stock_symbol, current_price, price_change, percentage_change,
+                      news=None, received_ns=None, reason=None, followup=False):
+        """触发警报（只入队，声音播放等I/O由分发线程完成，不阻塞价格处理；followup 为已发出警报的补充内容）"""
+        alert = Alert(stock_symbol, current_price, price_change, percentage_change, news, received_ns, reason,
+                      followup)
+        return self.dispatcher.submit(alert)
 
-    def trigger_alert(self, stock_symbol, current_price, price_change, percentage_change):
-        """触发警报"""
-        # 播放声音
-        self._play_sound()
+    def stats(self):
+        """返回警报分发的统计信息"""
+        return self.dispatcher.stats()
 
-        # 打印警报信息
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        alert_message = (
-            f"\n警报时间: {timestamp}\n"
-            f"股票: {stock_symbol}\n"
-            f"当前价格: ${current_price:.2f}\n"
-            f"价格变动: ${price_change:.2f}\n"
-            f"百分比变动: {percentage_change:.2f}%\n"
-        )
-        print("\n" + "="*50)
-        print(alert_message)
-        print("="*50) 
\ No newline at end of file
+    def close(self):
+        """发送剩余警报并关闭所有输出"""
+        self.dispatcher.stop()
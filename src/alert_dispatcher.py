@@ -0,0 +1,472 @@
+import copy
+import json
+import logging
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Alert:
+    """A single price alert travelling through the dispatcher."""
+
+    __slots__ = ('symbol', 'current_price', 'price_change', 'percentage_change',
+                 'news', 'reason', 'followup', 'created_at', 'received_ns', 'submitted_ns', 'collapsed')
+
+    def __init__(self, symbol: str, current_price: float, price_change: float, percentage_change: float,
+                 news: Optional[str] = None, received_ns: Optional[int] = None, reason: Optional[str] = None,
+                 followup: bool = False):
+        self.symbol = symbol
+        self.current_price = current_price
+        self.price_change = price_change
+        self.percentage_change = percentage_change
+        # 新闻检索结果（format_news_alert 的输出）
+        self.news = news
+        # 触发的警报规则说明（rules 配置），阈值警报为 None
+        self.reason = reason
+        # 对已发出警报的补充（例如流式新闻的后续文章）：只输出新内容，不再播放警报音
+        self.followup = followup
+        self.created_at = datetime.now()
+        # 触发警报的行情被接收的时间（perf_counter_ns），用于统计端到端延迟
+        self.received_ns = received_ns
+        self.submitted_ns = 0
+        # 被合并（覆盖）的同股票警报数量
+        self.collapsed = 0
+
+    def format(self) -> str:
+        """Human readable alert text."""
+        timestamp = self.created_at.strftime("%Y-%m-%d %H:%M:%S")
+        if self.followup:
+            return f"\n{timestamp} {self.symbol} 新闻更新:\n{self.news}\n"
+        message = (
+            f"\n警报时间: {timestamp}\n"
+            f"股票: {self.symbol}\n"
+            f"当前价格: ${self.current_price:.2f}\n"
+            f"价格变动: ${self.price_change:.2f}\n"
+            f"百分比变动: {self.percentage_change:.2f}%\n"
+        )
+        if self.reason:
+            message += f"触发规则: {self.reason}\n"
+        if self.collapsed:
+            message += f"(期间另有 {self.collapsed} 条同股票警报已合并)\n"
+        if self.news:
+            message += f"\n{self.news}\n"
+        return message
+
+    def to_dict(self) -> dict:
+        return {
+            'symbol': self.symbol,
+            'current_price': self.current_price,
+            'price_change': self.price_change,
+            'percentage_change': self.percentage_change,
+            'created_at': self.created_at.isoformat(),
+            'collapsed': self.collapsed,
+            'reason': self.reason,
+            'news': self.news,
+            'followup': self.followup,
+        }
+
+
+class AlertSink:
+    """
+    Base class for alert outputs. ``emit`` raises TimeoutError when it overruns ``timeout``.
+
+    Sinks marked ``slow`` (external commands, network calls) are delivered by
+    their own worker threads so they never hold up the other sinks.
+    """
+
+    name = 'sink'
+    slow = False
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+
+    def emit(self, alert: Alert):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SoundSink(AlertSink):
+    """Plays the alert sound with the system ``afplay`` command."""
+
+    name = 'sound'
+    slow = True
+
+    def __init__(self, sound_file: str, timeout: Optional[float] = 10.0):
+        super().__init__(timeout)
+        self.sound_file = sound_file
+        # 音频文件在第一次播放时才检查，不拖慢启动
+        self._available: Optional[bool] = None
+
+    def emit(self, alert: Alert):
+        if alert.followup:
+            return
+        if self._available is None:
+            self._available = bool(self.sound_file) and os.path.exists(self.sound_file)
+            if not self._available:
+                logger.warning(f"Alert sound file not found, sound alerts disabled: {self.sound_file}")
+        if not self._available:
+            return
+        try:
+            subprocess.run(['afplay', self.sound_file], check=True, timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            raise TimeoutError(f"afplay exceeded {self.timeout}s")
+        except subprocess.CalledProcessError as e:
+            print(f"播放警报音失败: {e}")
+        except FileNotFoundError:
+            print("警告: 在此系统上找不到 afplay 命令")
+
+
+class StdoutSink(AlertSink):
+    """Prints the alert block to stdout."""
+
+    name = 'stdout'
+
+    def emit(self, alert: Alert):
+        print("\n" + "="*50 + "\n" + alert.format() + "\n" + "="*50)
+
+
+class FileSink(AlertSink):
+    """Appends one JSON line per alert to a file."""
+
+    name = 'file'
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def emit(self, alert: Alert):
+        line = json.dumps(alert.to_dict(), ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class WebhookSink(AlertSink):
+    """POSTs the alert as JSON to an HTTP endpoint."""
+
+    name = 'webhook'
+    slow = True
+
+    def __init__(self, url: str, timeout: Optional[float] = 2.0):
+        super().__init__(timeout)
+        # requests 只在配置了 webhook 输出时才导入
+        import requests
+        self.url = url
+        self._timeout_error = requests.Timeout
+        self.session = requests.Session()
+
+    def emit(self, alert: Alert):
+        try:
+            response = self.session.post(self.url, json=alert.to_dict(), timeout=self.timeout)
+        except self._timeout_error:
+            raise TimeoutError(f"webhook exceeded {self.timeout}s")
+        if response.status_code >= 300:
+            raise RuntimeError(f"webhook returned status {response.status_code}")
+
+    def close(self):
+        self.session.close()
+
+
+def build_sinks(sink_configs: List[dict], sound_file: Optional[str] = None) -> List[AlertSink]:
+    """
+    Create sinks from the ``alert_dispatch.sinks`` config list.
+
+    Args:
+        sink_configs: Dicts with a ``type`` key (sound, stdout, file, webhook) and sink options
+        sound_file: Default sound file for ``sound`` sinks (``settings.sound_file``)
+    """
+    sinks = []
+    for sink_config in sink_configs:
+        sink_type = sink_config['type']
+        if sink_type == 'sound':
+            sinks.append(SoundSink(sink_config.get('sound_file', sound_file),
+                                   timeout=sink_config.get('timeout', 10.0)))
+        elif sink_type == 'stdout':
+            sinks.append(StdoutSink())
+        elif sink_type == 'file':
+            sinks.append(FileSink(sink_config['path']))
+        elif sink_type == 'webhook':
+            sinks.append(WebhookSink(sink_config['url'], timeout=sink_config.get('timeout', 2.0)))
+        else:
+            raise ValueError(f"未知的警报输出类型: {sink_type}")
+    return sinks
+
+
+class LatencyRecorder:
+    """Keeps the most recent latency samples (in nanoseconds) for percentile reporting."""
+
+    def __init__(self, max_samples: int = 10000):
+        self._samples = deque(maxlen=max_samples)
+        self.max_ns = 0
+
+    def record(self, value_ns: int):
+        self._samples.append(value_ns)
+        if value_ns > self.max_ns:
+            self.max_ns = value_ns
+
+    def summary(self) -> Dict[str, float]:
+        """Return count, p50, p99 and max in milliseconds."""
+        samples = sorted(self._samples)
+        if not samples:
+            return {'count': 0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+        return {
+            'count': len(samples),
+            'p50_ms': samples[len(samples) // 2] / 1e6,
+            'p99_ms': samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1e6,
+            'max_ms': self.max_ns / 1e6,
+        }
+
+
+class _DeliveryLane:
+    """
+    Pending alerts and delivery threads for one group of sinks.
+
+    While an alert for a symbol is still waiting, newer alerts for the same
+    symbol replace it in place. A worker never picks a symbol whose previous
+    alert is still being delivered by another worker, so alerts for one
+    symbol reach the sinks in the order they were submitted.
+    """
+
+    def __init__(self, name: str, sinks: List[AlertSink], max_queue: int, workers: int,
+                 on_delivered: Optional[Callable[['_DeliveryLane', Alert, int], None]] = None):
+        self.name = name
+        self.sinks = sinks
+        self.max_queue = max_queue
+        self.workers = workers
+        self.on_delivered = on_delivered
+        self._pending: Dict[str, Alert] = {}
+        self._order = deque()
+        # 正在输出的股票，同一股票的下一条警报要等它输出完
+        self._active = set()
+        self._cond = threading.Condition()
+        self._running = False
+        self._threads: List[threading.Thread] = []
+
+        self.delivered = 0
+        self.collapsed = 0
+        self.dropped = 0
+        self.sink_errors: Dict[str, int] = {sink.name: 0 for sink in sinks}
+        self.sink_timeouts: Dict[str, int] = {sink.name: 0 for sink in sinks}
+        # 从提交到本组输出完成的耗时
+        self.latency = LatencyRecorder()
+
+    def start(self):
+        self._running = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"alert-{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, alert: Alert) -> bool:
+        with self._cond:
+            pending = self._pending.get(alert.symbol)
+            if pending is not None:
+                alert.collapsed = pending.collapsed + 1
+                # 合并时保留尚未发出的新闻内容；补充内容接在尚未发出的内容之后
+                if alert.news is None:
+                    alert.news = pending.news
+                elif alert.followup and pending.news:
+                    alert.news = f"{pending.news}\n{alert.news}"
+                alert.followup = alert.followup and pending.followup
+                self._pending[alert.symbol] = alert
+                self.collapsed += 1
+                return True
+            if len(self._pending) >= self.max_queue:
+                self.dropped += 1
+                return False
+            self._pending[alert.symbol] = alert
+            self._order.append(alert.symbol)
+            self._cond.notify()
+            return True
+
+    def _next(self) -> Optional[Alert]:
+        """Take the oldest pending alert whose symbol is not being delivered (called with the lock held)."""
+        for i, symbol in enumerate(self._order):
+            if symbol not in self._active:
+                del self._order[i]
+                self._active.add(symbol)
+                return self._pending.pop(symbol)
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                alert = self._next()
+                while alert is None:
+                    if not self._running and not self._order:
+                        return
+                    self._cond.wait()
+                    alert = self._next()
+            try:
+                self._deliver(alert)
+            finally:
+                with self._cond:
+                    self._active.discard(alert.symbol)
+                    # 同一股票可能有等待中的警报，唤醒其他线程重新挑选
+                    self._cond.notify_all()
+
+    def _deliver(self, alert: Alert):
+        timeouts, errors = [], []
+        for sink in self.sinks:
+            try:
+                sink.emit(alert)
+            except TimeoutError as e:
+                timeouts.append(sink.name)
+                logger.warning(f"Alert sink {sink.name} timed out for {alert.symbol}: {e}")
+            except Exception as e:
+                errors.append(sink.name)
+                logger.error(f"Alert sink {sink.name} failed for {alert.symbol}: {str(e)}")
+        with self._cond:
+            self.delivered += 1
+            for name in timeouts:
+                self.sink_timeouts[name] += 1
+            for name in errors:
+                self.sink_errors[name] += 1
+        delivered_ns = time.perf_counter_ns()
+        self.latency.record(delivered_ns - alert.submitted_ns)
+        if self.on_delivered is not None:
+            self.on_delivered(self, alert, delivered_ns)
+
+    def stop(self, timeout: float):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'queued': len(self._pending),
+                'delivered': self.delivered,
+                'collapsed': self.collapsed,
+                'dropped': self.dropped,
+                'dispatch_latency': self.latency.summary(),
+            }
+
+
+class AlertDispatcher:
+    """
+    Delivers alerts to sinks from bounded queues served by worker threads.
+
+    ``submit`` never blocks on I/O: it only takes a lock and appends to the
+    pending queues. Fast sinks (stdout, file) share one delivery lane and run
+    in order; every slow sink (sound, webhook) gets a lane of its own, so a
+    10 second ``afplay`` never delays the printed alert. Within each lane a
+    burst for one symbol collapses into one delivery carrying the latest
+    price, and alerts for one symbol are delivered in order.
+    """
+
+    def __init__(self, sinks: List[AlertSink], max_queue: int = 1000, workers: int = 2,
+                 on_delivered: Optional[Callable[[Alert, int], None]] = None,
+                 on_lane_delivered: Optional[Callable[[str, Alert, int], None]] = None):
+        """
+        Args:
+            sinks: Outputs every alert is delivered to; fast sinks run in this order
+            max_queue: Maximum number of distinct symbols waiting for delivery, per lane
+            workers: Number of delivery threads per lane
+            on_delivered: ``callback(alert, delivered_ns)`` after the fast sinks ran
+                (after the first slow sink if there are no fast ones), e.g. for metrics
+            on_lane_delivered: ``callback(lane_name, alert, delivered_ns)`` after each lane,
+                including the slow ones, delivered an alert
+        """
+        self.sinks = sinks
+        self.max_queue = max_queue
+        self.workers = workers
+        self.on_delivered = on_delivered
+        self.on_lane_delivered = on_lane_delivered
+        fast = [sink for sink in sinks if not sink.slow]
+        slow = [sink for sink in sinks if sink.slow]
+        groups = [('main', fast)] if fast or not slow else []
+        groups += [(f"{sink.name}-{i}", [sink]) for i, sink in enumerate(slow)]
+        # 第一个输出组完成时记为警报已送达（统计延迟和 on_delivered 回调），各组另有自己的延迟
+        self.lanes = [_DeliveryLane(name, group, max_queue, workers, self._delivered) for name, group in groups]
+        self._running = False
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        # submit 调用本身的耗时（即价格处理线程被阻塞的时间）
+        self.submit_latency = LatencyRecorder()
+        # 从提交到第一个输出组完成的耗时
+        self.dispatch_latency = LatencyRecorder()
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        for lane in self.lanes:
+            lane.start()
+
+    def submit(self, alert: Alert) -> bool:
+        """
+        Queue an alert for delivery without waiting for any sink.
+
+        Returns:
+            False if the first lane's queue was full and the alert was dropped there
+        """
+        started = time.perf_counter_ns()
+        alert.submitted_ns = started
+        primary, *others = self.lanes
+        # 各输出组分别合并同股票警报，需要各自的副本
+        for lane in others:
+            lane.submit(copy.copy(alert))
+        accepted = primary.submit(alert)
+        with self._lock:
+            self.submitted += 1
+        self.submit_latency.record(time.perf_counter_ns() - started)
+        return accepted
+
+    def _delivered(self, lane: _DeliveryLane, alert: Alert, delivered_ns: int):
+        if lane is self.lanes[0]:
+            self.dispatch_latency.record(delivered_ns - alert.submitted_ns)
+            if self.on_delivered is not None:
+                self.on_delivered(alert, delivered_ns)
+        if self.on_lane_delivered is not None:
+            self.on_lane_delivered(lane.name, alert, delivered_ns)
+
+    def stop(self, timeout: float = 5.0):
+        """Deliver what is still queued, then stop the workers and close sinks."""
+        self._running = False
+        for lane in self.lanes:
+            lane.stop(timeout)
+        for sink in self.sinks:
+            sink.close()
+
+    def stats(self) -> dict:
+        """Counters and latency summaries for monitoring (top-level counts are for the first lane)."""
+        lanes = {lane.name: lane.stats() for lane in self.lanes}
+        primary = lanes[self.lanes[0].name]
+        sink_errors, sink_timeouts = {}, {}
+        for lane in self.lanes:
+            sink_errors.update(lane.sink_errors)
+            sink_timeouts.update(lane.sink_timeouts)
+        return {
+            'submitted': self.submitted,
+            'delivered': primary['delivered'],
+            'collapsed': primary['collapsed'],
+            'dropped': primary['dropped'],
+            'queued': primary['queued'],
+            'lanes': lanes,
+            'sink_errors': sink_errors,
+            'sink_timeouts': sink_timeouts,
+            'submit_latency': self.submit_latency.summary(),
+            'dispatch_latency': self.dispatch_latency.summary(),
+        }
@@ -0,0 +1,220 @@
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+from tick_batch import SymbolUpdate, TickBatch
+
+# 缓冲区已满（待处理的股票数达到上限）时对新股票的处理方式
+DROP_NEWEST = 'drop_newest'   # 丢弃新到的更新
+DROP_OLDEST = 'drop_oldest'   # 丢弃等待最久的股票的更新
+BLOCK = 'block'               # 等待处理线程腾出空间，超时后丢弃新到的更新
+OVERFLOW_POLICIES = (DROP_NEWEST, DROP_OLDEST, BLOCK)
+
+
+def merge_update(pending: SymbolUpdate, update: SymbolUpdate):
+    """Fold a newer update into a pending one, keeping the extremes in between."""
+    volume = pending.volume + update.volume
+    if volume > 0:
+        pending.vwap = (pending.vwap * pending.volume + update.vwap * update.volume) / volume
+    else:
+        pending.vwap = (pending.vwap * pending.count + update.vwap * update.count) / (pending.count + update.count)
+    pending.volume = volume
+    pending.count += update.count
+    pending.price = update.price
+    if update.high > pending.high:
+        pending.high = update.high
+    if update.low < pending.low:
+        pending.low = update.low
+    if update.timestamp:
+        pending.timestamp = update.timestamp
+
+
+class CoalescingBuffer:
+    """
+    Bounded hand-off between the feed and the processing thread.
+
+    Holds at most one pending update per symbol. A newer update for a symbol
+    that is still waiting is merged into it: the last price wins while the
+    high/low seen in between are kept, so the evaluator can still detect a
+    breach that happened between two reads. When processing falls behind,
+    the buffer therefore stays as large as the watchlist and the next read
+    always sees current prices.
+    """
+
+    def __init__(self, max_symbols: int = 10000, overflow: str = DROP_OLDEST, block_timeout: float = 0.5):
+        """
+        Args:
+            max_symbols: Maximum number of symbols waiting at once
+            overflow: One of OVERFLOW_POLICIES, applied when a new symbol arrives at a full buffer
+            block_timeout: Seconds ``put`` waits for space under the ``block`` policy
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"未知的溢出策略: {overflow}（可选: {', '.join(OVERFLOW_POLICIES)}）")
+        self.max_symbols = max_symbols
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+
+        self._pending: Dict[str, SymbolUpdate] = {}
+        # 每个股票第一次入队的接收时间；字典顺序即入队顺序
+        self._received: Dict[str, int] = {}
+        self._cond = threading.Condition()
+        self._busy = 0
+
+        self.received = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def qsize(self) -> int:
+        return len(self._pending)
+
+    def put(self, batch: TickBatch):
+        """Add a batch's updates, merging with pending updates of the same symbols."""
+        with self._cond:
+            pending = self._pending
+            received = self._received
+            for update in batch.updates:
+                self.received += 1
+                symbol = update.symbol
+                existing = pending.get(symbol)
+                if existing is not None:
+                    merge_update(existing, update)
+                    self.coalesced += 1
+                    continue
+                if len(pending) >= self.max_symbols and not self._make_room():
+                    self.dropped += 1
+                    continue
+                pending[symbol] = update
+                received[symbol] = batch.received_ns
+            if len(pending) > self.max_depth:
+                self.max_depth = len(pending)
+            self._cond.notify_all()
+
+    def _make_room(self) -> bool:
+        if self.overflow == DROP_OLDEST:
+            symbol = next(iter(self._received))
+            del self._received[symbol]
+            del self._pending[symbol]
+            self.dropped += 1
+            return True
+        if self.overflow == BLOCK:
+            return self._cond.wait_for(lambda: len(self._pending) < self.max_symbols, self.block_timeout)
+        return False
+
+    def get(self, max_items: Optional[int] = None, timeout: Optional[float] = None) -> Optional[TickBatch]:
+        """
+        Take pending updates (oldest first) as one batch.
+
+        The batch's ``received_ns`` is the earliest receive time among the
+        taken updates. Every successful ``get`` must be paired with a
+        ``task_done`` call. Returns None on timeout.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._pending, timeout):
+                return None
+            received_ns = next(iter(self._received.values()))
+            if max_items is None or len(self._pending) <= max_items:
+                updates = list(self._pending.values())
+                # 原地清空：阻塞中的 put 仍持有这两个字典的引用
+                self._pending.clear()
+                self._received.clear()
+            else:
+                symbols = list(self._received)[:max_items]
+                updates = [self._pending.pop(symbol) for symbol in symbols]
+                for symbol in symbols:
+                    del self._received[symbol]
+            self._busy += 1
+            self._cond.notify_all()
+        return TickBatch(updates, received_ns)
+
+    def task_done(self):
+        with self._cond:
+            self._busy -= 1
+            self._cond.notify_all()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything put so far has been taken and processed."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def stats(self) -> dict:
+        """Counters; ``max_depth`` is the high-water mark since the previous call."""
+        with self._cond:
+            depth = len(self._pending)
+            max_depth, self.max_depth = self.max_depth, depth
+        return {
+            'depth': depth,
+            'max_depth': max_depth,
+            'received': self.received,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+        }
+
+
+class BatchQueue:
+    """
+    Lossless FIFO hand-off with the same interface as CoalescingBuffer.
+
+    Every batch is handed to the processing thread unchanged and in order,
+    one per ``get``, so a replay evaluates exactly the recorded frames and
+    gives the same result on every run. ``put`` blocks while
+    ``max_batches`` batches are waiting instead of dropping anything.
+    """
+
+    def __init__(self, max_batches: int = 1000):
+        """
+        Args:
+            max_batches: Number of waiting batches at which ``put`` blocks
+        """
+        self.max_batches = max_batches
+        self._batches: deque = deque()
+        self._cond = threading.Condition()
+        self._busy = 0
+
+        self.received = 0
+        self.max_depth = 0
+
+    def qsize(self) -> int:
+        return len(self._batches)
+
+    def put(self, batch: TickBatch):
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._batches) < self.max_batches)
+            self._batches.append(batch)
+            self.received += len(batch.updates)
+            if len(self._batches) > self.max_depth:
+                self.max_depth = len(self._batches)
+            self._cond.notify_all()
+
+    def get(self, max_items: Optional[int] = None, timeout: Optional[float] = None) -> Optional[TickBatch]:
+        """Take the oldest batch (``max_items`` is ignored). Returns None on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._batches, timeout):
+                return None
+            batch = self._batches.popleft()
+            self._busy += 1
+            self._cond.notify_all()
+        return batch
+
+    def task_done(self):
+        with self._cond:
+            self._busy -= 1
+            self._cond.notify_all()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything put so far has been taken and processed."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._batches and not self._busy, timeout)
+
+    def stats(self) -> dict:
+        """Same keys as CoalescingBuffer.stats; nothing is ever coalesced or dropped."""
+        with self._cond:
+            depth = len(self._batches)
+            max_depth, self.max_depth = self.max_depth, depth
+        return {
+            'depth': depth,
+            'max_depth': max_depth,
+            'received': self.received,
+            'coalesced': 0,
+            'dropped': 0,
+        }
@@ -0,0 +1,123 @@
+import logging
+import os
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from utils import load_config
+
+logger = logging.getLogger(__name__)
+
+
+class StocksDiff:
+    """Difference between two ``stocks`` lists."""
+
+    __slots__ = ('added', 'removed', 'changed')
+
+    def __init__(self, added: List[dict], removed: List[dict], changed: List[dict]):
+        self.added = added        # 新增股票的配置
+        self.removed = removed    # 删除股票的（旧）配置
+        self.changed = changed    # 阈值、规则或类型有变化的股票（新配置）
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self):
+        return (f"StocksDiff(added={[s['symbol'] for s in self.added]}, "
+                f"removed={[s['symbol'] for s in self.removed]}, "
+                f"changed={[s['symbol'] for s in self.changed]})")
+
+
+def diff_stocks(old: List[dict], new: List[dict]) -> StocksDiff:
+    old_by_symbol = {stock['symbol']: stock for stock in old}
+    new_by_symbol = {stock['symbol']: stock for stock in new}
+    added = [stock for symbol, stock in new_by_symbol.items() if symbol not in old_by_symbol]
+    removed = [stock for symbol, stock in old_by_symbol.items() if symbol not in new_by_symbol]
+    changed = [stock for symbol, stock in new_by_symbol.items()
+               if symbol in old_by_symbol and old_by_symbol[symbol] != stock]
+    return StocksDiff(added, removed, changed)
+
+
+def changed_sections(old: dict, new: dict) -> List[str]:
+    """
+    Top-level sections whose changes cannot be applied while running.
+
+    ``stocks`` and ``news_alert.trigger_conditions`` are reloadable and
+    therefore not reported.
+    """
+    sections = []
+    for key in sorted(set(old) | set(new)):
+        if key == 'stocks' or old.get(key) == new.get(key):
+            continue
+        if key == 'news_alert':
+            old_news = {k: v for k, v in (old.get(key) or {}).items() if k != 'trigger_conditions'}
+            new_news = {k: v for k, v in (new.get(key) or {}).items() if k != 'trigger_conditions'}
+            if old_news == new_news:
+                continue
+        sections.append(key)
+    return sections
+
+
+class ConfigWatcher:
+    """
+    Polls the config file and hands every successfully parsed new version
+    to ``on_change``.
+
+    Only the file's mtime and size are checked on each poll. A file that
+    fails to parse (for example while an editor is still writing it) is
+    logged and ignored; the running configuration stays in place.
+    """
+
+    def __init__(self, path: str, on_change: Callable[[dict], None], interval: float = 2.0):
+        """
+        Args:
+            path: Config file to watch
+            on_change: Called with the newly loaded config, from the watcher thread
+            interval: Seconds between polls
+        """
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self._signature = self._stat()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reloads = 0
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='config-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def check(self) -> bool:
+        """Reload once if the file changed; returns True when ``on_change`` ran."""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            config = load_config(self.path)
+            if not isinstance(config, dict) or not config.get('stocks'):
+                raise ValueError("配置文件缺少 stocks")
+        except Exception as e:
+            logger.error(f"Failed to reload {self.path}, keeping the running config: {e}")
+            return False
+        self.on_change(config)
+        self.reloads += 1
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception(f"Failed to apply reloaded config {self.path}")
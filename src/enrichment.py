@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import List, Optional
+
+from alert_dispatcher import LatencyRecorder
+from news_searcher import NewsSearcher
+
+logger = logging.getLogger(__name__)
+
+
+class NewsEnrichmentStage:
+    """
+    Runs news searches for validator triggers on a private asyncio loop.
+
+    ``submit`` is called from the price processing thread and only schedules
+    a coroutine on the loop thread, so a slow LLM call never blocks tick
+    processing. At most ``concurrency`` searches run at once; when more than
+    ``max_pending`` triggers are waiting, new ones are dropped and counted.
+    """
+
+    def __init__(self, searcher: NewsSearcher, alert_manager, concurrency: int = 4, max_pending: int = 100):
+        """
+        Args:
+            searcher: NewsSearcher used for the lookups
+            alert_manager: AlertManager that receives the enriched alerts
+            concurrency: Maximum number of searches in flight
+            max_pending: Maximum number of triggers queued or in flight
+        """
+        self.searcher = searcher
+        self.alert_manager = alert_manager
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+
+        self.pending = 0
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        # 从提交到新闻警报发出的耗时（流式响应时为最后一篇新闻发出的时间）
+        self.latency = LatencyRecorder()
+        # 流式响应时，从提交到第一篇新闻发出的耗时
+        self.first_article_latency = LatencyRecorder()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run_loop():
+            asyncio.set_event_loop(self._loop)
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run_loop, name='news-enrichment', daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def submit(self, symbol: str, movement: dict, is_index: bool = False) -> bool:
+        """
+        Schedule a news search for a validator trigger without waiting for it.
+
+        Returns:
+            False if the stage is saturated and the trigger was dropped
+        """
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self.pending += 1
+            self.submitted += 1
+        asyncio.run_coroutine_threadsafe(
+            self._enrich(symbol, movement, is_index, time.perf_counter_ns()), self._loop
+        )
+        return True
+
+    async def _enrich(self, symbol: str, movement: dict, is_index: bool, submitted_ns: int):
+        try:
+            async with self._semaphore:
+                self.in_flight += 1
+                try:
+                    if self.searcher.stream:
+                        articles = await self._enrich_streaming(symbol, movement, is_index, submitted_ns)
+                    else:
+                        articles = await self.searcher.search_news(symbol, is_index=is_index)
+                finally:
+                    self.in_flight -= 1
+            if not (self.searcher.stream and articles):
+                # 流式响应时每篇新闻到达时已经发出；没有找到新闻时仍发出一条提示
+                self._alert(symbol, articles, movement)
+            self.latency.record(time.perf_counter_ns() - submitted_ns)
+            with self._lock:
+                self.completed += 1
+        except Exception as e:
+            logger.error(f"News enrichment failed for {symbol}: {str(e)}")
+            with self._lock:
+                self.failed += 1
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    async def _enrich_streaming(self, symbol: str, movement: dict, is_index: bool, submitted_ns: int) -> List[dict]:
+        """
+        Send the alert as soon as the first article is parsed from the stream.
+
+        Later articles go out as follow-ups carrying only the new article,
+        so sinks print each article once and the alert sound plays once.
+        """
+        articles: List[dict] = []
+        async for article in self.searcher.search_news_stream(symbol, is_index=is_index):
+            articles.append(article)
+            if len(articles) == 1:
+                self._alert(symbol, articles, movement)
+                self.first_article_latency.record(time.perf_counter_ns() - submitted_ns)
+            else:
+                self._alert_followup(symbol, len(articles), article, movement)
+        return articles
+
+    def _alert(self, symbol: str, articles: List[dict], movement: dict):
+        message = self.searcher.format_news_alert(symbol, articles, movement)
+        self.alert_manager.trigger_alert(
+            symbol,
+            movement['current_price'],
+            movement['absolute_change'],
+            movement['percentage_change'],
+            news=message
+        )
+
+    def _alert_followup(self, symbol: str, index: int, article: dict, movement: dict):
+        self.alert_manager.trigger_alert(
+            symbol,
+            movement['current_price'],
+            movement['absolute_change'],
+            movement['percentage_change'],
+            news=self.searcher.format_news_followup(symbol, index, article),
+            followup=True
+        )
+
+    def stats(self) -> dict:
+        """Queue depth, counters, latency and cache statistics."""
+        with self._lock:
+            counters = {
+                'pending': self.pending,
+                'in_flight': self.in_flight,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'dropped': self.dropped,
+            }
+        counters['latency'] = self.latency.summary()
+        counters['first_article'] = self.first_article_latency.summary()
+        counters['cache'] = self.searcher.cache_stats
+        return counters
+
+    def stop(self, timeout: float = 5.0):
+        """Close the HTTP session and stop the loop thread."""
+        if self._loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.searcher.close(), self._loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"Error closing news searcher: {str(e)}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._loop = None
+        self._thread = None
@@ -0,0 +1,175 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from tick_batch import SymbolUpdate
+
+
+class Evaluation:
+    """Result of evaluating one micro-batch. All arrays are aligned per evaluated tick."""
+
+    __slots__ = ('positions', 'ids', 'prices', 'previous', 'change', 'percentage', 'has_previous', 'breach',
+                 'extremes', 'extreme_change', 'extreme_percentage')
+
+    def __init__(self, positions, ids, prices, previous, change, percentage, has_previous, breach,
+                 extremes=None, extreme_change=None, extreme_percentage=None):
+        self.positions = positions        # 在输入 updates 列表中的下标
+        self.ids = ids                    # 股票ID
+        self.prices = prices              # 最后成交价
+        self.previous = previous          # 上一个价格（首次出现为 NaN）
+        self.change = change              # 最后成交价相对前值的变动
+        self.percentage = percentage
+        self.has_previous = has_previous
+        self.breach = breach              # 是否触发警报阈值
+        # 更新内偏离前值最大的价格（最后价、最高价或最低价）及其变动；
+        # 批次中没有合并多笔成交的更新时为 None，与 prices/change 相同
+        self.extremes = extremes
+        self.extreme_change = extreme_change
+        self.extreme_percentage = extreme_percentage
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class ThresholdEvaluator:
+    """
+    Evaluates price-change thresholds for many symbols at once.
+
+    Last prices and thresholds are kept in NumPy arrays indexed by a dense
+    symbol id, so a micro-batch of updates is checked with a handful of
+    vectorized operations instead of per-tick dict lookups.
+    """
+
+    def __init__(self, alerts: Dict[str, dict]):
+        """
+        Args:
+            alerts: Mapping of symbol to its ``alerts`` config
+                (``price_change`` and ``percentage_change`` thresholds)
+        """
+        self.symbols: List[str] = list(alerts)
+        self.symbol_ids: Dict[str, int] = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.price_thresholds = np.array(
+            [alerts[symbol]['price_change'] for symbol in self.symbols], dtype=np.float64)
+        self.pct_thresholds = np.array(
+            [alerts[symbol]['percentage_change'] for symbol in self.symbols], dtype=np.float64)
+        self.last_prices = np.full(len(self.symbols), np.nan)
+
+    def rebuild(self, alerts: Dict[str, dict], carry_over: bool = True) -> 'ThresholdEvaluator':
+        """
+        Build an evaluator for new thresholds, carrying over the last price
+        of every symbol that is still configured.
+
+        With ``carry_over`` False only the thresholds are built; call
+        ``carry_over`` later (e.g. under the lock that guards evaluation)
+        so no update made in between is lost.
+        """
+        evaluator = ThresholdEvaluator(alerts)
+        if carry_over:
+            evaluator.carry_over(self)
+        return evaluator
+
+    def carry_over(self, old: 'ThresholdEvaluator'):
+        """Copy the last price of every symbol also known to ``old``."""
+        for symbol, new_id in self.symbol_ids.items():
+            old_id = old.symbol_ids.get(symbol)
+            if old_id is not None:
+                self.last_prices[new_id] = old.last_prices[old_id]
+
+    def evaluate(self, updates: List[SymbolUpdate]) -> Evaluation:
+        """
+        Compare every update with the symbol's previous price.
+
+        Updates for symbols without configured thresholds are ignored. When a
+        symbol appears several times in one batch, each occurrence is compared
+        with the one before it, exactly as if they had been processed one by one.
+
+        An update's high and low (trades folded into it by frame aggregation
+        or coalescing) are checked too, so a spike that reverted before the
+        update was read still raises an alert. The reported price and change
+        stay those of the last trade; the extreme is kept separately.
+        """
+        count = len(updates)
+        symbol_ids = self.symbol_ids
+        ids = np.fromiter((symbol_ids.get(u.symbol, -1) for u in updates), dtype=np.int64, count=count)
+        prices = np.fromiter((u.price for u in updates), dtype=np.float64, count=count)
+        # 只有合并了多笔成交的更新才有区间，通常是少数，只为它们读取最高/最低价
+        ranged = [i for i, u in enumerate(updates) if u.count > 1]
+        highs = lows = None
+        if ranged:
+            highs = prices.copy()
+            lows = prices.copy()
+            highs[ranged] = [updates[i].high for i in ranged]
+            lows[ranged] = [updates[i].low for i in ranged]
+
+        known = ids >= 0
+        positions = np.flatnonzero(known)
+        if len(positions) != count:
+            ids = ids[positions]
+            prices = prices[positions]
+            if highs is not None:
+                highs = highs[positions]
+                lows = lows[positions]
+
+        previous = self.last_prices[ids]
+
+        # 批内同一股票多次出现时，前值取批内上一次出现的价格
+        order = np.argsort(ids, kind='stable')
+        sorted_ids = ids[order]
+        repeat = sorted_ids[1:] == sorted_ids[:-1]
+        previous[order[1:][repeat]] = prices[order[:-1][repeat]]
+
+        # 每个股票只保存批内最后一次出现的价格
+        is_last = np.ones(len(order), dtype=bool)
+        is_last[:-1] = ~repeat
+        self.last_prices[sorted_ids[is_last]] = prices[order[is_last]]
+
+        change = prices - previous
+        with np.errstate(invalid='ignore', divide='ignore'):
+            percentage = change / previous * 100
+        extremes = extreme_change = extreme_percentage = None
+        breach_change, breach_percentage = change, percentage
+        if highs is not None:
+            # 取最后价、最高价、最低价中偏离前值最大的一个判断是否触发
+            high_change = highs - previous
+            use_high = np.abs(high_change) > np.abs(change)
+            extremes = np.where(use_high, highs, prices)
+            extreme_change = np.where(use_high, high_change, change)
+            low_change = lows - previous
+            use_low = np.abs(low_change) > np.abs(extreme_change)
+            extremes = np.where(use_low, lows, extremes)
+            extreme_change = np.where(use_low, low_change, extreme_change)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                extreme_percentage = extreme_change / previous * 100
+            breach_change, breach_percentage = extreme_change, extreme_percentage
+        has_previous = ~np.isnan(previous)
+        breach = has_previous & (
+            (np.abs(breach_change) >= self.price_thresholds[ids]) |
+            (np.abs(breach_percentage) >= self.pct_thresholds[ids])
+        )
+        return Evaluation(positions, ids, prices, previous, change, percentage, has_previous, breach,
+                          extremes, extreme_change, extreme_percentage)
+
+    def breaches(self, evaluation: Evaluation) -> Iterator[Tuple[int, str, float, float, float, Optional[str]]]:
+        """
+        Yield ``(position, symbol, price, change, percentage, reason)`` for each breaching tick.
+
+        ``price`` is the last trade. ``reason`` is None unless the threshold
+        was crossed by the update's high or low rather than its last price,
+        in which case it describes that extreme.
+        """
+        extremes = evaluation.extremes
+        for i in np.flatnonzero(evaluation.breach):
+            price = float(evaluation.prices[i])
+            reason = None
+            if extremes is not None and extremes[i] != price:
+                reason = (f"区间{'最高' if extremes[i] > price else '最低'}价 ${float(extremes[i]):.2f} "
+                          f"({float(evaluation.extreme_change[i]):+.2f}, "
+                          f"{float(evaluation.extreme_percentage[i]):+.2f}%)")
+            yield (
+                int(evaluation.positions[i]),
+                self.symbols[evaluation.ids[i]],
+                price,
+                float(evaluation.change[i]),
+                float(evaluation.percentage[i]),
+                reason,
+            )
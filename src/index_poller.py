@@ -0,0 +1,173 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tick_batch import SymbolUpdate
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REST_URL = "https://finnhub.io/api/v1"
+
+
+class TokenBucket:
+    """Thread-safe token bucket used to stay under the Finnhub call budget."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None, clock=time.monotonic):
+        """
+        Args:
+            rate_per_minute: Sustained number of calls allowed per minute
+            capacity: Burst size (defaults to one second's worth of calls, at least 1)
+            clock: Monotonic clock, injectable for tests
+        """
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take ``tokens`` if available.
+
+        Returns:
+            0.0 on success, otherwise the number of seconds until enough tokens accrue
+        """
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Block until ``tokens`` are available or ``timeout`` seconds pass."""
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0.0:
+                return True
+            if deadline is not None:
+                remaining = deadline - self._clock()
+                if remaining <= 0 or wait > remaining:
+                    return False
+            time.sleep(wait)
+
+
+class IndexPoller:
+    """Fetches index quotes concurrently over a pooled HTTP session."""
+
+    def __init__(self, api_key: str, symbols: List[str], calls_per_minute: float = 60,
+                 base_url: str = DEFAULT_REST_URL, max_workers: int = 8, timeout: float = 5.0):
+        """
+        Args:
+            api_key: Finnhub API key
+            symbols: Index symbols to poll
+            calls_per_minute: Finnhub REST budget shared by all polls
+            base_url: REST base URL (point it at a local stub server for testing)
+            max_workers: Number of concurrent requests / pooled connections
+            timeout: Per-request timeout in seconds
+        """
+        self.api_key = api_key
+        self.symbols = list(symbols)
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.bucket = TokenBucket(calls_per_minute)
+
+        # 复用连接，避免每次轮询都重新进行TLS握手
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='index-poller')
+
+        self._last_timestamps: Dict[str, int] = {}
+        # 计数器由多个请求线程同时更新
+        self._lock = threading.Lock()
+        self.skipped_unchanged = 0
+        self.skipped_rate_limited = 0
+        self.errors = 0
+
+    def fetch_quote(self, symbol: str, deadline: Optional[float] = None) -> Optional[dict]:
+        """
+        Fetch one quote, honouring the call budget. Returns None on failure.
+
+        Args:
+            symbol: Index symbol
+            deadline: ``time.monotonic()`` value after which no more rate-limit tokens are waited for
+        """
+        budget_timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if not self.bucket.acquire(timeout=budget_timeout):
+            with self._lock:
+                self.skipped_rate_limited += 1
+            return None
+        try:
+            response = self.session.get(
+                f"{self.base_url}/quote",
+                params={'symbol': symbol, 'token': self.api_key},
+                timeout=self.timeout
+            )
+            if response.status_code != 200:
+                logger.warning(f"Quote request for {symbol} failed. Status: {response.status_code}")
+                with self._lock:
+                    self.errors += 1
+                return None
+            return response.json()
+        except Exception as e:
+            logger.error(f"Error fetching quote for {symbol}: {str(e)}")
+            with self._lock:
+                self.errors += 1
+            return None
+
+    def _to_update(self, symbol: str, data: Optional[dict]) -> Optional[SymbolUpdate]:
+        if not data or 'c' not in data or not data.get('t'):
+            return None
+        # 报价时间戳未变化说明数据没有更新，跳过
+        if self._last_timestamps.get(symbol) == data['t']:
+            with self._lock:
+                self.skipped_unchanged += 1
+            return None
+        self._last_timestamps[symbol] = data['t']
+        return SymbolUpdate(symbol, float(data['c']), timestamp=int(data['t']) * 1000)
+
+    def poll(self, deadline: Optional[float] = None) -> List[SymbolUpdate]:
+        """
+        Fetch all symbols concurrently.
+
+        Args:
+            deadline: Seconds this poll may spend waiting for rate-limit tokens, shared
+                by all symbols; symbols that cannot get a token in time are skipped this round
+
+        Returns:
+            Updates for symbols whose quote timestamp moved since the last poll
+        """
+        # 整轮轮询共用一个截止时间，排队较晚的请求只能等待剩余的时间
+        expires = None if deadline is None else time.monotonic() + deadline
+        futures = [
+            (symbol, self._executor.submit(self.fetch_quote, symbol, expires))
+            for symbol in self.symbols
+        ]
+        updates = []
+        for symbol, future in futures:
+            update = self._to_update(symbol, future.result())
+            if update is not None:
+                updates.append(update)
+        return updates
+
+    def close(self):
+        """Release pooled connections and worker threads."""
+        self._executor.shutdown(wait=False)
+        self.session.close()
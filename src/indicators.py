@@ -0,0 +1,226 @@
+import math
+import time
+from typing import Dict, Optional, Tuple
+
+from tick_batch import SymbolUpdate
+from utils import get_market_calendar
+
+# 收益率标准差低于该值视为没有波动（衰减后的残余方差只剩舍入误差）
+MIN_STDEV = 1e-9
+
+
+class Indicator:
+    """
+    One per-symbol indicator updated in O(1) per tick.
+
+    Time-based indicators decay older observations by ``exp(-dt / window)``,
+    so a "5 minute" indicator is dominated by the last five minutes without
+    keeping any history. ``update`` receives the tick, the previous price
+    (None for the first tick) and the tick time in epoch ns.
+    """
+
+    __slots__ = ()
+    kind = 'indicator'
+    # 是否需要交易日历（构造时传入 calendar）
+    uses_calendar = False
+
+    def update(self, update: SymbolUpdate, previous: Optional[float], now_ns: int):
+        raise NotImplementedError
+
+
+class _Decaying(Indicator):
+    """
+    Shared decay bookkeeping: weight of the history after ``dt``.
+
+    Indicators that accumulate a ``weight`` (one per observation, decayed
+    like the values) expose how many recent observations they effectively
+    hold; after a long gap it falls back towards 1.
+    """
+
+    __slots__ = ('window_ns', 'last_ns')
+
+    def __init__(self, window_seconds: Optional[float]):
+        self.window_ns = window_seconds * 1e9 if window_seconds else None
+        self.last_ns: Optional[int] = None
+
+    def _decay(self, now_ns: int) -> float:
+        last_ns, self.last_ns = self.last_ns, now_ns
+        if last_ns is None or self.window_ns is None or now_ns <= last_ns:
+            return 1.0
+        return math.exp(-(now_ns - last_ns) / self.window_ns)
+
+
+class EMA(_Decaying):
+    """Time-weighted exponential moving average of the price."""
+
+    __slots__ = ('value',)
+    kind = 'ema'
+
+    def __init__(self, window_seconds: float):
+        super().__init__(window_seconds)
+        self.value: Optional[float] = None
+
+    def update(self, update, previous, now_ns):
+        decay = self._decay(now_ns)
+        if self.value is None:
+            self.value = update.price
+        else:
+            self.value += (1.0 - decay) * (update.price - self.value)
+
+
+class VWAP(_Decaying):
+    """
+    Volume-weighted average price, decayed over ``window_seconds``, or
+    cumulative over the current trading day when no window is given. The
+    cumulative form starts over at each regular session open of the
+    market calendar.
+    """
+
+    __slots__ = ('notional', 'volume', 'value', 'calendar', 'session_start', 'session_from', 'session_until')
+    kind = 'vwap'
+    uses_calendar = True
+
+    def __init__(self, window_seconds: Optional[float] = None, calendar=None):
+        """
+        Args:
+            window_seconds: Decay window; None for the cumulative session VWAP
+            calendar: MarketCalendar giving the session opens (the default
+                calendar file when not given)
+        """
+        super().__init__(window_seconds)
+        self.notional = 0.0
+        self.volume = 0.0
+        self.value: Optional[float] = None
+        self.calendar = calendar
+        # 最近一次常规时段的开盘时间
+        self.session_start: Optional[float] = None
+        # 当前所在时段的起止时间，由本指标自己缓存：按tick时间查询，不改动共享日历的状态
+        self.session_from = 0.0
+        self.session_until = 0.0
+
+    def reset(self):
+        """Start a new accumulation (for example at the session open)."""
+        self.notional = self.volume = 0.0
+        self.value = None
+
+    def update(self, update, previous, now_ns):
+        if self.window_ns is None:
+            now = now_ns / 1e9
+            if not self.session_from <= now < self.session_until:
+                # 累计 VWAP 从每个交易日常规时段开盘时重新开始
+                calendar = self.calendar or get_market_calendar()
+                self.session_from, self.session_until, session = calendar.session_state(now)
+                if session == 'regular' and self.session_from != self.session_start:
+                    self.reset()
+                    self.session_start = self.session_from
+        decay = self._decay(now_ns)
+        volume = update.volume
+        if volume <= 0:
+            return
+        # 合并后的更新自带区间 VWAP，按成交量加权累加
+        self.notional = self.notional * decay + update.vwap * volume
+        self.volume = self.volume * decay + volume
+        self.value = self.notional / self.volume
+
+
+class Volatility(_Decaying):
+    """
+    Exponentially weighted mean and standard deviation of tick returns.
+
+    Uses the weighted form of Welford's update, so the variance stays
+    numerically stable without storing any returns.
+    """
+
+    __slots__ = ('weight', 'mean', 'm2')
+    kind = 'volatility'
+
+    def __init__(self, window_seconds: float):
+        super().__init__(window_seconds)
+        self.weight = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(max(self.m2, 0.0) / self.weight) if self.weight > 0 else 0.0
+
+    def zscore(self, value: float) -> Optional[float]:
+        """How many standard deviations ``value`` is from the mean (None while flat)."""
+        stdev = self.stdev
+        if stdev < MIN_STDEV:
+            return None
+        return (value - self.mean) / stdev
+
+    def update(self, update, previous, now_ns):
+        if not previous:
+            return
+        decay = self._decay(now_ns)
+        value = (update.price - previous) / previous
+        self.weight = self.weight * decay + 1.0
+        delta = value - self.mean
+        self.mean += delta / self.weight
+        self.m2 = self.m2 * decay + delta * (value - self.mean)
+
+
+class AverageRange(_Decaying):
+    """ATR-style exponentially weighted average of each update's true range."""
+
+    __slots__ = ('weight', 'value')
+    kind = 'atr'
+
+    def __init__(self, window_seconds: float):
+        super().__init__(window_seconds)
+        self.weight = 0.0
+        self.value = 0.0
+
+    def update(self, update, previous, now_ns):
+        if previous is None:
+            return
+        # 真实波幅：本次更新的最高/最低价与上一笔价格共同构成的区间
+        true_range = max(update.high, previous) - min(update.low, previous)
+        decay = self._decay(now_ns)
+        self.weight = self.weight * decay + 1.0
+        self.value += (true_range - self.value) / self.weight
+
+
+INDICATOR_TYPES = {cls.kind: cls for cls in (EMA, VWAP, Volatility, AverageRange)}
+
+
+class IndicatorSet:
+    """
+    The indicators one symbol's rules reference.
+
+    Rules ask for an indicator by kind and window when they are bound, and
+    rules asking for the same one share a single instance, so every
+    indicator is updated once per tick however many rules read it. When
+    rules are recompiled, indicators the new rules still use are taken
+    over from ``reuse`` together with their state. ``calendar`` is handed
+    to indicators that follow trading sessions.
+    """
+
+    __slots__ = ('indicators', '_reuse', 'calendar')
+
+    def __init__(self, reuse: Optional['IndicatorSet'] = None, calendar=None):
+        self.indicators: Dict[Tuple[str, Optional[float]], Indicator] = {}
+        self._reuse = reuse.indicators if reuse is not None else {}
+        self.calendar = calendar
+
+    def __len__(self):
+        return len(self.indicators)
+
+    def get(self, kind: str, window_seconds: Optional[float] = None) -> Indicator:
+        key = (kind, float(window_seconds) if window_seconds else None)
+        indicator = self.indicators.get(key)
+        if indicator is None:
+            indicator = self._reuse.get(key)
+            if indicator is None:
+                cls = INDICATOR_TYPES[kind]
+                indicator = cls(key[1], calendar=self.calendar) if cls.uses_calendar else cls(key[1])
+            self.indicators[key] = indicator
+        return indicator
+
+    def update(self, update: SymbolUpdate, previous: Optional[float]):
+        # 优先使用交易所时间戳（毫秒），与价格窗口一致
+        now_ns = update.timestamp * 1_000_000 if update.timestamp else time.time_ns()
+        for indicator in self.indicators.values():
+            indicator.update(update, previous, now_ns)
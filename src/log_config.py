@@ -0,0 +1,118 @@
+import atexit
+import json
+import logging
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Optional
+
+# 监控器的日志分类，每个分类可以单独设置级别
+CATEGORIES = ('frames', 'ticks', 'alerts', 'latency')
+
+DEFAULT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+DEFAULT_CATEGORY_LEVELS = {
+    'frames': 'WARNING',   # 原始WebSocket消息（DEBUG级别时记录每一帧）
+    'ticks': 'INFO',       # 逐tick价格变动记录在DEBUG级别
+    'alerts': 'INFO',
+    'latency': 'INFO',
+}
+
+_listener: Optional[QueueListener] = None
+
+
+def get_logger(category: str) -> logging.Logger:
+    """Return the logger for a monitor category (``monitor.<category>``)."""
+    return logging.getLogger(f"monitor.{category}")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; structured fields come from ``extra={'fields': {...}}``."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stock ``prepare`` renders the message in the calling thread; records
+    only cross threads inside this process, so they can be passed through
+    untouched and the hot path pays nothing but the enqueue.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(config: Optional[dict] = None, stream=None) -> QueueListener:
+    """
+    Configure process-wide logging from the ``logging`` config section.
+
+    Log calls only enqueue the record; a background listener formats it and
+    writes it out, so slow terminals never stall price processing.
+
+    Args:
+        config: ``logging`` section (level, format, categories, stream);
+            ``format`` is ``text``, ``json`` or a custom ``logging.Formatter``
+            pattern, ``stream`` is ``stdout`` (default) or ``stderr``
+        stream: Output stream, overrides ``config['stream']``
+
+    Returns:
+        The running QueueListener
+    """
+    global _listener
+    config = config or {}
+
+    if _listener is not None:
+        _listener.stop()
+
+    if stream is None:
+        stream = sys.stderr if config.get('stream') == 'stderr' else sys.stdout
+    output = logging.StreamHandler(stream)
+    log_format = config.get('format') or 'text'
+    if log_format == 'json':
+        output.setFormatter(JsonFormatter())
+    elif log_format == 'text':
+        output.setFormatter(logging.Formatter(DEFAULT_FORMAT))
+    else:
+        # 其他值按 logging 的格式字符串处理
+        output.setFormatter(logging.Formatter(log_format))
+
+    log_queue = SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    root.setLevel(config.get('level', 'INFO'))
+
+    levels = dict(DEFAULT_CATEGORY_LEVELS)
+    levels.update(config.get('categories') or {})
+    for category, level in levels.items():
+        get_logger(category).setLevel(level)
+
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,155 @@
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+from typing import List, Optional, Tuple
+
+import pytz
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# 交易时段
+PRE_MARKET = 'pre'
+REGULAR = 'regular'
+POST_MARKET = 'post'
+CLOSED = 'closed'
+
+DEFAULT_SESSIONS = {
+    'pre_market_open': '04:00',
+    'regular_open': '09:30',
+    'regular_close': '16:00',
+    'post_market_close': '20:00',
+}
+
+
+def _parse_time(value: str) -> dt_time:
+    hour, minute = str(value).split(':')
+    return dt_time(int(hour), int(minute))
+
+
+def _parse_date(value) -> date:
+    # YAML 可能已经把未加引号的日期解析为 date 对象
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), '%Y-%m-%d').date()
+
+
+class MarketCalendar:
+    """
+    Answers "which session are we in" with one cached comparison.
+
+    The boundaries of the current session are computed once as epoch
+    seconds. Until the clock passes the next boundary, ``session`` and
+    ``is_open`` only compare ``time.time()`` with that cached value; the
+    timezone work is redone only when a boundary is crossed.
+    """
+
+    def __init__(self, calendar: Optional[dict] = None, clock=time.time):
+        """
+        Args:
+            calendar: Parsed calendar file (timezone, sessions, holidays, early_closes)
+            clock: Returns the current epoch time in seconds, injectable for tests
+        """
+        calendar = calendar or {}
+        self.tz = pytz.timezone(calendar.get('timezone', 'America/New_York'))
+        sessions = dict(DEFAULT_SESSIONS)
+        sessions.update(calendar.get('sessions') or {})
+        self.pre_market_open = _parse_time(sessions['pre_market_open'])
+        self.regular_open = _parse_time(sessions['regular_open'])
+        self.regular_close = _parse_time(sessions['regular_close'])
+        self.post_market_close = _parse_time(sessions['post_market_close'])
+        self.holidays = {_parse_date(day) for day in calendar.get('holidays') or []}
+        self.early_closes = {
+            _parse_date(day): _parse_time(close)
+            for day, close in (calendar.get('early_closes') or {}).items()
+        }
+        self._clock = clock
+
+        # (时段开始, 下一次时段切换, 时段名称)，整体替换以保证多线程读取一致
+        self._state = (0.0, 0.0, CLOSED)
+        self.refreshes = 0
+
+    @classmethod
+    def from_file(cls, path: str, clock=time.time) -> 'MarketCalendar':
+        """Load a calendar file; falls back to plain weekday sessions if it is missing."""
+        if not os.path.exists(path):
+            logger.warning(f"Market calendar {path} not found, holidays and early closes are ignored")
+            return cls(clock=clock)
+        with open(path, 'r') as file:
+            return cls(yaml.safe_load(file) or {}, clock=clock)
+
+    def is_trading_day(self, day: date) -> bool:
+        return day.weekday() < 5 and day not in self.holidays
+
+    def _epoch(self, day: date, at: dt_time) -> float:
+        return self.tz.localize(datetime.combine(day, at)).timestamp()
+
+    def session_boundaries(self, day: date) -> List[Tuple[float, str]]:
+        """
+        Return ``(start_epoch, session)`` pairs for a local trading date,
+        ending with the start of the closed period. Empty for non-trading days.
+        """
+        if not self.is_trading_day(day):
+            return []
+        regular_close = self.early_closes.get(day, self.regular_close)
+        return [
+            (self._epoch(day, self.pre_market_open), PRE_MARKET),
+            (self._epoch(day, self.regular_open), REGULAR),
+            (self._epoch(day, regular_close), POST_MARKET),
+            (self._epoch(day, self.post_market_close), CLOSED),
+        ]
+
+    def session_state(self, now: float) -> Tuple[float, float, str]:
+        """
+        ``(start, next_boundary, session)`` of the session containing ``now``.
+
+        Does not touch the cached state, so callers that follow their own
+        clock (for example indicators fed with replayed exchange timestamps)
+        can cache the result themselves without disturbing ``session``.
+        """
+        day = datetime.fromtimestamp(now, self.tz).date()
+        # 默认：当前处于休市状态，直到下一个本地午夜
+        session = CLOSED
+        valid_from = self._epoch(day, dt_time(0, 0))
+        next_boundary = self._epoch(day + timedelta(days=1), dt_time(0, 0))
+        for start, name in self.session_boundaries(day):
+            if start <= now:
+                session, valid_from = name, start
+            else:
+                next_boundary = start
+                break
+        return valid_from, next_boundary, session
+
+    def _refresh(self, now: float):
+        self._state = self.session_state(now)
+        self.refreshes += 1
+
+    def current_session(self, now: Optional[float] = None) -> Tuple[str, float]:
+        """Current session and the epoch seconds at which it started."""
+        if now is None:
+            now = self._clock()
+        state = self._state
+        if not state[0] <= now < state[1]:
+            self._refresh(now)
+            state = self._state
+        return state[2], state[0]
+
+    def session(self, now: Optional[float] = None) -> str:
+        """Current session: ``pre``, ``regular``, ``post`` or ``closed``."""
+        return self.current_session(now)[0]
+
+    def is_open(self, now: Optional[float] = None) -> bool:
+        """Whether the regular session is open."""
+        return self.session(now) == REGULAR
+
+    def is_extended_open(self, now: Optional[float] = None) -> bool:
+        """Whether any session (pre-market, regular or post-market) is open."""
+        return self.session(now) != CLOSED
+
+    @property
+    def next_boundary(self) -> float:
+        """Epoch seconds of the next session change."""
+        self.session()
+        return self._state[1]
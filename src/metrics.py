@@ -0,0 +1,268 @@
+import logging
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 流水线各阶段（纳秒）：
+#   exchange_to_receive  交易所成交时间 -> 收到WebSocket帧（墙上时钟，受时钟偏差影响）
+#   queue_wait           收到 -> 价格处理线程取出
+#   evaluate             取出 -> 阈值、规则和价格窗口评估完成（每个微批次一次）
+#   dispatch             警报入队 -> 快速输出（终端、文件）完成
+#   end_to_end           收到 -> 快速输出完成
+# 声音、webhook 等慢速输出各自一个输出组，延迟按组单独统计（见 record_lane）
+STAGES = ('exchange_to_receive', 'queue_wait', 'evaluate', 'dispatch', 'end_to_end')
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram of non-negative integer values.
+
+    Values below ``2**significant_bits`` get one bucket each; above that
+    every power-of-two range is split into ``2**(significant_bits - 1)``
+    linear sub-buckets, so the relative error stays below
+    ``2**-(significant_bits - 1)`` at any magnitude. Recording is O(1) and
+    the bucket array only grows up to the largest value seen.
+    """
+
+    __slots__ = ('significant_bits', '_linear', '_half', '_counts', 'count', 'total', 'max', '_lock')
+
+    def __init__(self, significant_bits: int = 7):
+        self.significant_bits = significant_bits
+        self._linear = 1 << significant_bits
+        self._half = 1 << (significant_bits - 1)
+        self._counts = array('q')
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self._lock = threading.Lock()
+
+    def _index(self, value: int) -> int:
+        if value < self._linear:
+            return value
+        shift = value.bit_length() - self.significant_bits
+        return self._linear + (shift - 1) * self._half + ((value >> shift) - self._half)
+
+    def _upper_bound(self, index: int) -> int:
+        """Largest value that falls into bucket ``index``."""
+        if index < self._linear:
+            return index
+        offset = index - self._linear
+        shift = offset // self._half + 1
+        top = offset % self._half + self._half
+        return ((top + 1) << shift) - 1
+
+    def record(self, value: int):
+        if value < 0:
+            # 交易所时间与本机时钟存在偏差时可能为负
+            value = 0
+        index = self._index(value)
+        with self._lock:
+            counts = self._counts
+            if index >= len(counts):
+                counts.extend([0] * (index + 1 - len(counts)))
+            counts[index] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, quantile: float) -> int:
+        with self._lock:
+            if not self.count:
+                return 0
+            target = max(1, int(quantile * self.count + 0.5))
+            seen = 0
+            for index, bucket in enumerate(self._counts):
+                seen += bucket
+                if seen >= target:
+                    return min(self._upper_bound(index), self.max)
+            return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """Return count, p50, p90, p99 and max in milliseconds."""
+        return {
+            'count': self.count,
+            'p50_ms': self.percentile(0.5) / 1e6,
+            'p90_ms': self.percentile(0.9) / 1e6,
+            'p99_ms': self.percentile(0.99) / 1e6,
+            'max_ms': self.max / 1e6,
+        }
+
+
+class PipelineMetrics:
+    """
+    Latency histograms per pipeline stage and per symbol, plus queue depth.
+
+    The processing thread calls ``record_batch`` once per micro-batch and the
+    alert dispatcher calls ``record_alert`` once the fast sinks delivered an
+    alert and ``record_lane`` whenever any sink lane did. Exchange times
+    are converted with a fixed wall-clock offset of ``perf_counter_ns`` so
+    the hot path needs no extra clock reads.
+    """
+
+    def __init__(self, per_symbol: bool = True):
+        """
+        Args:
+            per_symbol: Also keep an exchange-to-evaluated histogram per symbol
+        """
+        self.per_symbol = per_symbol
+        self.stages: Dict[str, LatencyHistogram] = {stage: LatencyHistogram() for stage in STAGES}
+        # 每个股票一个较粗的直方图（相对误差约6%），控制内存占用
+        self.symbols: Dict[str, LatencyHistogram] = {}
+        # 每个警报输出组从入队到输出完成的延迟
+        self.lanes: Dict[str, LatencyHistogram] = {}
+        self.ticks = 0
+        self.alerts = 0
+        self.queue_depth = 0
+        self.queue_depth_max = 0
+        self._wall_offset_ns = time.time_ns() - time.perf_counter_ns()
+
+    def record_queue_depth(self, depth: int):
+        self.queue_depth = depth
+        if depth > self.queue_depth_max:
+            self.queue_depth_max = depth
+
+    def record_batch(self, batches: Iterable, dequeued_ns: int, evaluated_ns: int):
+        """
+        Record one micro-batch.
+
+        Args:
+            batches: TickBatch objects that were merged into the micro-batch
+            dequeued_ns: ``perf_counter_ns`` when the processing thread took the first batch
+            evaluated_ns: ``perf_counter_ns`` when evaluation finished
+        """
+        stages = self.stages
+        exchange = stages['exchange_to_receive']
+        queue_wait = stages['queue_wait']
+        stages['evaluate'].record(evaluated_ns - dequeued_ns)
+        offset = self._wall_offset_ns
+        evaluated_wall_ns = evaluated_ns + offset
+        symbols = self.symbols if self.per_symbol else None
+        for batch in batches:
+            queue_wait.record(dequeued_ns - batch.received_ns)
+            received_wall_ns = batch.received_ns + offset
+            for update in batch.updates:
+                self.ticks += update.count
+                if not update.timestamp:
+                    continue
+                exchange_ns = update.timestamp * 1_000_000
+                exchange.record(received_wall_ns - exchange_ns)
+                if symbols is not None:
+                    histogram = symbols.get(update.symbol)
+                    if histogram is None:
+                        histogram = symbols[update.symbol] = LatencyHistogram(significant_bits=5)
+                    histogram.record(evaluated_wall_ns - exchange_ns)
+
+    def record_alert(self, alert, delivered_ns: int):
+        """Called by the alert dispatcher after the fast sinks delivered ``alert``."""
+        self.alerts += 1
+        self.stages['dispatch'].record(delivered_ns - alert.submitted_ns)
+        if alert.received_ns:
+            self.stages['end_to_end'].record(delivered_ns - alert.received_ns)
+
+    def record_lane(self, lane: str, alert, delivered_ns: int):
+        """Called by the alert dispatcher after sink lane ``lane`` delivered ``alert``."""
+        histogram = self.lanes.get(lane)
+        if histogram is None:
+            histogram = self.lanes.setdefault(lane, LatencyHistogram())
+        histogram.record(delivered_ns - alert.submitted_ns)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {stage: histogram.summary() for stage, histogram in self.stages.items()}
+
+    def log_summary(self, log: logging.Logger):
+        """Write one line per stage and reset the queue depth high-water mark."""
+        for stage, stats in self.summary().items():
+            if stats['count']:
+                log.info("延迟 %s: %d 次, p50 %.2fms, p90 %.2fms, p99 %.2fms, max %.2fms",
+                         stage, stats['count'], stats['p50_ms'], stats['p90_ms'],
+                         stats['p99_ms'], stats['max_ms'],
+                         extra={'fields': dict(stats, stage=stage)})
+        for lane, histogram in list(self.lanes.items()):
+            stats = histogram.summary()
+            log.info("警报输出组 %s: %d 次, p50 %.2fms, p99 %.2fms, max %.2fms",
+                     lane, stats['count'], stats['p50_ms'], stats['p99_ms'], stats['max_ms'],
+                     extra={'fields': dict(stats, lane=lane)})
+        log.info("价格队列深度: 当前 %d, 最大 %d", self.queue_depth, self.queue_depth_max)
+        self.queue_depth_max = self.queue_depth
+        # 重新校准墙上时钟偏移（系统时间可能被NTP调整）
+        self._wall_offset_ns = time.time_ns() - time.perf_counter_ns()
+
+    def render_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+
+        def summary_lines(name: str, label: str, histograms: Dict[str, LatencyHistogram]):
+            lines.append(f"# TYPE {name} summary")
+            for key, histogram in histograms.items():
+                for quantile in QUANTILES:
+                    lines.append(f'{name}{{{label}="{key}",quantile="{quantile}"}} '
+                                 f'{histogram.percentile(quantile) / 1e9:.9f}')
+                lines.append(f'{name}_sum{{{label}="{key}"}} {histogram.total / 1e9:.9f}')
+                lines.append(f'{name}_count{{{label}="{key}"}} {histogram.count}')
+
+        lines.append("# HELP stock_monitor_stage_latency_seconds Latency of each pipeline stage")
+        summary_lines('stock_monitor_stage_latency_seconds', 'stage', self.stages)
+        if self.symbols:
+            lines.append("# HELP stock_monitor_symbol_latency_seconds Exchange time to evaluation per symbol")
+            summary_lines('stock_monitor_symbol_latency_seconds', 'symbol', dict(self.symbols))
+        if self.lanes:
+            lines.append("# HELP stock_monitor_alert_lane_latency_seconds Alert submission to delivery per sink lane")
+            summary_lines('stock_monitor_alert_lane_latency_seconds', 'lane', dict(self.lanes))
+        lines.extend([
+            "# TYPE stock_monitor_queue_depth gauge",
+            f"stock_monitor_queue_depth {self.queue_depth}",
+            "# TYPE stock_monitor_queue_depth_max gauge",
+            f"stock_monitor_queue_depth_max {self.queue_depth_max}",
+            "# TYPE stock_monitor_ticks_total counter",
+            f"stock_monitor_ticks_total {self.ticks}",
+            "# TYPE stock_monitor_alerts_delivered_total counter",
+            f"stock_monitor_alerts_delivered_total {self.alerts}",
+        ])
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves ``PipelineMetrics`` at ``/metrics`` from a background thread."""
+
+    def __init__(self, metrics: PipelineMetrics, host: str = '127.0.0.1', port: int = 9108):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # 不把每次抓取写入 stderr
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True)
+        self._thread.start()
+        logger.info(f"Metrics endpoint listening on http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
@@ -1,22 +1,58 @@
-import websocket
 import json
 import time
 from datetime import datetime
+import logging
 import sys
 import os
 import threading
-from queue import Queue
-import ssl
-import requests
 
-from utils import load_config, is_market_open, format_price_change
+from utils import load_config, format_price_change, DEFAULT_CALENDAR_PATH, DEFAULT_CONFIG_PATH
 from alert import AlertManager
+from log_config import setup_logging, get_logger
+from tick_batch import TickBatch
+from evaluation import ThresholdEvaluator
+from price_validator import from_epoch_ns
+from rules import RuleEngine
+from config_watcher import ConfigWatcher, diff_stocks, changed_sections
+from coalescing_buffer import CoalescingBuffer, DROP_OLDEST
+
+# 可选的子系统（WebSocket客户端、指数轮询、新闻检索、多进程评估、tick日志、状态快照、
+# 延迟统计、配置热更新）在配置启用时才导入和创建，缩短进程重启后到开始订阅的时间
+
+logger = logging.getLogger('monitor')
+frames_log = get_logger('frames')
+ticks_log = get_logger('ticks')
+alerts_log = get_logger('alerts')
+latency_log = get_logger('latency')
 
 class StockMonitor:
-    def __init__(self):
-        """初始化股票监控器"""
-        self.config = load_config()
-        self.alert_manager = AlertManager(self.config['settings']['sound_file'])
+    def __init__(self, config=None, config_path=None):
+        """初始化股票监控器（不建立连接，调用 start() 或 run() 后才开始监控）"""
+        if config is None:
+            config_path = config_path or DEFAULT_CONFIG_PATH
+            config = load_config(config_path)
+        self.config = config
+        # 配置文件路径，用于运行中热更新（直接传入配置字典时不监视文件）
+        self.config_path = config_path
+        self.config_watcher = None
+        # 上一次读取到的配置文件内容，需要重启才生效的修改每次只提示一次
+        self._loaded_config = config
+        setup_logging(self.config.get('logging'))
+
+        # 延迟统计：各处理阶段和每个股票的延迟直方图，通过本地HTTP端点输出
+        self.metrics = None
+        self.metrics_server = None
+        metrics_config = self.config.get('metrics') or {}
+        if metrics_config.get('enabled'):
+            from metrics import PipelineMetrics
+            self.metrics = PipelineMetrics(per_symbol=metrics_config.get('per_symbol', True))
+
+        self.alert_manager = AlertManager(
+            self.config['settings']['sound_file'],
+            self.config.get('alert_dispatch'),
+            on_delivered=self.metrics.record_alert if self.metrics else None,
+            on_lane_delivered=self.metrics.record_lane if self.metrics else None
+        )
         
         # 优先从环境变量读取API密钥
         self.api_key = os.environ.get('FINNHUB_API_KEY') or self.config['settings'].get('finnhub_api_key')
@@ -25,8 +61,17 @@ class StockMonitor:
             sys.exit(1)
         
         self.prices = {}
-        self.price_queue = Queue()
-        self.ws = None
+        self.trades_received = 0
+        # 有界的按股票合并缓冲区：处理跟不上时同一股票的新价格覆盖未处理的旧价格（保留期间的最高/最低价）
+        settings = self.config['settings']
+        self.price_queue = CoalescingBuffer(
+            max_symbols=settings.get('price_buffer_symbols', 10000),
+            overflow=settings.get('price_buffer_overflow', DROP_OLDEST),
+            block_timeout=settings.get('price_buffer_block_seconds', 0.5)
+        )
+        self.ws_manager = None
+        self.index_monitor = None
+        self.index_poller = None
         self.symbols = []
         self.index_symbols = []
         
@@ -36,163 +81,471 @@ class StockMonitor:
                 self.index_symbols.append(stock['symbol'])
             else:
                 self.symbols.append(stock['symbol'])
+        self.index_set = set(self.index_symbols)
+
+        # 交易日历：只在时段切换时重新计算，平时判断开市只需一次比较（首次使用时才加载）
+        self._calendar = None
                 
         self.alerts = {stock['symbol']: stock['alerts'] for stock in self.config['stocks']}
-        
+        self.evaluator = ThresholdEvaluator(self.alerts)
+        # 可选的预编译警报规则（stocks[].rules），只对配置了规则的股票执行
+        self.rules = RuleEngine.from_stocks(self.config['stocks'], self._rules_calendar(self.config['stocks']))
+        # 热更新时替换阈值表和规则，与价格处理线程互斥
+        self._tables_lock = threading.Lock()
+        # 多进程评估（eval_workers > 1 时在 start_processing 中创建）
+        self.parallel = None
+
+        # 新闻检索：价格窗口验证器发现显著变动后，在独立的异步阶段检索新闻
+        self.validator = None
+        self.enrichment = None
+        news_config = self.config.get('news_alert') or {}
+        if news_config.get('enabled'):
+            from news_searcher import NewsSearcher
+            from price_validator import PriceMovementValidator
+            try:
+                searcher = NewsSearcher(news_config.get('deepseek') or {})
+            except ValueError as e:
+                logger.warning("新闻检索已禁用: %s", e)
+            else:
+                self.validator = PriceMovementValidator(news_config['trigger_conditions'])
+                enrichment_config = news_config.get('enrichment') or {}
+                window_ms = enrichment_config.get('coalesce_window_ms', 0)
+                if window_ms:
+                    from news_coalescer import NewsCoalescer, news_groups
+                    # 同时变动的同板块股票（或指数）合并为一次检索
+                    if searcher.stream:
+                        # 合并检索一次请求覆盖多只股票，需要完整回复后再按股票拆分，不能逐篇发出
+                        logger.warning("enrichment.coalesce_window_ms 与 deepseek.stream 同时启用，"
+                                       "合并检索不使用流式响应：第一条警报在整个回复到达后才发出")
+                    self.enrichment = NewsCoalescer(
+                        searcher,
+                        self.alert_manager,
+                        news_groups(self.config['stocks']),
+                        window=window_ms / 1000,
+                        max_batch=enrichment_config.get('max_batch_symbols', 10),
+                        concurrency=enrichment_config.get('concurrency', 4),
+                        max_pending=enrichment_config.get('max_pending', 100)
+                    )
+                else:
+                    from enrichment import NewsEnrichmentStage
+                    self.enrichment = NewsEnrichmentStage(
+                        searcher,
+                        self.alert_manager,
+                        concurrency=enrichment_config.get('concurrency', 4),
+                        max_pending=enrichment_config.get('max_pending', 100)
+                    )
+
+        # tick日志：记录处理过的每个价格更新，用于回放和审计
+        self.journal = None
+        journal_config = self.config.get('journal') or {}
+        if journal_config.get('enabled'):
+            from tick_journal import TickJournal
+            self.journal = TickJournal(
+                journal_config.get('directory', 'data/journal'),
+                segment_records=journal_config.get('segment_records', 1 << 20),
+                flush_interval=journal_config.get('flush_interval_seconds', 1.0)
+            )
+
+        # 状态快照：定期保存最新价格、价格窗口和冷却时间，重启后立即可用
+        self.snapshotter = None
+        snapshot_config = self.config.get('snapshot') or {}
+        if snapshot_config.get('enabled'):
+            if self.config['settings'].get('eval_workers', 1) > 1:
+                logger.warning("多进程评估时状态保存在评估进程中，状态快照已禁用")
+            else:
+                from snapshot import StateSnapshotter
+                path = snapshot_config.get('path', 'data/state.snapshot')
+                self.restore_state(path, snapshot_config.get('max_price_age_seconds', 300))
+                self.snapshotter = StateSnapshotter(
+                    path, self.capture_state, snapshot_config.get('interval_seconds', 30))
+
+    def capture_state(self):
+        """复制当前的价格、价格窗口和冷却时间（持锁期间只做复制）"""
+        from snapshot import MonitorState
+        with self._tables_lock:
+            prices = dict(self.prices)
+            windows, last_alerts = self.validator.export_state() if self.validator else ({}, {})
+        return MonitorState(time.time_ns(), prices, last_alerts, windows)
+
+    def restore_state(self, path, max_price_age=300):
+        """从快照恢复状态；超出价格窗口的数据点和已过冷却期的记录不再恢复"""
+        if not os.path.exists(path):
+            return
+        from snapshot import read_snapshot
+        started = time.perf_counter()
+        try:
+            state = read_snapshot(path)
+        except (OSError, ValueError) as e:
+            logger.warning("无法读取状态快照 %s: %s", path, e)
+            return
+
+        now_ns = time.time_ns()
+        prices = {}
+        if now_ns - state.created_ns <= max_price_age * 1_000_000_000:
+            prices = {symbol: price for symbol, price in state.prices.items() if symbol in self.alerts}
+            self.prices.update(prices)
+            # 上一个价格写入阈值表和规则，重启后的第一个tick即可触发警报
+            for symbol, price in prices.items():
+                self.evaluator.last_prices[self.evaluator.symbol_ids[symbol]] = price
+                symbol_rules = self.rules.compiled.get(symbol)
+                if symbol_rules is not None:
+                    symbol_rules.previous = price
+
+        windows = cooldowns = 0
+        if self.validator:
+            windows, cooldowns = self.validator.restore_state(
+                {symbol: points for symbol, points in state.windows.items() if symbol in self.alerts},
+                {symbol: ns for symbol, ns in state.last_alerts.items() if symbol in self.alerts},
+                now_ns
+            )
+        logger.info("已从 %s 恢复状态: %d 个价格, %d 个价格窗口, %d 个冷却中的股票 (%.1fms, 快照时间 %s)",
+                    path, len(prices), windows, cooldowns, (time.perf_counter() - started) * 1000,
+                    datetime.fromtimestamp(state.created_ns / 1e9).strftime('%Y-%m-%d %H:%M:%S'))
+
+    @property
+    def calendar(self):
+        if self._calendar is None:
+            # 按 settings.market_calendar 加载本监控器自己的日历（模块级共享日历只使用默认路径）
+            from market_calendar import MarketCalendar
+            self._calendar = MarketCalendar.from_file(
+                self.config['settings'].get('market_calendar', DEFAULT_CALENDAR_PATH)
+            )
+        return self._calendar
+
+    def _rules_calendar(self, stocks):
+        """警报规则的指标（按交易时段累计的VWAP）使用的交易日历；没有配置规则时不加载"""
+        return self.calendar if any(stock.get('rules') for stock in stocks) else None
+
+    def start(self):
+        """启动WebSocket连接、价格处理线程和指数监控线程"""
+        self.start_processing()
+
+        # 先建立数据源连接，其余辅助功能在订阅之后启动
         # 启动WebSocket连接（用于普通股票）
         if self.symbols:
             self.start_websocket()
         
+        # 启动指数监控线程
+        if self.index_symbols:
+            self.start_index_monitor()
+
+        metrics_config = self.config.get('metrics') or {}
+        if self.metrics and metrics_config.get('port', 9108):
+            from metrics import MetricsServer
+            self.metrics_server = MetricsServer(
+                self.metrics,
+                host=metrics_config.get('host', '127.0.0.1'),
+                port=metrics_config.get('port', 9108)
+            )
+            self.metrics_server.start()
+
+        # 监视配置文件，修改股票或阈值后无需重启
+        interval = self.config['settings'].get('config_reload_interval', 2)
+        if self.config_path and interval:
+            self.config_watcher = ConfigWatcher(self.config_path, self.apply_config, interval)
+            self.config_watcher.start()
+
+    def start_index_monitor(self):
+        """启动指数监控线程"""
+        self.index_monitor = threading.Thread(target=self.monitor_indices)
+        self.index_monitor.daemon = True
+        self.index_monitor.start()
+
+    def start_processing(self):
+        """启动价格处理线程和新闻检索阶段（不建立任何数据源连接，回放时单独使用）"""
+        if self.enrichment:
+            self.enrichment.start()
+
+        # 股票数量很大时按股票哈希分给多个进程评估，绕开GIL只能用一个核心的限制
+        workers = self.config['settings'].get('eval_workers', 1)
+        if workers > 1:
+            from parallel import ParallelEvaluator
+            news_config = self.config.get('news_alert') or {}
+            self.parallel = ParallelEvaluator(
+                self.alerts,
+                workers,
+                on_alert=self._emit_alert,
+                on_news=self._submit_news,
+                rules={stock['symbol']: stock.get('rules') for stock in self.config['stocks']},
+                index_symbols=self.index_symbols,
+                trigger_conditions=news_config.get('trigger_conditions') if self.validator else None,
+                ring_capacity=self.config['settings'].get('eval_ring_capacity', 1 << 16),
+                calendar=self._rules_calendar(self.config['stocks'])
+            )
+            self.parallel.start()
+
+        if self.snapshotter:
+            self.snapshotter.start()
+
         # 启动价格处理线程
         self.price_processor = threading.Thread(target=self.process_price_updates)
         self.price_processor.daemon = True
         self.price_processor.start()
-        
-        # 启动指数监控线程
-        if self.index_symbols:
-            self.index_monitor = threading.Thread(target=self.monitor_indices)
-            self.index_monitor.daemon = True
-            self.index_monitor.start()
-
-    def get_index_price(self, symbol):
-        """通过REST API获取指数价格"""
-        try:
-            url = f"https://finnhub.io/api/v1/quote?symbol={symbol}&token={self.api_key}"
-            response = requests.get(url)
-            data = response.json()
-            
-            if 'c' in data and 't' in data:  # 'c'是当前价格，'t'是时间戳
-                current_time = datetime.now().timestamp()
-                data_time = data['t']  # Finnhub返回的时间戳
-                delay = current_time - data_time
-                
-                print(f"\n数据延迟情况:")
-                print(f"当前时间: {datetime.fromtimestamp(current_time).strftime('%Y-%m-%d %H:%M:%S')}")
-                print(f"数据时间: {datetime.fromtimestamp(data_time).strftime('%Y-%m-%d %H:%M:%S')}")
-                print(f"延迟时间: {delay:.2f} 秒")
-                
-                return float(data['c'])
-            return None
-        except Exception as e:
-            print(f"\n获取指数 {symbol} 价格时出错: {e}")
-            return None
 
     def monitor_indices(self):
         """监控指数价格"""
+        from index_poller import IndexPoller, DEFAULT_REST_URL
+        settings = self.config['settings']
+        interval = settings['interval']  # 使用配置的间隔时间
+        # 是否在盘前/盘后时段也轮询指数
+        is_active = (self.calendar.is_extended_open if settings.get('poll_extended_hours')
+                     else self.calendar.is_open)
+        self.index_poller = IndexPoller(
+            self.api_key,
+            self.index_symbols,
+            calls_per_minute=settings.get('finnhub_calls_per_minute', 60),
+            base_url=settings.get('finnhub_rest_url', DEFAULT_REST_URL),
+            max_workers=settings.get('index_poll_workers', 8)
+        )
         while True:
-            if is_market_open():
-                for symbol in self.index_symbols:
-                    price = self.get_index_price(symbol)
-                    if price is not None:
-                        self.price_queue.put((symbol, price))
-            time.sleep(self.config['settings']['interval'])  # 使用配置的间隔时间
+            started = time.monotonic()
+            if is_active():
+                # 所有指数并发请求，限流等待时间不超过一个轮询周期
+                updates = self.index_poller.poll(deadline=interval)
+                if updates:
+                    if latency_log.isEnabledFor(logging.DEBUG):
+                        current_time = datetime.now().timestamp()
+                        for update in updates:
+                            latency_log.debug("指数 %s 数据延迟: %.2f 秒",
+                                              update.symbol, current_time - update.timestamp / 1000)
+                    if self.journal:
+                        # 一次轮询的指数报价记为一帧
+                        self.journal.append_trades([
+                            {'s': update.symbol, 'p': update.price, 'v': update.volume, 't': update.timestamp}
+                            for update in updates
+                        ])
+                    self.price_queue.put(TickBatch(updates))
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
 
     def on_message(self, ws, message):
         """处理WebSocket消息"""
-        data = json.loads(message)
-        print(f"\n收到消息: {data}")
-        
+        frames_log.debug("收到消息: %s", message)
+        self.handle_frame(json.loads(message))
+
+    def handle_frame(self, data):
+        """处理已解码的WebSocket消息"""
         if data['type'] == 'ping':
-            print("收到心跳包...")
+            frames_log.debug("收到心跳包...")
             return
             
         if data['type'] == 'error':
-            print(f"错误: {data['msg']}")
+            frames_log.error("错误: %s", data['msg'])
             return
             
         if data['type'] == 'trade':
-            symbol = data['data'][0]['s']
-            price = float(data['data'][0]['p'])
-            self.price_queue.put((symbol, price))
-
-    def on_error(self, ws, error):
-        """处理WebSocket错误"""
-        print(f"\n*** WebSocket错误 ***")
-        print(f"错误信息: {error}")
-
-    def on_close(self, ws, close_status_code, close_msg):
-        """处理WebSocket连接关闭"""
-        print(f"\n*** WebSocket连接关闭 ***")
-        print(f"状态码: {close_status_code}")
-        print(f"关闭信息: {close_msg}")
-        time.sleep(5)  # 等待5秒后重连
-        self.start_websocket()
-
-    def on_open(self, ws):
-        """处理WebSocket连接打开"""
-        print("\n*** WebSocket连接已建立 ***")
-        # 订阅所有股票
-        for symbol in self.symbols:
-            subscribe_message = json.dumps({'type': 'subscribe', 'symbol': symbol})
-            print(f"订阅股票: {symbol}")
-            print(f"发送订阅消息: {subscribe_message}")
-            ws.send(subscribe_message)
+            # 一帧可能包含多个股票的多笔成交，整帧聚合后一次性入队
+            trades = data.get('data') or []
+            self.trades_received += len(trades)
+            if self.journal:
+                # 记录聚合和合并之前的原始成交，回放时与实际收到的行情一致
+                self.journal.append_trades(trades)
+            batch = TickBatch.from_trades(trades)
+            if batch.updates:
+                self.price_queue.put(batch)
 
     def start_websocket(self):
-        """启动WebSocket连接"""
-        print("\n开始建立WebSocket连接...")
-        websocket.enableTrace(True)
-        self.ws = websocket.WebSocketApp(
-            f"wss://ws.finnhub.io?token={self.api_key}",
-            on_message=self.on_message,
-            on_error=self.on_error,
-            on_close=self.on_close,
-            on_open=self.on_open
+        """按分片建立WebSocket连接（每个连接的订阅数量有上限，断线后各自重连）"""
+        import websocket
+        from ws_manager import ShardedWebSocketManager, DEFAULT_WS_URL
+        settings = self.config['settings']
+        # 底层协议跟踪非常冗长，默认关闭
+        websocket.enableTrace(bool((self.config.get('logging') or {}).get('websocket_trace', False)))
+        self.ws_manager = ShardedWebSocketManager(
+            self.api_key,
+            self.symbols,
+            self.on_message,
+            url=settings.get('finnhub_ws_url', DEFAULT_WS_URL),
+            max_symbols_per_connection=settings.get('ws_symbols_per_connection', 50),
+            backoff_base=settings.get('ws_reconnect_base_seconds', 1.0),
+            backoff_cap=settings.get('ws_reconnect_max_seconds', 60.0)
         )
-        
-        # 禁用SSL证书验证
-        ws_thread = threading.Thread(
-            target=lambda: self.ws.run_forever(
-                sslopt={"cert_reqs": ssl.CERT_NONE}
-            )
-        )
-        ws_thread.daemon = True
-        ws_thread.start()
-        print("WebSocket线程已启动")
+        self.ws_manager.start()
+        logger.info("已启动 %d 个WebSocket连接, 共 %d 个股票", len(self.ws_manager.shards), len(self.symbols))
 
     def process_price_updates(self):
         """处理价格更新"""
+        max_batch = self.config['settings'].get('eval_batch_size', 5000)
+        metrics = self.metrics
         while True:
-            symbol, current_price = self.price_queue.get()
-            
-            if symbol in self.prices:
-                previous_price = self.prices[symbol]
-                price_change = current_price - previous_price
-                percentage_change = (price_change / previous_price) * 100
-
-                # 获取警报阈值
-                alerts = self.alerts[symbol]
-                price_threshold = alerts['price_change']
-                pct_threshold = alerts['percentage_change']
-
-                # 格式化时间
-                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-                # 打印详细信息
-                print("\n" + "="*60)
-                print(f"时间: {current_time}")
-                if not is_market_open():
-                    print("*** 注意：当前为非交易时间，数据可能不是实时的 ***")
-                print(f"股票: {symbol}")
-                print(f"当前价格: ${current_price:.2f}")
-                print(f"价格变动: {format_price_change(price_change, percentage_change)}")
-                print(f"监控阈值:")
-                print(f"  - 价格变动: ${price_threshold} (当前: ${abs(price_change):.2f})")
-                print(f"  - 百分比变动: {pct_threshold}% (当前: {abs(percentage_change):.2f}%)")
-
-                # 检查是否触发警报条件
-                if (abs(price_change) >= alerts['price_change'] or 
-                    abs(percentage_change) >= alerts['percentage_change']):
-                    print("\n*** 触发警报! ***")
-                    self.alert_manager.trigger_alert(
-                        symbol, current_price, price_change, percentage_change
-                    )
-                print("="*60)
+            # 一次取出所有待处理的股票（已按股票合并），统一做向量化评估
+            batch = self.price_queue.get(max_batch)
+            dequeued_ns = time.perf_counter_ns()
+            try:
+                if self.parallel:
+                    self.parallel.submit(batch.updates, batch.received_ns)
+                else:
+                    with self._tables_lock:
+                        self._process_updates(batch.updates, batch.received_ns)
+                if metrics:
+                    metrics.record_queue_depth(self.price_queue.qsize())
+                    metrics.record_batch((batch,), dequeued_ns, time.perf_counter_ns())
+            except Exception:
+                logger.exception("处理价格更新时出错")
+            finally:
+                self.price_queue.task_done()
+
+    def _process_updates(self, updates, received_ns=None):
+        """评估一个微批次的价格更新并触发警报"""
+        evaluation = self.evaluator.evaluate(updates)
+
+        if ticks_log.isEnabledFor(logging.DEBUG):
+            self._log_ticks(updates, evaluation)
+
+        for position, symbol, current_price, price_change, percentage_change, reason in \
+                self.evaluator.breaches(evaluation):
+            self._emit_alert(symbol, current_price, price_change, percentage_change, received_ns, reason)
+
+        if self.rules:
+            for symbol, current_price, price_change, percentage_change, reason in \
+                    self.rules.evaluate(updates):
+                self._emit_alert(symbol, current_price, price_change, percentage_change, received_ns, reason)
 
-            self.prices[symbol] = current_price
+        for update in updates:
+            self.prices[update.symbol] = update.price
+
+        if self.validator:
+            self._check_news_triggers(updates)
+
+    def _check_news_triggers(self, updates):
+        """把价格写入验证器窗口，并把显著变动交给新闻检索阶段（不等待结果）"""
+        validator = self.validator
+        now_ns = time.time_ns()
+        latest_ns = 0
+        for update in updates:
+            # 优先使用交易所时间戳（毫秒），回放历史数据时冷却时间也按数据时间计算
+            timestamp_ns = update.timestamp * 1_000_000 if update.timestamp else now_ns
+            validator.add_price_ns(update.symbol, update.price, timestamp_ns)
+            if timestamp_ns > latest_ns:
+                latest_ns = timestamp_ns
+
+        current_time = from_epoch_ns(latest_ns)
+        for symbol in {update.symbol for update in updates}:
+            is_index = symbol in self.index_set
+            movement = validator.should_trigger_news_search(symbol, current_time, is_index)
+            if movement:
+                self._submit_news(symbol, movement, is_index)
+
+    def _emit_alert(self, symbol, current_price, price_change, percentage_change, received_ns=None, reason=None):
+        """记录并发出一条警报（多进程评估时由结果合并线程调用）"""
+        alerts_log.info(
+            "触发警报: %s 当前价格 $%.2f, 价格变动 %s%s",
+            symbol, current_price, format_price_change(price_change, percentage_change),
+            f", 规则: {reason}" if reason else "",
+            extra={'fields': {'symbol': symbol, 'price': current_price,
+                              'change': price_change, 'percentage': percentage_change,
+                              'reason': reason}}
+        )
+        self.alert_manager.trigger_alert(
+            symbol, current_price, price_change, percentage_change, received_ns=received_ns, reason=reason
+        )
+
+    def _submit_news(self, symbol, movement, is_index):
+        """把显著变动交给新闻检索阶段"""
+        alerts_log.info("价格窗口内显著变动，检索新闻: %s (%+.2f%%)",
+                        symbol, movement['percentage_change'])
+        self.enrichment.submit(symbol, movement, is_index)
+
+    def apply_config(self, new_config):
+        """
+        应用重新加载的配置：只订阅/退订有变化的股票，整体替换阈值表和规则，
+        保留已有股票的上一个价格和价格窗口
+        """
+        # 只提示与运行中配置不同、且相对上一次读取又有修改的部分，未改动的部分不会在每次热更新时重复提示
+        pending = changed_sections(self.config, new_config)
+        modified = set(changed_sections(self._loaded_config, new_config))
+        for section in pending:
+            if section in modified:
+                logger.warning("配置 %s 已修改，需要重启后生效", section)
+
+        diff = diff_stocks(self.config['stocks'], new_config['stocks'])
+        news_config = self.config.get('news_alert') or {}
+        old_conditions = news_config.get('trigger_conditions')
+        new_conditions = (new_config.get('news_alert') or {}).get('trigger_conditions')
+        conditions_changed = self.validator is not None and new_conditions != old_conditions
+        if not diff and not conditions_changed:
+            self._loaded_config = new_config
+            return
+
+        # 先编译新的阈值表和规则，配置有误时抛出异常并保持原配置
+        stocks = new_config['stocks']
+        alerts = {stock['symbol']: stock['alerts'] for stock in stocks}
+        rules_config = {stock['symbol']: stock.get('rules') for stock in stocks}
+        evaluator = self.evaluator.rebuild(alerts, carry_over=False)
+        calendar = self._rules_calendar(stocks)
+        rules = self.rules.rebuild(rules_config, carry_over=False, calendar=calendar)
+        symbols = [stock['symbol'] for stock in stocks if stock['type'] != 'index']
+        index_symbols = [stock['symbol'] for stock in stocks if stock['type'] == 'index']
+        old_symbols = set(self.symbols)
+
+        with self._tables_lock:
+            # 上一个价格在锁内复制，编译期间处理的批次不会丢失
+            evaluator.carry_over(self.evaluator)
+            rules.carry_over(self.rules)
+            self.alerts, self.evaluator, self.rules = alerts, evaluator, rules
+            self.symbols, self.index_symbols, self.index_set = symbols, index_symbols, set(index_symbols)
+            for stock in diff.removed:
+                self.prices.pop(stock['symbol'], None)
+                if self.validator:
+                    self.validator.price_windows.pop(stock['symbol'], None)
+            if conditions_changed:
+                self.validator.reconfigure(new_conditions)
+                news_config['trigger_conditions'] = new_conditions
+            self.config['stocks'] = stocks
+            if self.enrichment is not None and hasattr(self.enrichment, 'groups'):
+                from news_coalescer import news_groups
+                self.enrichment.groups = news_groups(stocks)
+        self._loaded_config = new_config
+
+        if self.parallel:
+            self.parallel.update(alerts, rules_config, index_symbols,
+                                 new_conditions if self.validator else None, calendar)
+
+        # 只订阅/退订有变化的股票，其余连接和订阅不受影响
+        added = [symbol for symbol in symbols if symbol not in old_symbols]
+        removed = old_symbols.difference(symbols)
+        if self.ws_manager:
+            for symbol in removed:
+                self.ws_manager.unsubscribe(symbol)
+            for symbol in added:
+                self.ws_manager.subscribe(symbol)
+        elif symbols:
+            self.start_websocket()
+        if self.index_poller:
+            self.index_poller.symbols = list(index_symbols)
+        elif index_symbols and not self.index_monitor:
+            self.start_index_monitor()
+
+        logger.info("配置已重新加载: 新增 %s, 删除 %s, 修改 %s%s",
+                    [s['symbol'] for s in diff.added] or '-',
+                    [s['symbol'] for s in diff.removed] or '-',
+                    [s['symbol'] for s in diff.changed] or '-',
+                    ", 新闻触发条件已更新" if conditions_changed else "")
+
+    def wait_idle(self):
+        """等待已入队的价格更新全部评估完毕（回放和测试使用）"""
+        self.price_queue.join()
+        if self.parallel:
+            self.parallel.join()
+
+    def _log_ticks(self, updates, evaluation):
+        """逐tick记录价格变动（仅在 ticks 分类为DEBUG级别时调用）"""
+        for i in evaluation.has_previous.nonzero()[0]:
+            update = updates[evaluation.positions[i]]
+            alerts = self.alerts[update.symbol]
+            price_change = float(evaluation.change[i])
+            percentage_change = float(evaluation.percentage[i])
+            ticks_log.debug(
+                "%s 当前价格: $%.2f 价格变动: %s 阈值: $%s / %s%% 成交: %d 笔 VWAP: $%.2f",
+                update.symbol, update.price, format_price_change(price_change, percentage_change),
+                alerts['price_change'], alerts['percentage_change'], update.count, update.vwap,
+                extra={'fields': {'symbol': update.symbol, 'price': update.price,
+                                  'change': price_change, 'percentage': percentage_change,
+                                  'count': update.count, 'volume': update.volume, 'vwap': update.vwap}}
+            )
 
     def run(self):
         """运行监控器"""
+        self.start()
         print("启动股票监控系统...")
         print(f"\n监控配置:")
         for stock in self.config['stocks']:
@@ -200,9 +553,12 @@ class StockMonitor:
             print(f"{'指数' if stock['type'] == 'index' else '股票'}: {symbol}")
             print(f"  价格变动警报: ${self.alerts[symbol]['price_change']}")
             print(f"  百分比变动警报: {self.alerts[symbol]['percentage_change']}%")
+            for rule in stock.get('rules') or []:
+                params = ', '.join(f"{key}={value}" for key, value in rule.items() if key != 'type')
+                print(f"  规则: {rule['type']} ({params})")
 
         # 检查市场状态
-        if not is_market_open():
+        if not self.calendar.is_open():
             print("\n*** 提示：美股市场当前未开市 ***")
             print("美股交易时间：周一至周五")
             print("美东时间：9:30 - 16:00")
@@ -217,13 +573,57 @@ class StockMonitor:
                 time.sleep(1)
                 # 每分钟检查一次市场状态
                 if int(time.time()) % 60 == 0:
-                    if not is_market_open():
+                    if not self.calendar.is_open():
                         print("\n市场处于非交易时间，等待市场开市...")
+                    if self.ws_manager:
+                        for shard in self.ws_manager.stats():
+                            latency_log.info(
+                                "WebSocket分片 %d: %s, %d 个股票, %.1f 条/秒, 距上条消息 %s 秒, 重连 %d 次",
+                                shard['shard'], '已连接' if shard['connected'] else '未连接', shard['symbols'],
+                                shard['messages_per_s'],
+                                f"{shard['staleness_s']:.1f}" if shard['staleness_s'] is not None else '-',
+                                shard['reconnects']
+                            )
+                    stats = self.price_queue.stats()
+                    if stats['coalesced'] or stats['dropped']:
+                        latency_log.info("价格缓冲区: 当前 %d 个股票, 最多 %d, 已合并 %d, 已丢弃 %d",
+                                         stats['depth'], stats['max_depth'], stats['coalesced'],
+                                         stats['dropped'])
+                    if self.metrics:
+                        self.metrics.log_summary(latency_log)
+                    if self.parallel:
+                        stats = self.parallel.stats()
+                        latency_log.info("多进程评估: %d 个进程, 已处理 %d, 积压 %s, 丢弃 %d",
+                                         stats['workers'], stats['processed'], stats['queued'],
+                                         stats['dropped'])
+                    if self.enrichment:
+                        stats = self.enrichment.stats()
+                        latency_log.info(
+                            "新闻检索: 排队 %d, 进行中 %d, 完成 %d, 丢弃 %d, 延迟 p50 %.0fms p99 %.0fms",
+                            stats['pending'], stats['in_flight'], stats['completed'], stats['dropped'],
+                            stats['latency']['p50_ms'], stats['latency']['p99_ms']
+                        )
+                        if stats['first_article']['count']:
+                            latency_log.info("新闻检索首篇新闻延迟: p50 %.0fms p99 %.0fms",
+                                             stats['first_article']['p50_ms'], stats['first_article']['p99_ms'])
                     time.sleep(1)  # 防止重复打印
         except KeyboardInterrupt:
             print("\n正在关闭监控系统...")
-            if self.ws:
-                self.ws.close()
+            if self.config_watcher:
+                self.config_watcher.stop()
+            if self.metrics_server:
+                self.metrics_server.stop()
+            if self.ws_manager:
+                self.ws_manager.stop()
+            if self.parallel:
+                self.parallel.stop()
+            if self.enrichment:
+                self.enrichment.stop()
+            if self.snapshotter:
+                self.snapshotter.stop()
+            if self.journal:
+                self.journal.close()
+            self.alert_manager.close()
 
 def main():
     """主程序入口"""
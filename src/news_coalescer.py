@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from enrichment import NewsEnrichmentStage
+from news_searcher import NewsSearcher
+
+logger = logging.getLogger(__name__)
+
+INDEX_GROUP = 'index'
+DEFAULT_GROUP = 'market'
+
+
+def news_groups(stocks: List[dict]) -> Dict[str, str]:
+    """Group of every symbol: its ``sector``, ``index`` for indices, otherwise ``market``."""
+    groups = {}
+    for stock in stocks:
+        if stock['type'] == 'index':
+            groups[stock['symbol']] = INDEX_GROUP
+        else:
+            groups[stock['symbol']] = stock.get('sector') or DEFAULT_GROUP
+    return groups
+
+
+class _PendingBatch:
+    __slots__ = ('group', 'is_index', 'triggers', 'timer')
+
+    def __init__(self, group: str, is_index: bool):
+        self.group = group
+        self.is_index = is_index
+        # 股票 -> (价格变动, 提交时间)；同一股票在窗口内的重复触发只保留最新一次
+        self.triggers: Dict[str, Tuple[dict, int]] = {}
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class NewsCoalescer(NewsEnrichmentStage):
+    """
+    News enrichment that batches triggers of symbols moving together.
+
+    Triggers are collected per group (sector, or all indices) for ``window``
+    seconds after the first one arrives. Each group is then looked up with
+    a single batched prompt whose answer is split back out per symbol, so a
+    broad sell-off costs a few requests instead of one per symbol. A group
+    is sent early once it holds ``max_batch`` symbols, and no more than
+    ``concurrency`` requests are in flight.
+    """
+
+    def __init__(self, searcher: NewsSearcher, alert_manager, groups: Dict[str, str],
+                 window: float = 0.5, max_batch: int = 10, concurrency: int = 4, max_pending: int = 100):
+        """
+        Args:
+            searcher: NewsSearcher used for the lookups
+            alert_manager: AlertManager that receives the enriched alerts
+            groups: Mapping of symbol to its group (see ``news_groups``)
+            window: Seconds to collect triggers of a group before sending them
+            max_batch: Maximum number of symbols in one request
+            concurrency: Maximum number of requests in flight
+            max_pending: Maximum number of triggers queued or in flight
+        """
+        super().__init__(searcher, alert_manager, concurrency=concurrency, max_pending=max_pending)
+        self.groups = groups
+        self.window = window
+        self.max_batch = max_batch
+        self._batches: Dict[str, _PendingBatch] = {}
+
+        self.requests = 0
+        self.deduplicated = 0
+
+    def submit(self, symbol: str, movement: dict, is_index: bool = False) -> bool:
+        """
+        Add a validator trigger to its group's batch without waiting for it.
+
+        Returns:
+            False if the stage is saturated and the trigger was dropped
+        """
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self.pending += 1
+            self.submitted += 1
+        self._loop.call_soon_threadsafe(self._collect, symbol, movement, is_index, time.perf_counter_ns())
+        return True
+
+    def _collect(self, symbol: str, movement: dict, is_index: bool, submitted_ns: int):
+        group = INDEX_GROUP if is_index else self.groups.get(symbol, DEFAULT_GROUP)
+        batch = self._batches.get(group)
+        if batch is None:
+            batch = self._batches[group] = _PendingBatch(group, is_index)
+            batch.timer = self._loop.call_later(self.window, self._flush, batch)
+
+        if symbol in batch.triggers:
+            with self._lock:
+                self.pending -= 1
+                self.deduplicated += 1
+        batch.triggers[symbol] = (movement, submitted_ns)
+        if len(batch.triggers) >= self.max_batch:
+            batch.timer.cancel()
+            self._flush(batch)
+
+    def _flush(self, batch: _PendingBatch):
+        if self._batches.get(batch.group) is batch:
+            del self._batches[batch.group]
+        self._loop.create_task(self._lookup(batch))
+
+    async def _lookup(self, batch: _PendingBatch):
+        symbols = list(batch.triggers)
+        try:
+            async with self._semaphore:
+                self.in_flight += 1
+                try:
+                    group = None if batch.group in (INDEX_GROUP, DEFAULT_GROUP) else batch.group
+                    results = await self.searcher.search_news_batch(symbols, batch.is_index, group)
+                finally:
+                    self.in_flight -= 1
+            with self._lock:
+                self.requests += 1
+        except Exception as e:
+            logger.error(f"News lookup failed for {', '.join(symbols)}: {str(e)}")
+            with self._lock:
+                self.failed += len(symbols)
+                self.pending -= len(symbols)
+            return
+
+        for symbol, (movement, submitted_ns) in batch.triggers.items():
+            try:
+                self._alert(symbol, results.get(symbol, []), movement)
+                self.latency.record(time.perf_counter_ns() - submitted_ns)
+                with self._lock:
+                    self.completed += 1
+            except Exception as e:
+                logger.error(f"News enrichment failed for {symbol}: {str(e)}")
+                with self._lock:
+                    self.failed += 1
+            finally:
+                with self._lock:
+                    self.pending -= 1
+
+    def stats(self) -> dict:
+        counters = super().stats()
+        with self._lock:
+            counters['requests'] = self.requests
+            counters['deduplicated'] = self.deduplicated
+        return counters
+
+    def stop(self, timeout: float = 5.0):
+        """Send the batches still collecting, then close the session and stop the loop."""
+        if self._loop is not None:
+            async def flush_all():
+                for batch in list(self._batches.values()):
+                    batch.timer.cancel()
+                    self._flush(batch)
+                tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+                if tasks:
+                    await asyncio.wait(tasks, timeout=timeout)
+
+            try:
+                asyncio.run_coroutine_threadsafe(flush_all(), self._loop).result(timeout + 1)
+            except Exception as e:
+                logger.warning(f"Error flushing news batches: {str(e)}")
+        super().stop(timeout)
@@ -1,11 +1,114 @@
 import aiohttp
+import asyncio
+import json
 import logging
 import os
+import time
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional
+
+from ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+class IncrementalNewsParser:
+    """
+    Parses the ``Title:/Source:/Summary:`` article list as text arrives.
+
+    ``feed`` takes any chunk of the response text and returns the articles
+    completed by it. An article is complete once its ``Summary:`` line has
+    ended, or when the next article's title starts; ``close`` returns the
+    last one if it never got a summary. Fed the whole text at once, the
+    parser gives the same articles as parsing the full response.
+    """
+
+    def __init__(self):
+        self.articles: List[dict] = []
+        self._buffer = ""
+        self._current: dict = {}
+        self._emitted = False
+
+    def feed(self, text: str) -> List[dict]:
+        self._buffer += text
+        if "\n" not in self._buffer:
+            return []
+        *lines, self._buffer = self._buffer.split("\n")
+        completed: List[dict] = []
+        for line in lines:
+            self._parse_line(line, completed)
+        return completed
+
+    def close(self) -> List[dict]:
+        completed: List[dict] = []
+        if self._buffer:
+            self._parse_line(self._buffer, completed)
+            self._buffer = ""
+        if self._current and not self._emitted:
+            self._complete(completed)
+        return completed
+
+    def _complete(self, completed: List[dict]):
+        self.articles.append(self._current)
+        completed.append(self._current)
+        self._emitted = True
+
+    def _parse_line(self, line: str, completed: List[dict]):
+        line = line.strip()
+        if not line:
+            return
+
+        if line.startswith("Title:") or line.startswith("1.") or line.startswith("2."):
+            # 新文章开始：上一篇还没有摘要时在这里结束
+            if self._current and not self._emitted:
+                self._complete(completed)
+            # 提取标题
+            self._current = {"title": line.split(":", 1)[-1].strip().strip('"')}
+            self._emitted = False
+
+        elif "Source:" in line:
+            parts = line.split("Source:", 1)
+            self._current["source"] = parts[1].split("|")[0].strip()
+            if "Time:" in line:
+                self._current["published_at"] = line.split("Time:", 1)[1].strip()
+
+        elif "Summary:" in line:
+            self._current["summary"] = line.split("Summary:", 1)[1].strip()
+            # 摘要是每篇文章的最后一行，流式输出时不必等下一篇开始
+            if not self._emitted:
+                self._complete(completed)
+
+
+def split_batch_results(content: str, symbols: List[str]) -> Dict[str, List[dict]]:
+    """
+    Split the answer to a batched prompt into articles per symbol.
+
+    Articles under a ``Symbol: AAPL, MSFT`` line go to those symbols; articles
+    under ``Symbol: ALL`` and before the first such line go to every symbol.
+    Symbols that were not asked for are ignored.
+    """
+    results: Dict[str, List[dict]] = {symbol: [] for symbol in symbols}
+    by_name = {symbol.upper(): symbol for symbol in symbols}
+    targets = list(symbols)
+    parser = IncrementalNewsParser()
+
+    def assign(articles: List[dict]):
+        for article in articles:
+            for symbol in targets:
+                results[symbol].append(article)
+
+    for line in content.split("\n"):
+        header = line.strip().lstrip("#*- ").rstrip("*")
+        if header.lower().startswith(("symbol:", "symbols:")):
+            assign(parser.close())
+            names = [name.strip().strip("*").upper() for name in header.split(":", 1)[1].split(",")]
+            targets = list(symbols) if "ALL" in names else [by_name[name] for name in names if name in by_name]
+            parser = IncrementalNewsParser()
+            continue
+        assign(parser.feed(line + "\n"))
+    assign(parser.close())
+    return results
+
+
 class NewsSearcher:
     def __init__(self, config: dict):
         """
@@ -19,15 +122,61 @@ class NewsSearcher:
         if not self.api_key:
             raise ValueError("请设置DEEPSEEK_API_KEY环境变量或在配置中设置api_key")
             
-        self.base_url = "https://api.deepseek.com/v1/chat/completions"
+        # base_url 可指向本地的模拟 chat-completions 服务用于测试
+        self.base_url = config.get('base_url') or "https://api.deepseek.com/v1/chat/completions"
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
-        
+        self.timeout = aiohttp.ClientTimeout(
+            total=config.get('timeout_seconds', 30),
+            connect=config.get('connect_timeout_seconds', 5)
+        )
+        self.max_connections = config.get('max_connections', 10)
+        # 流式响应：每解析出一篇新闻就立即发出，不等待完整回复
+        self.stream = config.get('stream', False)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        # 相同股票在同一时间段内的重复触发复用同一个 DeepSeek 响应
+        cache_config = config.get('cache') or {}
+        self.cache_bucket_seconds = cache_config.get('bucket_minutes', 5) * 60
+        self.cache = TTLCache(
+            max_entries=cache_config.get('max_entries', 256),
+            ttl_seconds=cache_config.get('ttl_seconds', self.cache_bucket_seconds)
+        )
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the long-lived session, creating it on first use in the running loop."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers=self.headers
+            )
+        return self._session
+
+    async def close(self):
+        """Close the shared HTTP session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @property
+    def cache_stats(self) -> dict:
+        """Hit/miss counters of the response cache."""
+        return self.cache.stats()
+
+    def _cache_key(self, symbol: str, is_index: bool) -> tuple:
+        return symbol, is_index, int(time.time() // self.cache_bucket_seconds)
+
     async def search_news(self, symbol: str, company_name: Optional[str] = None, is_index: bool = False) -> List[dict]:
         """
         Search for breaking news about the given stock symbol using DeepSeek's chat API.
+
+        Results are cached per (symbol, is_index, time bucket), and concurrent
+        calls for the same key share a single in-flight request.
         
         Args:
             symbol: Stock symbol
@@ -37,71 +186,267 @@ class NewsSearcher:
         Returns:
             List of news articles
         """
+        key = self._cache_key(symbol, is_index)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
         try:
-            # 构建搜索提示词
-            system_message = (
-                "You are a financial news analyst specializing in real-time market analysis. "
-                "Your task is to search and analyze breaking news about financial markets "
-                "and stocks. Please provide a concise summary of the most relevant and "
-                "recent news, focusing on market-moving events that happened in the last 10 minutes."
-            )
-            
-            if is_index:
-                # 指数的提示词，关注整体市场动向
-                user_message = (
-                    f"Please analyze and summarize the most important breaking news in the last 10 minutes "
-                    f"that could explain the current movement in {symbol}. "
-                    f"Focus on broad market news, including:\n"
-                    f"1. Major economic events or data releases\n"
-                    f"2. Global market trends and developments\n"
-                    f"3. Political or policy changes affecting markets\n"
-                    f"4. Significant sector-wide movements\n"
-                    f"Format your response as a list of news items, each with a title, source, "
-                    f"time, and brief summary. Only include factual, market-relevant information "
-                    f"that could explain sudden market movements."
-                )
+            articles = await self._fetch_news(symbol, company_name, is_index)
+            if articles is not None:
+                self.cache.put(key, articles)
+            result = articles or []
+            future.set_result(result)
+            return result
+        except BaseException:
+            # 请求被取消时，等待同一请求的其他调用也一并取消
+            future.cancel()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def search_news_stream(self, symbol: str, company_name: Optional[str] = None,
+                                 is_index: bool = False) -> AsyncIterator[dict]:
+        """
+        Like ``search_news``, but requests a streamed (SSE) completion and
+        yields each article as soon as it has been parsed.
+
+        Shares the cache and in-flight requests with ``search_news``: cached
+        articles are yielded at once, and a caller that joins a running
+        lookup gets its articles when that lookup finishes.
+        """
+        key = self._cache_key(symbol, is_index)
+        cached = self.cache.get(key)
+        if cached is not None:
+            for article in cached:
+                yield article
+            return
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            for article in await asyncio.shield(inflight):
+                yield article
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        articles: List[dict] = []
+        try:
+            try:
+                async for article in self._stream_news(symbol, company_name, is_index):
+                    articles.append(article)
+                    yield article
+            except Exception as e:
+                # 已经输出的文章保留，但不写入缓存
+                logger.error(f"Error streaming news for {symbol}: {str(e)}")
             else:
-                # 个股的提示词，关注公司和行业新闻
-                user_message = (
-                    f"Please analyze and summarize the most important breaking news in the last 10 minutes "
-                    f"for {symbol} stock{f' ({company_name})' if company_name else ''}. "
-                    f"Focus on:\n"
-                    f"1. Company-specific news and announcements\n"
-                    f"2. Industry-related developments\n"
-                    f"3. Competitor activities that might affect the company\n"
-                    f"4. Regulatory changes impacting the company or industry\n"
-                    f"Format your response as a list of news items, each with a title, source, "
-                    f"time, and brief summary. Only include factual, market-relevant information "
-                    f"that could explain sudden stock price movements."
-                )
-            
-            # 准备请求参数
-            data = {
-                "model": "deepseek-chat",
-                "messages": [
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_message}
-                ],
-                "temperature": 0.3,  # 保持输出的一致性
-                "max_tokens": 1000
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.base_url,
-                    headers=self.headers,
-                    json=data
-                ) as response:
-                    if response.status != 200:
-                        logger.error(f"Failed to fetch news. Status: {response.status}")
-                        return []
-                    
-                    result = await response.json()
-                    return self._process_news_results(result)
+                self.cache.put(key, articles)
+            future.set_result(articles)
+        except BaseException:
+            # 请求被取消或调用方提前停止读取时，等待同一请求的其他调用也一并取消
+            future.cancel()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _stream_news(self, symbol: str, company_name: Optional[str], is_index: bool) -> AsyncIterator[dict]:
+        """Call the chat-completions API with ``stream`` and parse the SSE events as they arrive."""
+        data = self._build_request(symbol, company_name, is_index)
+        data["stream"] = True
+        parser = IncrementalNewsParser()
+        session = self._get_session()
+        async with session.post(self.base_url, json=data) as response:
+            if response.status != 200:
+                raise RuntimeError(f"Failed to fetch news. Status: {response.status}")
+
+            # 每个事件一行 "data: {...}"，内容增量在 choices[0].delta.content，以 "data: [DONE]" 结束
+            async for line in response.content:
+                line = line.strip()
+                if not line.startswith(b"data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == b"[DONE]":
+                    break
+                choices = json.loads(payload).get("choices") or [{}]
+                text = (choices[0].get("delta") or {}).get("content")
+                if text:
+                    for article in parser.feed(text):
+                        yield article
+
+        for article in parser.close():
+            yield article
+
+    async def search_news_batch(self, symbols: List[str], is_index: bool = False,
+                                group: Optional[str] = None) -> Dict[str, List[dict]]:
+        """
+        Look up news for several symbols that moved together with one request.
+
+        Symbols that are cached or already being looked up are served from
+        there; the rest share a single prompt whose answer is split back out
+        per symbol. Each symbol's articles are cached under the same key as
+        ``search_news``, so later single lookups reuse them.
+
+        Args:
+            symbols: Symbols to look up
+            is_index: Whether the symbols are market indices
+            group: Sector (or other grouping) the symbols share, added to the prompt
+
+        Returns:
+            Mapping of every requested symbol to its articles
+        """
+        results: Dict[str, List[dict]] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        missing: List[str] = []
+        for symbol in dict.fromkeys(symbols):
+            key = self._cache_key(symbol, is_index)
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[symbol] = cached
+            elif key in self._inflight:
+                waiting[symbol] = self._inflight[key]
+            else:
+                missing.append(symbol)
+
+        futures = {}
+        loop = asyncio.get_running_loop()
+        for symbol in missing:
+            key = self._cache_key(symbol, is_index)
+            futures[key] = self._inflight[key] = loop.create_future()
+        try:
+            fetched = await self._fetch_news_batch(missing, is_index, group) if missing else {}
+            for symbol in missing:
+                key = self._cache_key(symbol, is_index)
+                articles = fetched.get(symbol) if fetched is not None else None
+                if articles is not None:
+                    self.cache.put(key, articles)
+                results[symbol] = articles or []
+                futures[key].set_result(results[symbol])
+        except BaseException:
+            for future in futures.values():
+                future.cancel()
+            raise
+        finally:
+            for key in futures:
+                del self._inflight[key]
+
+        for symbol, future in waiting.items():
+            results[symbol] = await asyncio.shield(future)
+        return results
+
+    async def _fetch_news_batch(self, symbols: List[str], is_index: bool,
+                                group: Optional[str]) -> Optional[Dict[str, List[dict]]]:
+        """Call the chat-completions API once for all symbols. Returns None when the request fails."""
+        if len(symbols) == 1:
+            articles = await self._fetch_news(symbols[0], None, is_index)
+            return None if articles is None else {symbols[0]: articles}
+        try:
+            data = self._build_batch_request(symbols, is_index, group)
+            session = self._get_session()
+            async with session.post(self.base_url, json=data) as response:
+                if response.status != 200:
+                    logger.error(f"Failed to fetch news. Status: {response.status}")
+                    return None
+
+                result = await response.json()
+                content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+                return split_batch_results(content, symbols)
+
+        except Exception as e:
+            logger.error(f"Error searching news for {', '.join(symbols)}: {str(e)}")
+            return None
+
+    def _build_batch_request(self, symbols: List[str], is_index: bool, group: Optional[str]) -> dict:
+        """Build one request covering several symbols that moved at the same time."""
+        data = self._build_request(", ".join(symbols), None, is_index)
+        kind = "indices" if is_index else "stocks"
+        data["messages"][1]["content"] = (
+            f"The following {kind} moved sharply at the same time: {', '.join(symbols)}"
+            f"{f' (sector: {group})' if group else ''}. "
+            f"Please analyze and summarize the most important breaking news in the last 10 minutes "
+            f"that could explain these movements. Cover broad market or sector news that affects "
+            f"all of them first, then news specific to individual {kind}.\n"
+            f"Start every group of news items with a line \"Symbol: \" followed by the symbols it "
+            f"applies to, separated by commas, or \"Symbol: ALL\" for news that affects all of them. "
+            f"Format each news item as a \"Title:\" line, a \"Source: <source> | Time: <time>\" line "
+            f"and a \"Summary:\" line. Only include factual, market-relevant information "
+            f"that could explain sudden price movements."
+        )
+        # 回复需要覆盖多个股票，按股票数增加输出长度上限
+        data["max_tokens"] = min(4000, 1000 + 300 * (len(symbols) - 1))
+        return data
+
+    def _build_request(self, symbol: str, company_name: Optional[str], is_index: bool) -> dict:
+        """Build the chat-completions request body for a symbol."""
+        # 构建搜索提示词
+        system_message = (
+            "You are a financial news analyst specializing in real-time market analysis. "
+            "Your task is to search and analyze breaking news about financial markets "
+            "and stocks. Please provide a concise summary of the most relevant and "
+            "recent news, focusing on market-moving events that happened in the last 10 minutes."
+        )
+        
+        if is_index:
+            # 指数的提示词，关注整体市场动向
+            user_message = (
+                f"Please analyze and summarize the most important breaking news in the last 10 minutes "
+                f"that could explain the current movement in {symbol}. "
+                f"Focus on broad market news, including:\n"
+                f"1. Major economic events or data releases\n"
+                f"2. Global market trends and developments\n"
+                f"3. Political or policy changes affecting markets\n"
+                f"4. Significant sector-wide movements\n"
+                f"Format your response as a list of news items, each with a title, source, "
+                f"time, and brief summary. Only include factual, market-relevant information "
+                f"that could explain sudden market movements."
+            )
+        else:
+            # 个股的提示词，关注公司和行业新闻
+            user_message = (
+                f"Please analyze and summarize the most important breaking news in the last 10 minutes "
+                f"for {symbol} stock{f' ({company_name})' if company_name else ''}. "
+                f"Focus on:\n"
+                f"1. Company-specific news and announcements\n"
+                f"2. Industry-related developments\n"
+                f"3. Competitor activities that might affect the company\n"
+                f"4. Regulatory changes impacting the company or industry\n"
+                f"Format your response as a list of news items, each with a title, source, "
+                f"time, and brief summary. Only include factual, market-relevant information "
+                f"that could explain sudden stock price movements."
+            )
+        
+        # 准备请求参数
+        return {
+            "model": "deepseek-chat",
+            "messages": [
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": user_message}
+            ],
+            "temperature": 0.3,  # 保持输出的一致性
+            "max_tokens": 1000
+        }
+
+    async def _fetch_news(self, symbol: str, company_name: Optional[str], is_index: bool) -> Optional[List[dict]]:
+        """Call the chat-completions API. Returns None when the request fails."""
+        try:
+            data = self._build_request(symbol, company_name, is_index)
+            session = self._get_session()
+            async with session.post(self.base_url, json=data) as response:
+                if response.status != 200:
+                    logger.error(f"Failed to fetch news. Status: {response.status}")
+                    return None
+                
+                result = await response.json()
+                return self._process_news_results(result)
                     
         except Exception as e:
             logger.error(f"Error searching news for {symbol}: {str(e)}")
-            return []
+            return None
     
     def _process_news_results(self, data: dict) -> List[dict]:
         """Process and format the news search results."""
@@ -113,38 +458,10 @@ class NewsSearcher:
             
             # 解析文本内容为结构化的新闻列表
             # 这里假设AI返回的是格式化的文本，我们需要解析它
-            articles = []
-            current_article = {}
-            
-            for line in content.split("\n"):
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                if line.startswith("Title:") or line.startswith("1.") or line.startswith("2."):
-                    # 如果已经有一个文章在处理中，保存它
-                    if current_article:
-                        articles.append(current_article.copy())
-                        current_article = {}
-                    
-                    # 提取标题
-                    title = line.split(":", 1)[-1].strip().strip('"')
-                    current_article["title"] = title
-                    
-                elif "Source:" in line:
-                    parts = line.split("Source:", 1)
-                    current_article["source"] = parts[1].split("|")[0].strip()
-                    if "Time:" in line:
-                        current_article["published_at"] = line.split("Time:", 1)[1].strip()
-                        
-                elif "Summary:" in line:
-                    current_article["summary"] = line.split("Summary:", 1)[1].strip()
-            
-            # 添加最后一个文章
-            if current_article:
-                articles.append(current_article)
-            
-            return articles
+            parser = IncrementalNewsParser()
+            parser.feed(content)
+            parser.close()
+            return parser.articles
             
         except Exception as e:
             logger.error(f"Error processing news results: {str(e)}")
@@ -164,10 +481,17 @@ class NewsSearcher:
         # 构建新闻信息
         news_info = [f"[NEWS UPDATE] Found {len(articles)} relevant news:"]
         for i, article in enumerate(articles, 1):
-            news_info.extend([
-                f"{i}. \"{article['title']}\"",
-                f"   Source: {article['source']} | Time: {article['published_at']}",
-                f"   Summary: {article['summary'][:200]}..."
-            ])
+            news_info.extend(self._format_article(i, article))
         
-        return "\n".join([price_info, ""] + news_info) 
\ No newline at end of file
+        return "\n".join([price_info, ""] + news_info)
+
+    def format_news_followup(self, symbol: str, index: int, article: dict) -> str:
+        """Format one article that arrived after the alert for ``symbol`` was sent."""
+        return "\n".join([f"[NEWS UPDATE] {symbol} news #{index}:"] + self._format_article(index, article))
+
+    def _format_article(self, index: int, article: dict) -> List[str]:
+        return [
+            f"{index}. \"{article.get('title', '')}\"",
+            f"   Source: {article.get('source', 'N/A')} | Time: {article.get('published_at', 'N/A')}",
+            f"   Summary: {article.get('summary', '')[:200]}..."
+        ] 
\ No newline at end of file
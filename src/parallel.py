@@ -0,0 +1,442 @@
+import logging
+import multiprocessing as mp
+import threading
+import time
+import zlib
+from multiprocessing import shared_memory
+from queue import Empty
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from evaluation import ThresholdEvaluator
+from price_validator import PriceMovementValidator, from_epoch_ns
+from rules import RuleEngine
+from tick_batch import SymbolUpdate
+
+logger = logging.getLogger(__name__)
+
+# 共享内存环形缓冲区中的一条记录（一个股票在一帧内的聚合更新）
+TICK_DTYPE = np.dtype([
+    ('symbol_id', '<u4'),
+    ('count', '<u4'),
+    ('timestamp', '<i8'),     # 交易所时间戳（毫秒），0 表示未知
+    ('price', '<f8'),
+    ('vwap', '<f8'),
+    ('volume', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('received_ns', '<i8'),
+])
+
+# 头部字段（int64）：已写入记录数、已处理记录数、已发出的结果批次数
+_HEAD, _TAIL, _EMITTED = 0, 1, 2
+_HEADER_SIZE = 64
+# worker 持续忙碌时，每处理这么多批记录检查一次控制消息（配置热更新、停止）
+CONTROL_POLL_CHUNKS = 64
+
+
+def shard_of(symbol: str, workers: int) -> int:
+    """Stable symbol-to-worker assignment (``hash()`` is salted per process)."""
+    return zlib.crc32(symbol.encode()) % workers
+
+
+class SharedRing:
+    """
+    Single-producer/single-consumer ring of TICK_DTYPE records in shared memory.
+
+    The producer only advances the head and the consumer only advances the
+    tail. Both counters are read and written only while holding a
+    cross-process lock (a POSIX semaphore), whose acquire and release are
+    full memory barriers on every platform: records copied in before the
+    head is published are visible to the consumer that reads the new head,
+    also on weakly ordered CPUs such as ARM64, and the producer never reuses
+    a slot before the consumer's copy of it is complete. Records themselves
+    are copied outside the lock, so it is taken twice per batch, not per tick.
+    """
+
+    def __init__(self, capacity: int, name: Optional[str] = None, lock=None):
+        """
+        Args:
+            capacity: Number of records, rounded up to a power of two
+            name: Attach to an existing ring instead of creating one
+            lock: The ring's ``multiprocessing`` lock (required when attaching;
+                created from the spawn context otherwise)
+        """
+        capacity = 1 << max(0, capacity - 1).bit_length()
+        size = _HEADER_SIZE + capacity * TICK_DTYPE.itemsize
+        self.owner = name is None
+        if lock is None:
+            if not self.owner:
+                raise ValueError("attaching to a ring requires its lock")
+            lock = mp.get_context('spawn').Lock()
+        self.lock = lock
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self.header = np.ndarray((_HEADER_SIZE // 8,), dtype=np.int64, buffer=self.shm.buf)
+        self.records = np.ndarray((capacity,), dtype=TICK_DTYPE, buffer=self.shm.buf, offset=_HEADER_SIZE)
+        if self.owner:
+            self.header[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def __len__(self):
+        with self.lock:
+            return int(self.header[_HEAD] - self.header[_TAIL])
+
+    def counter(self, field: int) -> int:
+        """Read a header counter (``_TAIL``, ``_EMITTED``) from another process."""
+        with self.lock:
+            return int(self.header[field])
+
+    def put(self, rows: np.ndarray) -> int:
+        """Copy as many rows as fit; returns the number written."""
+        with self.lock:
+            head = int(self.header[_HEAD])
+            free = self.capacity - (head - int(self.header[_TAIL]))
+        count = min(len(rows), free)
+        if count <= 0:
+            return 0
+        start = head & self._mask
+        first = min(count, self.capacity - start)
+        self.records[start:start + first] = rows[:first]
+        if count > first:
+            self.records[:count - first] = rows[first:count]
+        # 记录写完后在锁内发布新的 head（锁的获取/释放即内存屏障）
+        with self.lock:
+            self.header[_HEAD] = head + count
+        return count
+
+    def peek(self, limit: int) -> np.ndarray:
+        """Copy up to ``limit`` unconsumed records without releasing them."""
+        with self.lock:
+            tail = int(self.header[_TAIL])
+            count = min(int(self.header[_HEAD]) - tail, limit)
+        start = tail & self._mask
+        first = min(count, self.capacity - start)
+        if count == first:
+            return self.records[start:start + count].copy()
+        return np.concatenate((self.records[start:], self.records[:count - first]))
+
+    def release(self, count: int, emitted: int = 0):
+        """Mark records as processed so the producer can reuse their slots; ``emitted`` counts result batches."""
+        with self.lock:
+            self.header[_TAIL] += count
+            self.header[_EMITTED] += emitted
+
+    def close(self):
+        # 先释放 NumPy 视图，否则共享内存无法关闭
+        del self.header, self.records
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class _ShardWorker:
+    """Evaluation state owned by one worker process."""
+
+    def __init__(self, symbols: List[str], alerts: Dict[str, dict], rules: Dict[str, list],
+                 index_symbols: List[str], trigger_conditions: Optional[dict], calendar=None):
+        self.symbols = symbols
+        self.evaluator = ThresholdEvaluator(alerts)
+        self.rules = RuleEngine(rules, calendar)
+        self.index_set = set(index_symbols)
+        self.validator = PriceMovementValidator(trigger_conditions) if trigger_conditions else None
+
+    def handle(self, message: tuple) -> bool:
+        """Apply one control message; returns False when it asks the worker to stop."""
+        if message[0] == 'stop':
+            return False
+        if message[0] == 'symbols':
+            self.symbols.extend(message[1])
+        elif message[0] == 'config':
+            # 配置热更新：保留已有股票的上一个价格和价格窗口
+            _, alerts, rules, index_symbols, trigger_conditions, calendar = message
+            self.evaluator = self.evaluator.rebuild(alerts)
+            self.rules = self.rules.rebuild(rules, calendar=calendar)
+            self.index_set = set(index_symbols)
+            if not trigger_conditions:
+                self.validator = None
+            elif self.validator is None:
+                self.validator = PriceMovementValidator(trigger_conditions)
+            else:
+                self.validator.reconfigure(trigger_conditions)
+        return True
+
+    def process(self, records: np.ndarray) -> list:
+        """Evaluate one chunk of records; returns alert and news results for the parent."""
+        symbols = self.symbols
+        updates = []
+        for symbol_id, count, timestamp, price, vwap, volume, high, low, _ in records.tolist():
+            update = SymbolUpdate(symbols[symbol_id], price, volume, timestamp or None)
+            update.count, update.vwap, update.high, update.low = count, vwap, high, low
+            updates.append(update)
+
+        results = []
+        received = records['received_ns']
+        evaluation = self.evaluator.evaluate(updates)
+        for position, symbol, price, change, pct, reason in self.evaluator.breaches(evaluation):
+            results.append(('alert', symbol, price, change, pct, int(received[position]), reason))
+        if self.rules:
+            # 与单进程一致：规则警报使用本批最早的接收时间
+            received_ns = int(received.min())
+            for symbol, price, change, pct, reason in self.rules.evaluate(updates):
+                results.append(('alert', symbol, price, change, pct, received_ns, reason))
+
+        if self.validator:
+            validator = self.validator
+            now_ns = time.time_ns()
+            latest_ns = 0
+            for update in updates:
+                timestamp_ns = update.timestamp * 1_000_000 if update.timestamp else now_ns
+                validator.add_price_ns(update.symbol, update.price, timestamp_ns)
+                if timestamp_ns > latest_ns:
+                    latest_ns = timestamp_ns
+            current_time = from_epoch_ns(latest_ns)
+            for symbol in {update.symbol for update in updates}:
+                is_index = symbol in self.index_set
+                movement = validator.should_trigger_news_search(symbol, current_time, is_index)
+                if movement:
+                    results.append(('news', symbol, movement, is_index))
+        return results
+
+
+def _worker_main(ring_name: str, ring_lock, capacity: int, symbols: List[str], alerts: Dict[str, dict],
+                 rules: Dict[str, list], index_symbols: List[str], trigger_conditions: Optional[dict],
+                 calendar, control, results, chunk: int):
+    ring = SharedRing(capacity, name=ring_name, lock=ring_lock)
+    worker = _ShardWorker(symbols, alerts, rules, index_symbols, trigger_conditions, calendar)
+    idle = 0
+    busy = 0
+    try:
+        while True:
+            records = ring.peek(chunk)
+            # 空闲时检查控制消息；持续忙碌时每 CONTROL_POLL_CHUNKS 批也检查一次，热更新和停止不会被积压的tick推迟
+            if not len(records) or busy >= CONTROL_POLL_CHUNKS:
+                busy = 0
+                try:
+                    message = control.get_nowait()
+                except Empty:
+                    message = None
+                if message is not None:
+                    if not worker.handle(message):
+                        break
+                    continue
+                if not len(records):
+                    idle += 1
+                    time.sleep(0.0002 if idle < 100 else 0.002)
+                    continue
+            idle = 0
+            if int(records['symbol_id'].max()) >= len(worker.symbols):
+                # 新股票的名称随控制消息发送，可能比tick晚到
+                if not worker.handle(control.get()):
+                    break
+                continue
+            busy += 1
+            try:
+                output = worker.process(records)
+            except Exception:
+                logger.exception("Evaluation worker failed to process ticks")
+                output = None
+            if output:
+                results.put(output)
+            ring.release(len(records), 1 if output else 0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.close()
+
+
+class ParallelEvaluator:
+    """
+    Partitions symbols by hash across worker processes.
+
+    Each worker owns the last prices (a ThresholdEvaluator) and the
+    PriceMovementValidator windows of its symbols. Ticks are handed over as
+    fixed-width records through one shared-memory ring per worker instead of
+    pickled queue items; only alerts and news triggers come back through a
+    multiprocessing queue and are dispatched by a single merger thread.
+    """
+
+    def __init__(self, alerts: Dict[str, dict], workers: int, on_alert: Callable,
+                 on_news: Optional[Callable] = None, rules: Optional[Dict[str, list]] = None,
+                 index_symbols: Optional[List[str]] = None,
+                 trigger_conditions: Optional[dict] = None, ring_capacity: int = 1 << 16,
+                 chunk: int = 4096, put_timeout: float = 1.0, calendar=None):
+        """
+        Args:
+            alerts: Mapping of symbol to its ``alerts`` config
+            workers: Number of worker processes
+            on_alert: ``callback(symbol, price, change, pct, received_ns, reason)`` in the merger thread
+            on_news: ``callback(symbol, movement, is_index)`` for validator triggers
+            rules: Mapping of symbol to its ``rules`` config (see rules.RuleEngine)
+            index_symbols: Symbols that use the index thresholds of the validator
+            trigger_conditions: ``news_alert.trigger_conditions``; None disables the validator
+            ring_capacity: Records per worker ring
+            chunk: Maximum records a worker evaluates at once
+            put_timeout: Seconds to wait for ring space before dropping ticks
+            calendar: MarketCalendar for the rules' session indicators, sent to every worker
+        """
+        self.alerts = alerts
+        self.workers = workers
+        self.on_alert = on_alert
+        self.on_news = on_news
+        self.rules = {symbol: configs for symbol, configs in (rules or {}).items() if configs}
+        self.index_symbols = list(index_symbols or [])
+        self.trigger_conditions = trigger_conditions
+        self.ring_capacity = ring_capacity
+        self.chunk = chunk
+        self.put_timeout = put_timeout
+        self.calendar = calendar
+
+        self.symbols: List[str] = list(alerts)
+        self.symbol_ids: Dict[str, int] = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._shards = [shard_of(symbol, workers) for symbol in self.symbols]
+
+        self.rings: List[SharedRing] = []
+        self.processes: List[mp.Process] = []
+        self._controls = []
+        self._results = None
+        self._merger = None
+        self._received = 0
+        self.dropped = 0
+        self.ring_full_waits = 0
+
+    def start(self):
+        # spawn：父进程已有WebSocket等线程，fork 不安全
+        ctx = mp.get_context('spawn')
+        self._results = ctx.Queue()
+        for index in range(self.workers):
+            shard_symbols, shard_rules = self._shard_config(index)
+            ring = SharedRing(self.ring_capacity, lock=ctx.Lock())
+            control = ctx.Queue()
+            process = ctx.Process(
+                target=_worker_main,
+                args=(ring.name, ring.lock, ring.capacity, list(self.symbols), shard_symbols, shard_rules, self.index_symbols,
+                      self.trigger_conditions, self.calendar, control, self._results, self.chunk),
+                name=f"eval-worker-{index}",
+                daemon=True
+            )
+            process.start()
+            self.rings.append(ring)
+            self._controls.append(control)
+            self.processes.append(process)
+
+        self._merger = threading.Thread(target=self._merge_results, name='eval-merger', daemon=True)
+        self._merger.start()
+        logger.info(f"Started {self.workers} evaluation workers for {len(self.symbols)} symbols")
+
+    def _shard_config(self, index: int):
+        alerts = {s: a for s, a in self.alerts.items() if shard_of(s, self.workers) == index}
+        rules = {s: r for s, r in self.rules.items() if shard_of(s, self.workers) == index}
+        return alerts, rules
+
+    def update(self, alerts: Dict[str, dict], rules: Optional[Dict[str, list]] = None,
+               index_symbols: Optional[List[str]] = None, trigger_conditions: Optional[dict] = None,
+               calendar=None):
+        """Send new thresholds and rules to the workers without restarting them."""
+        self.rules = {symbol: configs for symbol, configs in (rules or {}).items() if configs}
+        self.calendar = calendar or self.calendar
+        self.index_symbols = list(index_symbols or [])
+        self.trigger_conditions = trigger_conditions
+        # 新增的股票在第一次出现时由 submit 分配ID
+        self.alerts = alerts
+        for index, control in enumerate(self._controls):
+            shard_alerts, shard_rules = self._shard_config(index)
+            control.put(('config', shard_alerts, shard_rules, self.index_symbols, trigger_conditions,
+                         self.calendar))
+
+    def _merge_results(self):
+        while True:
+            output = self._results.get()
+            if output is None:
+                break
+            try:
+                for result in output:
+                    if result[0] == 'alert':
+                        self.on_alert(*result[1:])
+                    elif self.on_news:
+                        self.on_news(*result[1:])
+            except Exception:
+                logger.exception("Failed to dispatch worker results")
+            finally:
+                self._received += 1
+
+    def _symbol_id(self, symbol: str) -> Optional[int]:
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None and symbol in self.alerts:
+            # 运行中新增的股票：先把名称发给所有 worker，再写入tick
+            symbol_id = self.symbol_ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            self._shards.append(shard_of(symbol, self.workers))
+            for control in self._controls:
+                control.put(('symbols', [symbol]))
+        return symbol_id
+
+    def submit(self, updates: List[SymbolUpdate], received_ns: int):
+        """Route updates to their workers' rings (called from the single processing thread)."""
+        rows: List[list] = [[] for _ in range(self.workers)]
+        shards = self._shards
+        for update in updates:
+            symbol_id = self._symbol_id(update.symbol)
+            if symbol_id is None:
+                continue
+            rows[shards[symbol_id]].append((
+                symbol_id, update.count, update.timestamp or 0, update.price, update.vwap,
+                update.volume, update.high, update.low, received_ns
+            ))
+
+        for ring, shard_rows in zip(self.rings, rows):
+            if not shard_rows:
+                continue
+            records = np.array(shard_rows, dtype=TICK_DTYPE)
+            written = ring.put(records)
+            if written == len(records):
+                continue
+            # 环形缓冲区已满：短暂等待 worker 消化，超时后丢弃剩余tick
+            self.ring_full_waits += 1
+            deadline = time.monotonic() + self.put_timeout
+            while written < len(records) and time.monotonic() < deadline:
+                time.sleep(0.0005)
+                written += ring.put(records[written:])
+            if written < len(records):
+                self.dropped += len(records) - written
+                logger.warning(f"Evaluation worker ring full, dropped {len(records) - written} ticks")
+
+    def join(self, poll_interval: float = 0.001):
+        """Block until every submitted tick is evaluated and its results dispatched."""
+        while True:
+            if not all(process.is_alive() for process in self.processes):
+                raise RuntimeError("evaluation worker exited unexpectedly")
+            if all(len(ring) == 0 for ring in self.rings):
+                emitted = sum(ring.counter(_EMITTED) for ring in self.rings)
+                if self._received >= emitted:
+                    return
+            time.sleep(poll_interval)
+
+    def stats(self) -> dict:
+        return {
+            'workers': self.workers,
+            'queued': [len(ring) for ring in self.rings],
+            'processed': sum(ring.counter(_TAIL) for ring in self.rings),
+            'dropped': self.dropped,
+            'ring_full_waits': self.ring_full_waits,
+        }
+
+    def stop(self, timeout: float = 5.0):
+        # worker 收到停止消息后立即退出，环形缓冲区中尚未处理的tick被丢弃（需要时先调用 join）
+        for control in self._controls:
+            control.put(('stop',))
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        if self._results is not None:
+            self._results.put(None)
+            self._merger.join(timeout)
+        for ring in self.rings:
+            ring.close()
+        self.rings = []
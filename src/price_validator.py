@@ -1,19 +1,209 @@
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from array import array
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
 import logging
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
-class PricePoint:
-    def __init__(self, price: float, timestamp: datetime):
-        self.price = price
-        self.timestamp = timestamp
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_epoch_ns(timestamp: datetime) -> int:
+    """Convert a datetime to integer epoch nanoseconds (naive values are kept as-is)."""
+    epoch = _EPOCH if timestamp.tzinfo is None else _EPOCH_UTC
+    return (timestamp - epoch) // _MICROSECOND * 1000
+
+
+def from_epoch_ns(ns: int, tzinfo=None) -> datetime:
+    """Inverse of ``to_epoch_ns``."""
+    if tzinfo is None:
+        return _EPOCH + timedelta(microseconds=ns // 1000)
+    return (_EPOCH_UTC + timedelta(microseconds=ns // 1000)).astimezone(tzinfo)
+
+
+class RollingWindow:
+    """
+    Time-bounded price window stored as columnar ring buffers.
+
+    Prices live in an ``array('d')`` and epoch-ns timestamps in an
+    ``array('q')``, so a tick costs two machine words instead of a Python
+    object plus a datetime. Points are addressed by a monotonically
+    increasing sequence number; the slot is ``seq & mask``. Expired points
+    are evicted from the front in amortized O(1), and two monotonic deques
+    of sequence numbers track the running high and low.
+    """
+
+    __slots__ = ('span_ns', 'prices', 'timestamps', '_mask', '_start', '_end', '_highs', '_lows')
+
+    MIN_CAPACITY = 16
+    # from_points 对不少于此数量的数据点使用 NumPy 批量重建
+    BULK_POINTS = 16
+
+    def __init__(self, span: timedelta, capacity: int = MIN_CAPACITY):
+        self.span_ns = span // _MICROSECOND * 1000
+        capacity = max(self.MIN_CAPACITY, 1 << (capacity - 1).bit_length())
+        self.prices = array('d', bytes(8 * capacity))
+        self.timestamps = array('q', bytes(8 * capacity))
+        self._mask = capacity - 1
+        self._start = 0  # 最早数据点的序号
+        self._end = 0    # 下一个数据点的序号
+        self._highs = deque()  # 价格单调递减，队首为窗口最高价
+        self._lows = deque()   # 价格单调递增，队首为窗口最低价
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def capacity(self) -> int:
+        return self._mask + 1
+
+    def _resize(self, capacity: int):
+        prices = array('d', bytes(8 * capacity))
+        timestamps = array('q', bytes(8 * capacity))
+        mask = capacity - 1
+        old_prices, old_timestamps, old_mask = self.prices, self.timestamps, self._mask
+        for seq in range(self._start, self._end):
+            prices[seq & mask] = old_prices[seq & old_mask]
+            timestamps[seq & mask] = old_timestamps[seq & old_mask]
+        self.prices, self.timestamps, self._mask = prices, timestamps, mask
+
+    def evict(self, now_ns: int):
+        """Drop points older than ``now_ns - span``."""
+        cutoff = now_ns - self.span_ns
+        timestamps, mask = self.timestamps, self._mask
+        start, end = self._start, self._end
+        while start < end and timestamps[start & mask] < cutoff:
+            if self._highs[0] == start:
+                self._highs.popleft()
+            if self._lows[0] == start:
+                self._lows.popleft()
+            start += 1
+        self._start = start
+
+        # 交易变清淡后释放多余的缓冲区
+        capacity = self._mask + 1
+        if capacity > 4 * self.MIN_CAPACITY and (end - start) * 4 < capacity:
+            self._resize(capacity // 2)
+
+    def append(self, price: float, timestamp_ns: int):
+        """Add a point, evicting anything that has left the window."""
+        self.evict(timestamp_ns)
+        if self._end - self._start > self._mask:
+            self._resize((self._mask + 1) * 2)
+
+        seq = self._end
+        slot = seq & self._mask
+        prices = self.prices
+        prices[slot] = price
+        self.timestamps[slot] = timestamp_ns
+        self._end = seq + 1
+
+        mask = self._mask
+        highs = self._highs
+        while highs and prices[highs[-1] & mask] <= price:
+            highs.pop()
+        highs.append(seq)
+
+        lows = self._lows
+        while lows and prices[lows[-1] & mask] >= price:
+            lows.pop()
+        lows.append(seq)
+
+    def points(self):
+        """Copy of the live points, oldest first, as ``(prices, timestamps)`` arrays."""
+        n = self._end - self._start
+        capacity = self._mask + 1
+        slot = self._start & self._mask
+        if slot + n <= capacity:
+            return self.prices[slot:slot + n], self.timestamps[slot:slot + n]
+        wrapped = n - (capacity - slot)
+        return (self.prices[slot:] + self.prices[:wrapped],
+                self.timestamps[slot:] + self.timestamps[:wrapped])
+
+    @classmethod
+    def from_points(cls, span: timedelta, prices: array, timestamps: array, now_ns: int) -> 'RollingWindow':
+        """
+        Rebuild a window from ``points()`` output, dropping the points that
+        are already outside it at ``now_ns``.
+
+        Larger windows are filled with one copy and their high/low deques
+        are derived from suffix maxima/minima instead of replaying ``append``.
+        """
+        window = cls(span, len(prices))
+        cutoff = now_ns - window.span_ns
+        first = 0
+        if len(timestamps) and timestamps[0] < cutoff:
+            inside = np.frombuffer(timestamps, dtype=np.int64) >= cutoff
+            if not inside.any():
+                return window
+            # 与 evict 一致：从第一个仍在窗口内的点开始保留
+            first = int(inside.argmax())
+        count = len(prices) - first
+        if count < cls.BULK_POINTS:
+            for i in range(first, len(prices)):
+                window.append(prices[i], timestamps[i])
+            return window
+
+        window.prices[:count] = prices[first:]
+        window.timestamps[:count] = timestamps[first:]
+        window._end = count
+        # 单调队列中保留的正是严格大于（小于）其后所有价格的点
+        values = np.frombuffer(window.prices, dtype=np.float64, count=count)
+        later = np.empty(count)
+        later[-1] = -np.inf
+        np.maximum.accumulate(values[:0:-1], out=later[-2::-1])
+        window._highs = deque(np.nonzero(values > later)[0].tolist())
+        later[-1] = np.inf
+        np.minimum.accumulate(values[:0:-1], out=later[-2::-1])
+        window._lows = deque(np.nonzero(values < later)[0].tolist())
+        return window
+
+    def price_at(self, seq: int) -> float:
+        return self.prices[seq & self._mask]
+
+    def timestamp_at(self, seq: int) -> int:
+        return self.timestamps[seq & self._mask]
+
+    @property
+    def first(self) -> int:
+        return self._start
+
+    @property
+    def last(self) -> int:
+        return self._end - 1
+
+    @property
+    def high(self) -> int:
+        return self._highs[0]
+
+    @property
+    def low(self) -> int:
+        return self._lows[0]
 
 class PriceMovementValidator:
     def __init__(self, config: dict):
         """
         Initialize the price movement validator with configuration.
         
+        Args:
+            config: Dictionary containing trigger conditions configuration
+        """
+        self.reconfigure(config)
+        
+        self.price_windows: Dict[str, RollingWindow] = {}
+        self.last_alerts: Dict[str, datetime] = {}
+        # 记录输入时间的时区，输出时按原时区还原
+        self._tzinfo = None
+
+    def reconfigure(self, config: dict):
+        """
+        Apply new trigger conditions; existing price windows are kept.
+        
         Args:
             config: Dictionary containing trigger conditions configuration
         """
@@ -21,9 +211,40 @@ class PriceMovementValidator:
         self.min_data_points = config['min_data_points']
         self.price_thresholds = config['price_movement']
         self.cool_down_minutes = config['debounce']['cool_down_minutes']
-        
-        self.price_windows: Dict[str, List[PricePoint]] = {}
-        self.last_alerts: Dict[str, datetime] = {}
+        # 窗口长度变化时，已有窗口在下一次写入时按新长度淘汰旧数据
+        span_ns = self.window_size // _MICROSECOND * 1000
+        for window in getattr(self, 'price_windows', {}).values():
+            window.span_ns = span_ns
+
+    def export_state(self):
+        """
+        Copy the price windows and last alert times for a snapshot.
+
+        Returns:
+            ``(windows, last_alerts)``: symbol to ``(prices, timestamps)`` arrays,
+            and symbol to last alert time in epoch ns
+        """
+        windows = {symbol: window.points() for symbol, window in self.price_windows.items() if len(window)}
+        last_alerts = {symbol: to_epoch_ns(alerted) for symbol, alerted in self.last_alerts.items()}
+        return windows, last_alerts
+
+    def restore_state(self, windows: dict, last_alerts: Dict[str, int], now_ns: int):
+        """
+        Load state written by ``export_state``, dropping price points that are
+        already outside the window and alerts whose cooldown has passed.
+
+        Returns:
+            Number of windows and number of cooldowns restored
+        """
+        cooldown_ns = timedelta(minutes=self.cool_down_minutes) // _MICROSECOND * 1000
+        for symbol, (prices, timestamps) in windows.items():
+            window = RollingWindow.from_points(self.window_size, prices, timestamps, now_ns)
+            if len(window):
+                self.price_windows[symbol] = window
+        for symbol, alerted_ns in last_alerts.items():
+            if now_ns - alerted_ns < cooldown_ns:
+                self.last_alerts[symbol] = from_epoch_ns(alerted_ns, self._tzinfo)
+        return len(self.price_windows), len(self.last_alerts)
 
     def _is_in_cooldown(self, symbol: str, current_time: datetime) -> bool:
         """Check if the symbol is still in cooldown period."""
@@ -37,12 +258,8 @@ class PriceMovementValidator:
         """Remove data points outside the time window."""
         if symbol not in self.price_windows:
             return
-        
-        cutoff_time = current_time - self.window_size
-        self.price_windows[symbol] = [
-            point for point in self.price_windows[symbol]
-            if point.timestamp >= cutoff_time
-        ]
+
+        self.price_windows[symbol].evict(to_epoch_ns(current_time))
 
     def add_price_point(self, symbol: str, price: float, timestamp: datetime):
         """
@@ -53,19 +270,22 @@ class PriceMovementValidator:
             price: Current price
             timestamp: Time of the price update
         """
-        if symbol not in self.price_windows:
-            self.price_windows[symbol] = []
-        
-        # Clean old data points
-        self._clean_old_data_points(symbol, timestamp)
-        
-        # Add new data point
-        self.price_windows[symbol].append(PricePoint(price, timestamp))
-        
-        # Keep only necessary data points
-        max_points = max(100, self.min_data_points * 2)  # Arbitrary limit to prevent memory issues
-        if len(self.price_windows[symbol]) > max_points:
-            self.price_windows[symbol] = self.price_windows[symbol][-max_points:]
+        self._tzinfo = timestamp.tzinfo
+        self.add_price_ns(symbol, price, to_epoch_ns(timestamp))
+
+    def add_price_ns(self, symbol: str, price: float, timestamp_ns: int):
+        """
+        Add a new price point with an integer epoch-ns timestamp.
+
+        Same as ``add_price_point`` but skips the datetime conversion, for
+        callers that already have exchange timestamps as integers.
+        """
+        window = self.price_windows.get(symbol)
+        if window is None:
+            window = self.price_windows[symbol] = RollingWindow(self.window_size)
+
+        # Old points are evicted from the front as the new one is appended
+        window.append(price, timestamp_ns)
 
     def get_price_movement(self, symbol: str) -> Optional[dict]:
         """
@@ -81,19 +301,32 @@ class PriceMovementValidator:
         if len(window) < self.min_data_points:
             return None
         
-        base_price = window[0].price
-        current_price = window[-1].price
+        base_price = window.price_at(window.first)
+        current_price = window.price_at(window.last)
+        high_price = window.price_at(window.high)
+        low_price = window.price_at(window.low)
         
         abs_change = current_price - base_price
         pct_change = (abs_change / base_price) * 100
+
+        # 窗口内极值之间的变动：先到高点再到低点为负（回撤），反之为正
+        if window.high <= window.low:
+            swing_from, swing_to = high_price, low_price
+        else:
+            swing_from, swing_to = low_price, high_price
+        swing_change = swing_to - swing_from
         
         return {
             'base_price': base_price,
             'current_price': current_price,
             'absolute_change': abs_change,
             'percentage_change': pct_change,
-            'start_time': window[0].timestamp,
-            'end_time': window[-1].timestamp
+            'high_price': high_price,
+            'low_price': low_price,
+            'peak_to_trough_change': swing_change,
+            'peak_to_trough_percentage': (swing_change / swing_from) * 100,
+            'start_time': from_epoch_ns(window.timestamp_at(window.first), self._tzinfo),
+            'end_time': from_epoch_ns(window.timestamp_at(window.last), self._tzinfo)
         }
 
     def should_trigger_news_search(self, symbol: str, current_time: datetime, is_index: bool = False) -> Optional[dict]:
@@ -117,20 +350,25 @@ class PriceMovementValidator:
             return None
         
         pct_change = movement['percentage_change']
+        abs_change = movement['absolute_change']
+        kind = 'index' if is_index else 'stock'
+        
+        # 根据是否为指数选择不同的阈值（未区分时股票和指数共用同一组阈值）
+        pct_config = self.price_thresholds['percentage']
+        pct_thresholds = pct_config.get(kind, pct_config)
+        pct_triggered = pct_change >= pct_thresholds['up'] or pct_change <= pct_thresholds['down']
         
-        # 根据是否为指数选择不同的百分比阈值
-        pct_thresholds = (
-            self.price_thresholds['percentage']['index']
-            if is_index
-            else self.price_thresholds['percentage']['stock']
-        )
+        abs_config = self.price_thresholds.get('absolute')
+        abs_triggered = False
+        if abs_config:
+            abs_thresholds = abs_config.get(kind, abs_config)
+            abs_triggered = abs_change >= abs_thresholds['up'] or abs_change <= abs_thresholds['down']
         
-        # 只检查百分比变动
-        if (pct_change >= pct_thresholds['up'] or 
-            pct_change <= pct_thresholds['down']):
+        if pct_triggered or abs_triggered:
             self.last_alerts[symbol] = current_time
             movement['trigger_type'] = {
-                'percentage': True
+                'percentage': pct_triggered,
+                'absolute': abs_triggered
             }
             logger.info(f"News search triggered for {symbol}. Movement: {movement}")
             return movement
@@ -0,0 +1,250 @@
+import argparse
+import copy
+import json
+import os
+import threading
+import time
+from typing import Iterator, List, Optional, Tuple, Union
+
+from alert import AlertManager
+from alert_dispatcher import AlertSink
+from coalescing_buffer import BatchQueue
+from monitor import StockMonitor
+from price_validator import PriceMovementValidator
+from tick_format import read_tick_file, write_tick_file
+from utils import load_config
+
+
+class RecordingSink(AlertSink):
+    """Counts delivered alerts and records tick-receive to delivery latency."""
+
+    name = 'replay'
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self.latencies_ns: List[int] = []
+        self.delivered = 0
+
+    def emit(self, alert):
+        now = time.perf_counter_ns()
+        with self._lock:
+            self.delivered += 1
+            if alert.received_ns:
+                self.latencies_ns.append(now - alert.received_ns)
+
+
+class NewsTriggerRecorder:
+    """Stands in for NewsEnrichmentStage so replays count triggers without calling the LLM."""
+
+    def __init__(self):
+        self.triggers = 0
+        self.symbols = set()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def submit(self, symbol: str, movement: dict, is_index: bool = False) -> bool:
+        self.triggers += 1
+        self.symbols.add(symbol)
+        return True
+
+
+def _frame_time_ns(data: dict) -> Optional[int]:
+    """Exchange time of a trade frame (its latest trade), in epoch ns."""
+    if data.get('type') != 'trade' or not data.get('data'):
+        return None
+    latest = max(trade.get('t') or 0 for trade in data['data'])
+    return latest * 1_000_000 if latest else None
+
+
+def iter_recording(path: str) -> Iterator[Tuple[Optional[int], Union[str, dict]]]:
+    """
+    Stream a recording from disk.
+
+    JSONL files (one raw WebSocket message per line) yield the raw string so
+    replay pays the same JSON decode as the live feed. Binary tick files
+    yield already-decoded frames.
+
+    Yields:
+        ``(ts_ns, message)``; ``ts_ns`` is None when it was not decoded
+    """
+    if path.endswith('.jsonl') or path.endswith('.json'):
+        with open(path, 'r') as file:
+            for line in file:
+                line = line.strip()
+                if line:
+                    yield None, line
+    else:
+        yield from read_tick_file(path)
+
+
+def _percentile(samples: List[int], pct: float) -> float:
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * pct))] / 1e6
+
+
+class ReplayEngine:
+    """
+    Replays a recording through StockMonitor's processing path.
+
+    Messages go through ``on_message``/``handle_frame`` into a lossless
+    ``price_queue`` (one micro-batch per recorded frame, nothing coalesced,
+    so every run gives the same result) and are consumed by the real ``process_price_updates`` thread (or its
+    worker processes when ``eval_workers`` > 1), including the
+    PriceMovementValidator. Alerts are delivered to a RecordingSink
+    instead of sound/stdout, and news triggers are counted instead of
+    searched.
+    """
+
+    def __init__(self, config: dict, speed: float = 0.0, name: str = 'config'):
+        """
+        Args:
+            config: Monitor configuration (as loaded from config.yaml)
+            speed: 0 replays as fast as possible; otherwise the recording's
+                own timing is scaled by this factor (1.0 = real time)
+            name: Label used in the report
+        """
+        self.config = copy.deepcopy(config)
+        self.speed = speed
+        self.name = name
+
+    def _build_monitor(self) -> Tuple[StockMonitor, RecordingSink, Optional[NewsTriggerRecorder]]:
+        config = self.config
+        config.setdefault('settings', {})
+        config['settings']['finnhub_api_key'] = config['settings'].get('finnhub_api_key') or 'replay'
+        dispatch_config = dict(config.get('alert_dispatch') or {})
+        dispatch_config['sinks'] = []
+        config['alert_dispatch'] = dispatch_config
+
+        # 回放时不调用 DeepSeek，只统计新闻检索的触发次数
+        news_config = dict(config.get('news_alert') or {})
+        news_enabled = news_config.get('enabled') and 'trigger_conditions' in news_config
+        news_config['enabled'] = False
+        config['news_alert'] = news_config
+        # 回放从空状态开始，不读写状态快照
+        config['snapshot'] = {'enabled': False}
+        # 报告输出到 stdout（--json 时需要是完整的JSON），日志改为输出到 stderr
+        config['logging'] = dict(config.get('logging') or {}, stream='stderr')
+
+        monitor = StockMonitor(config)
+        # 实时行情才需要合并积压的更新；回放逐帧评估，结果可重复
+        monitor.price_queue = BatchQueue()
+        monitor.alert_manager.close()
+        sink = RecordingSink()
+        monitor.alert_manager = AlertManager(None, dispatch_config, sinks=[sink])
+
+        recorder = None
+        if news_enabled:
+            monitor.validator = PriceMovementValidator(news_config['trigger_conditions'])
+            recorder = monitor.enrichment = NewsTriggerRecorder()
+        return monitor, sink, recorder
+
+    def run(self, path: str) -> dict:
+        """Replay one recording and return the report."""
+        monitor, sink, recorder = self._build_monitor()
+        monitor.start_processing()
+
+        frames = 0
+        first_ts = None
+        started = time.perf_counter()
+        for ts_ns, message in iter_recording(path):
+            data = json.loads(message) if isinstance(message, str) and self.speed else message
+            if self.speed:
+                if ts_ns is None:
+                    ts_ns = _frame_time_ns(data)
+                if ts_ns is not None:
+                    # 按录制时的时间间隔（乘以速度系数）推送
+                    if first_ts is None:
+                        first_ts = ts_ns
+                    delay = (ts_ns - first_ts) / 1e9 / self.speed - (time.perf_counter() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+
+            if isinstance(data, str):
+                monitor.on_message(None, data)
+            else:
+                monitor.handle_frame(data)
+            frames += 1
+
+        monitor.wait_idle()
+        elapsed = time.perf_counter() - started
+        ticks = monitor.trades_received
+        buffer_stats = monitor.price_queue.stats()
+        if monitor.parallel:
+            monitor.parallel.stop()
+        monitor.alert_manager.close()
+        dispatch = monitor.alert_manager.stats()
+
+        latencies = sorted(sink.latencies_ns)
+        report = {
+            'config': self.name,
+            'frames': frames,
+            'ticks': ticks,
+            'elapsed_s': elapsed,
+            'ticks_per_s': ticks / elapsed if elapsed else 0.0,
+            'updates_coalesced': buffer_stats['coalesced'],
+            'updates_dropped': buffer_stats['dropped'],
+            'alerts_triggered': dispatch['submitted'],
+            'alerts_delivered': sink.delivered,
+            'alerts_collapsed': dispatch['collapsed'],
+            'news_triggers': recorder.triggers if recorder else 0,
+            'latency_ms': {
+                'p50': _percentile(latencies, 0.50),
+                'p90': _percentile(latencies, 0.90),
+                'p99': _percentile(latencies, 0.99),
+                'max': latencies[-1] / 1e6 if latencies else 0.0,
+            },
+        }
+        return report
+
+
+def format_report(report: dict) -> str:
+    latency = report['latency_ms']
+    return "\n".join([
+        f"[{report['config']}]",
+        f"  帧数: {report['frames']}, 成交笔数: {report['ticks']}, 耗时: {report['elapsed_s']:.2f} 秒",
+        f"  吞吐量: {report['ticks_per_s']:,.0f} ticks/s, 价格缓冲区合并 {report['updates_coalesced']}, "
+        f"丢弃 {report['updates_dropped']}",
+        f"  警报: 触发 {report['alerts_triggered']}, 发出 {report['alerts_delivered']}, "
+        f"合并 {report['alerts_collapsed']}, 新闻检索触发 {report['news_triggers']}",
+        f"  端到端延迟: p50 {latency['p50']:.2f}ms, p90 {latency['p90']:.2f}ms, "
+        f"p99 {latency['p99']:.2f}ms, max {latency['max']:.2f}ms",
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放录制的行情数据，离线测试警报流程的吞吐量和延迟")
+    parser.add_argument('recording', help='录制文件（.jsonl 每行一条WebSocket消息，或二进制tick文件）')
+    parser.add_argument('--config', action='append', help='配置文件，可重复指定以比较多套配置')
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help='回放速度：0 为尽可能快，1 为实时，10 为10倍速')
+    parser.add_argument('--convert', metavar='OUTPUT', help='把 JSONL 录制文件转换为二进制tick文件后退出')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出报告')
+    args = parser.parse_args()
+
+    if args.convert:
+        frames = (json.loads(message) for _, message in iter_recording(args.recording))
+        write_tick_file(args.convert, frames)
+        print(f"已写入 {args.convert}")
+        return
+
+    reports = []
+    for config_path in args.config or ['config/config.yaml']:
+        engine = ReplayEngine(load_config(config_path), speed=args.speed,
+                              name=os.path.basename(config_path))
+        reports.append(engine.run(args.recording))
+
+    if args.json:
+        print(json.dumps(reports, indent=2, ensure_ascii=False))
+    else:
+        for report in reports:
+            print(format_report(report))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,400 @@
+import math
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from indicators import IndicatorSet
+from tick_batch import SymbolUpdate
+
+
+class Rule:
+    """
+    One precompiled alert condition.
+
+    ``check`` receives the symbol's update and its previous price (None for
+    the first update) and returns a short description when the rule fires.
+    Thresholds are plain attributes resolved when the config is loaded, so
+    no dict lookups happen per tick.
+    """
+
+    __slots__ = ()
+    kind = 'rule'
+
+    def bind(self, indicators: IndicatorSet):
+        """Look up the symbol's shared indicators this rule reads (called once when compiled)."""
+
+    def check(self, update: SymbolUpdate, previous: Optional[float]) -> Optional[str]:
+        raise NotImplementedError
+
+
+def _up_down(up, down, threshold) -> Tuple[float, float]:
+    """``threshold`` is a symmetric shorthand; a missing side never fires."""
+    if threshold is not None:
+        up = threshold if up is None else up
+        down = -abs(threshold) if down is None else down
+    return (math.inf if up is None else float(up),
+            -math.inf if down is None else float(down))
+
+
+class AbsoluteChangeRule(Rule):
+    """Price change since the previous update, with separate up/down thresholds."""
+
+    __slots__ = ('up', 'down')
+    kind = 'absolute'
+
+    def __init__(self, up: Optional[float] = None, down: Optional[float] = None,
+                 threshold: Optional[float] = None):
+        self.up, self.down = _up_down(up, down, threshold)
+
+    def check(self, update, previous):
+        if previous is None:
+            return None
+        change = update.price - previous
+        if change >= self.up:
+            return f"上涨 ${change:.2f} (阈值 ${self.up:g})"
+        if change <= self.down:
+            return f"下跌 ${change:.2f} (阈值 ${self.down:g})"
+        return None
+
+
+class PercentageChangeRule(Rule):
+    """Percentage change since the previous update, with separate up/down thresholds."""
+
+    __slots__ = ('up', 'down')
+    kind = 'percentage'
+
+    def __init__(self, up: Optional[float] = None, down: Optional[float] = None,
+                 threshold: Optional[float] = None):
+        self.up, self.down = _up_down(up, down, threshold)
+
+    def check(self, update, previous):
+        if not previous:
+            return None
+        percentage = (update.price - previous) / previous * 100
+        if percentage >= self.up:
+            return f"上涨 {percentage:.2f}% (阈值 {self.up:g}%)"
+        if percentage <= self.down:
+            return f"下跌 {percentage:.2f}% (阈值 {self.down:g}%)"
+        return None
+
+
+class BandCrossRule(Rule):
+    """Fires when the price crosses above ``upper`` or below ``lower``."""
+
+    __slots__ = ('upper', 'lower')
+    kind = 'band'
+
+    def __init__(self, upper: Optional[float] = None, lower: Optional[float] = None):
+        self.upper = math.inf if upper is None else float(upper)
+        self.lower = -math.inf if lower is None else float(lower)
+
+    def check(self, update, previous):
+        if previous is None:
+            return None
+        price = update.price
+        if previous < self.upper <= price:
+            return f"向上突破 ${self.upper:g}"
+        if previous > self.lower >= price:
+            return f"向下跌破 ${self.lower:g}"
+        return None
+
+
+class StreakRule(Rule):
+    """Fires once when the price has moved in the same direction ``ticks`` times in a row."""
+
+    __slots__ = ('ticks', 'direction', 'run')
+    kind = 'streak'
+
+    def __init__(self, ticks: int, direction: str = 'either'):
+        if direction not in ('up', 'down', 'either'):
+            raise ValueError(f"streak 规则的 direction 必须是 up/down/either: {direction}")
+        self.ticks = int(ticks)
+        self.direction = direction
+        # 连续上涨为正、连续下跌为负的计数
+        self.run = 0
+
+    def check(self, update, previous):
+        if previous is None:
+            return None
+        price = update.price
+        if price > previous:
+            self.run = self.run + 1 if self.run > 0 else 1
+        elif price < previous:
+            self.run = self.run - 1 if self.run < 0 else -1
+        else:
+            self.run = 0
+            return None
+        # 只在恰好达到 N 次时触发一次，连涨/连跌继续时不重复触发
+        if self.run == self.ticks and self.direction != 'down':
+            return f"连续上涨 {self.ticks} 次"
+        if self.run == -self.ticks and self.direction != 'up':
+            return f"连续下跌 {self.ticks} 次"
+        return None
+
+
+class VolumeSpikeRule(Rule):
+    """Fires when an update's volume is ``multiplier`` times the mean of the last ``window`` updates."""
+
+    __slots__ = ('multiplier', 'window', 'min_volume', 'volumes', 'total')
+    kind = 'volume_spike'
+
+    def __init__(self, multiplier: float, window: int = 20, min_volume: float = 0.0):
+        self.multiplier = float(multiplier)
+        self.window = int(window)
+        self.min_volume = float(min_volume)
+        self.volumes = deque(maxlen=self.window)
+        self.total = 0.0
+
+    def check(self, update, previous):
+        volume = update.volume
+        volumes = self.volumes
+        reason = None
+        if len(volumes) == self.window and self.total > 0:
+            mean = self.total / self.window
+            if volume >= self.multiplier * mean and volume >= self.min_volume:
+                reason = f"成交量 {volume:,.0f} 为近 {self.window} 次均值的 {volume / mean:.1f} 倍"
+        # 滚动求和，每次更新 O(1)
+        if len(volumes) == self.window:
+            self.total -= volumes[0]
+        volumes.append(volume)
+        self.total += volume
+        return reason
+
+
+class SigmaMoveRule(Rule):
+    """Fires when an update's return is ``sigma`` standard deviations from the recent mean return."""
+
+    __slots__ = ('sigma', 'window_seconds', 'min_samples', 'volatility')
+    kind = 'sigma'
+
+    def __init__(self, sigma: float = 3.0, window_seconds: float = 300, min_samples: int = 20):
+        self.sigma = float(sigma)
+        self.window_seconds = float(window_seconds)
+        self.min_samples = int(min_samples)
+        self.volatility = None
+
+    def bind(self, indicators):
+        self.volatility = indicators.get('volatility', self.window_seconds)
+
+    def check(self, update, previous):
+        # 指标在规则检查之后才更新，本次涨跌不计入它自己的波动率
+        volatility = self.volatility
+        # 按时间衰减后的有效样本数，长时间无成交（例如隔夜）后会重新积累
+        if not previous or volatility.weight < self.min_samples:
+            return None
+        change = (update.price - previous) / previous
+        z = volatility.zscore(change)
+        if z is None or abs(z) < self.sigma:
+            return None
+        return f"涨跌幅 {change * 100:+.3f}% 为近 {self.window_seconds:g} 秒波动率的 {z:+.1f}σ (阈值 {self.sigma:g}σ)"
+
+
+class RangeMoveRule(Rule):
+    """Fires when the move since the previous update is ``multiplier`` times the average true range."""
+
+    __slots__ = ('multiplier', 'window_seconds', 'min_samples', 'range')
+    kind = 'atr'
+
+    def __init__(self, multiplier: float = 3.0, window_seconds: float = 300, min_samples: int = 20):
+        self.multiplier = float(multiplier)
+        self.window_seconds = float(window_seconds)
+        self.min_samples = int(min_samples)
+        self.range = None
+
+    def bind(self, indicators):
+        self.range = indicators.get('atr', self.window_seconds)
+
+    def check(self, update, previous):
+        average = self.range
+        if previous is None or average.weight < self.min_samples or average.value <= 0:
+            return None
+        change = update.price - previous
+        if abs(change) < self.multiplier * average.value:
+            return None
+        return (f"涨跌 ${change:+.2f} 为近 {self.window_seconds:g} 秒平均波幅 ${average.value:.2f} 的 "
+                f"{abs(change) / average.value:.1f} 倍")
+
+
+class VWAPDeviationRule(Rule):
+    """Fires when the price moves ``up``/``down`` percent away from the VWAP."""
+
+    __slots__ = ('up', 'down', 'window_seconds', 'vwap')
+    kind = 'vwap'
+
+    def __init__(self, up: Optional[float] = None, down: Optional[float] = None,
+                 threshold: Optional[float] = None, window_seconds: Optional[float] = None):
+        self.up, self.down = _up_down(up, down, threshold)
+        self.window_seconds = window_seconds
+        self.vwap = None
+
+    def bind(self, indicators):
+        self.vwap = indicators.get('vwap', self.window_seconds)
+
+    def check(self, update, previous):
+        vwap = self.vwap.value
+        if vwap is None or previous is None:
+            return None
+        deviation = (update.price - vwap) / vwap * 100
+        previous_deviation = (previous - vwap) / vwap * 100
+        # 只在偏离刚超过阈值时触发，持续偏离时不重复触发
+        if deviation >= self.up > previous_deviation:
+            return f"高于 VWAP ${vwap:.2f} {deviation:.2f}% (阈值 {self.up:g}%)"
+        if deviation <= self.down < previous_deviation:
+            return f"低于 VWAP ${vwap:.2f} {deviation:.2f}% (阈值 {self.down:g}%)"
+        return None
+
+
+class EMACrossRule(Rule):
+    """Fires when the price crosses the ``window_seconds`` EMA."""
+
+    __slots__ = ('window_seconds', 'direction', 'ema')
+    kind = 'ema_cross'
+
+    def __init__(self, window_seconds: float, direction: str = 'either'):
+        if direction not in ('up', 'down', 'either'):
+            raise ValueError(f"ema_cross 规则的 direction 必须是 up/down/either: {direction}")
+        self.window_seconds = float(window_seconds)
+        self.direction = direction
+        self.ema = None
+
+    def bind(self, indicators):
+        self.ema = indicators.get('ema', self.window_seconds)
+
+    def check(self, update, previous):
+        ema = self.ema.value
+        if ema is None or previous is None:
+            return None
+        price = update.price
+        if previous < ema <= price and self.direction != 'down':
+            return f"向上穿越 {self.window_seconds:g} 秒EMA ${ema:.2f}"
+        if previous > ema >= price and self.direction != 'up':
+            return f"向下穿越 {self.window_seconds:g} 秒EMA ${ema:.2f}"
+        return None
+
+
+RULE_TYPES = {cls.kind: cls for cls in (
+    AbsoluteChangeRule, PercentageChangeRule, BandCrossRule, StreakRule, VolumeSpikeRule,
+    SigmaMoveRule, RangeMoveRule, VWAPDeviationRule, EMACrossRule)}
+
+
+def compile_rule(config: dict) -> Rule:
+    """Build a rule object from one ``rules`` entry of a stock's config."""
+    params = dict(config)
+    kind = params.pop('type', None)
+    cls = RULE_TYPES.get(kind)
+    if cls is None:
+        raise ValueError(f"未知的警报规则类型: {kind}（可选: {', '.join(RULE_TYPES)}）")
+    try:
+        return cls(**params)
+    except TypeError as e:
+        raise ValueError(f"警报规则 {kind} 的参数无效: {e}") from e
+
+
+class SymbolRules:
+    """The compiled rules of one symbol plus the state they share."""
+
+    __slots__ = ('symbol', 'rules', 'previous', 'indicators')
+
+    def __init__(self, symbol: str, rules: List[Rule], reuse: Optional[IndicatorSet] = None, calendar=None):
+        """
+        Args:
+            symbol: Stock symbol
+            rules: Compiled rules
+            reuse: Indicators of the symbol's previous rules, kept where still referenced
+            calendar: MarketCalendar for session-based indicators (cumulative VWAP)
+        """
+        self.symbol = symbol
+        self.rules = tuple(rules)
+        self.previous: Optional[float] = None
+        indicators = IndicatorSet(reuse, calendar)
+        for rule in self.rules:
+            rule.bind(indicators)
+        # 没有规则引用指标时为 None，评估时不必逐tick更新
+        self.indicators = indicators if len(indicators) else None
+
+
+class RuleEngine:
+    """
+    Evaluates per-symbol alert rules compiled from the ``rules`` config.
+
+    Only symbols that have rules are looked at; for each of their updates
+    the engine runs exactly that symbol's precompiled checks. The simple
+    ``alerts`` thresholds stay on the vectorized ThresholdEvaluator.
+    """
+
+    def __init__(self, rules: Dict[str, Iterable[dict]], calendar=None):
+        """
+        Args:
+            rules: Mapping of symbol to its list of rule configs
+            calendar: MarketCalendar for session-based indicators; the
+                default calendar file is used when not given
+        """
+        self.calendar = calendar
+        self.configs: Dict[str, list] = {symbol: list(configs) for symbol, configs in rules.items() if configs}
+        self.compiled: Dict[str, SymbolRules] = {
+            symbol: SymbolRules(symbol, [compile_rule(config) for config in configs], calendar=calendar)
+            for symbol, configs in self.configs.items()
+        }
+
+    @classmethod
+    def from_stocks(cls, stocks: List[dict], calendar=None) -> 'RuleEngine':
+        return cls({stock['symbol']: stock.get('rules') for stock in stocks}, calendar)
+
+    def __len__(self):
+        return len(self.compiled)
+
+    def rebuild(self, rules: Dict[str, Iterable[dict]], carry_over: bool = True,
+                calendar=None) -> 'RuleEngine':
+        """
+        Compile new rules, reusing unchanged symbols' rule objects (and their
+        streak/volume state) and keeping the previous price and indicators
+        of changed ones.
+
+        With ``carry_over`` False the previous prices are not copied yet;
+        call ``carry_over`` later under the lock that guards evaluation.
+        ``calendar`` replaces the engine's calendar for newly built rules.
+        """
+        engine = RuleEngine({}, calendar or self.calendar)
+        engine.configs = {symbol: list(configs) for symbol, configs in rules.items() if configs}
+        for symbol, configs in engine.configs.items():
+            old = self.compiled.get(symbol)
+            if old is not None and self.configs[symbol] == configs:
+                engine.compiled[symbol] = old
+                continue
+            engine.compiled[symbol] = SymbolRules(symbol, [compile_rule(config) for config in configs],
+                                                  old.indicators if old is not None else None, engine.calendar)
+        if carry_over:
+            engine.carry_over(self)
+        return engine
+
+    def carry_over(self, old: 'RuleEngine'):
+        """Copy the previous price of rebuilt symbols from ``old`` (reused rule objects already have it)."""
+        for symbol, symbol_rules in self.compiled.items():
+            previous = old.compiled.get(symbol)
+            if previous is not None and previous is not symbol_rules:
+                symbol_rules.previous = previous.previous
+
+    def evaluate(self, updates: Iterable[SymbolUpdate]) -> Iterator[Tuple[str, float, float, float, str]]:
+        """Yield ``(symbol, price, change, percentage, reason)`` for each update that fires a rule."""
+        compiled = self.compiled
+        for update in updates:
+            symbol_rules = compiled.get(update.symbol)
+            if symbol_rules is None:
+                continue
+            previous = symbol_rules.previous
+            price = update.price
+            symbol_rules.previous = price
+            reasons = None
+            for rule in symbol_rules.rules:
+                reason = rule.check(update, previous)
+                if reason is not None:
+                    if reasons is None:
+                        reasons = [reason]
+                    else:
+                        reasons.append(reason)
+            # 规则读取的是本次更新之前的指标
+            if symbol_rules.indicators is not None:
+                symbol_rules.indicators.update(update, previous)
+            if reasons is not None:
+                change = price - previous if previous is not None else 0.0
+                percentage = change / previous * 100 if previous else 0.0
+                yield update.symbol, price, change, percentage, '; '.join(reasons)
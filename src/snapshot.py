@@ -0,0 +1,156 @@
+"""
+Warm-start snapshots of the monitor's in-memory state.
+
+A snapshot file is a 32-byte header, a JSON index and two binary blocks::
+
+    header:  magic (8s) | version (u4) | index_size (u4) | created_ns (i8) | padding
+    index:   {"prices": {symbol: price}, "last_alerts": {symbol: epoch_ns},
+              "windows": [[symbol, points], ...]}
+    points:  all window prices (f8), then all window timestamps (i8),
+             windows in index order
+
+Restoring a few thousand symbols with full price windows takes a single
+read and two ``array.frombytes`` calls before the windows are rebuilt.
+"""
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'SNAPSHOT'
+VERSION = 1
+HEADER = struct.Struct('<8sIIq')
+HEADER_SIZE = 32
+
+
+class MonitorState:
+    """The state a restarted monitor needs to alert on its first ticks."""
+
+    __slots__ = ('created_ns', 'prices', 'last_alerts', 'windows')
+
+    def __init__(self, created_ns: int, prices: Dict[str, float], last_alerts: Dict[str, int],
+                 windows: Dict[str, Tuple[array, array]]):
+        self.created_ns = created_ns
+        self.prices = prices              # 每个股票的最新价格
+        self.last_alerts = last_alerts    # 每个股票上次触发新闻检索的时间（纳秒）
+        self.windows = windows            # 每个股票价格窗口内的 (价格, 时间戳) 数组
+
+
+def write_snapshot(path: str, state: MonitorState):
+    """Write a snapshot atomically (temporary file, fsync, rename)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    index = json.dumps({
+        'prices': state.prices,
+        'last_alerts': state.last_alerts,
+        'windows': [[symbol, len(prices)] for symbol, (prices, _) in state.windows.items()],
+    }, separators=(',', ':')).encode()
+    prices = array('d')
+    timestamps = array('q')
+    for window_prices, window_timestamps in state.windows.values():
+        prices.extend(window_prices)
+        timestamps.extend(window_timestamps)
+    if sys.byteorder != 'little':
+        prices.byteswap()
+        timestamps.byteswap()
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(index), state.created_ns).ljust(HEADER_SIZE, b'\x00'))
+        file.write(index)
+        file.write(prices.tobytes())
+        file.write(timestamps.tobytes())
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> MonitorState:
+    """Load a snapshot written by ``write_snapshot``."""
+    with open(path, 'rb') as file:
+        data = file.read()
+    magic, version, index_size, created_ns = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("不是有效的状态快照文件")
+    if version != VERSION:
+        raise ValueError(f"不支持的状态快照版本: {version}")
+    offset = HEADER_SIZE + index_size
+    index = json.loads(data[HEADER_SIZE:offset])
+
+    total = sum(points for _, points in index['windows'])
+    prices = array('d')
+    prices.frombytes(data[offset:offset + 8 * total])
+    timestamps = array('q')
+    timestamps.frombytes(data[offset + 8 * total:offset + 16 * total])
+    if len(timestamps) != total:
+        raise ValueError("状态快照文件不完整")
+    if sys.byteorder != 'little':
+        prices.byteswap()
+        timestamps.byteswap()
+
+    windows = {}
+    start = 0
+    for symbol, points in index['windows']:
+        windows[symbol] = (prices[start:start + points], timestamps[start:start + points])
+        start += points
+    return MonitorState(created_ns, index['prices'], index['last_alerts'], windows)
+
+
+class StateSnapshotter:
+    """
+    Periodically writes a snapshot from a background thread.
+
+    ``capture`` copies the state (it runs while the caller's locks are held,
+    so it should only copy); encoding and writing happen outside of it.
+    """
+
+    def __init__(self, path: str, capture: Callable[[], MonitorState], interval: float = 30.0):
+        """
+        Args:
+            path: Snapshot file
+            capture: Returns the current state
+            interval: Seconds between snapshots
+        """
+        self.path = path
+        self.capture = capture
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.snapshots = 0
+        self.last_duration_ms = 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='state-snapshotter', daemon=True)
+        self._thread.start()
+
+    def save(self):
+        started = time.perf_counter()
+        write_snapshot(self.path, self.capture())
+        self.last_duration_ms = (time.perf_counter() - started) * 1000
+        self.snapshots += 1
+
+    def stop(self, final: bool = True):
+        """Stop the thread and, unless ``final`` is False, write one last snapshot."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if final:
+            try:
+                self.save()
+            except Exception as e:
+                logger.error(f"Failed to write state snapshot {self.path}: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.save()
+            except Exception as e:
+                logger.error(f"Failed to write state snapshot {self.path}: {e}")
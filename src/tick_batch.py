@@ -0,0 +1,106 @@
+import time
+from typing import Dict, Iterable, List, Optional
+
+
+class SymbolUpdate:
+    """Aggregated view of all trades for one symbol inside a single frame."""
+
+    __slots__ = ('symbol', 'price', 'vwap', 'volume', 'count', 'high', 'low', 'timestamp')
+
+    def __init__(self, symbol: str, price: float, volume: float = 0.0,
+                 timestamp: Optional[int] = None):
+        """
+        Args:
+            symbol: Stock symbol
+            price: Last traded price
+            volume: Traded volume of the first trade
+            timestamp: Exchange timestamp of the last trade (epoch milliseconds)
+        """
+        self.symbol = symbol
+        self.price = price
+        self.vwap = price
+        self.volume = volume
+        self.count = 1
+        self.high = price
+        self.low = price
+        self.timestamp = timestamp
+
+    def __repr__(self):
+        return (
+            f"SymbolUpdate({self.symbol!r}, price={self.price}, vwap={self.vwap:.4f}, "
+            f"volume={self.volume}, count={self.count})"
+        )
+
+
+class TickBatch:
+    """One unit of work for the price processing stage."""
+
+    __slots__ = ('updates', 'received_ns')
+
+    def __init__(self, updates: List[SymbolUpdate], received_ns: Optional[int] = None):
+        self.updates = updates
+        # 接收时间（单调时钟），用于统计端到端延迟
+        self.received_ns = received_ns if received_ns is not None else time.perf_counter_ns()
+
+    def __len__(self):
+        return len(self.updates)
+
+    @classmethod
+    def from_trades(cls, trades: Iterable[dict], received_ns: Optional[int] = None) -> 'TickBatch':
+        """
+        Build a batch from the ``data`` array of a Finnhub ``trade`` frame.
+
+        Every trade is folded into a per-symbol update in a single pass, so a
+        frame carrying dozens of trades becomes one queue item.
+
+        Args:
+            trades: Trade dicts with ``s`` (symbol), ``p`` (price), ``v`` (volume)
+                and ``t`` (epoch milliseconds) keys
+            received_ns: Receive timestamp from ``time.perf_counter_ns``
+
+        Returns:
+            TickBatch with one SymbolUpdate per symbol, in first-seen order
+        """
+        # 每个股票在本地列表里累计：最新价、成交量、成交额（用于VWAP）、价格和、笔数、最高、最低、时间戳，
+        # 整帧处理完后每个股票只创建一次 SymbolUpdate
+        totals: Dict[str, list] = {}
+        for trade in trades:
+            symbol = trade['s']
+            price = float(trade['p'])
+            volume = float(trade.get('v') or 0.0)
+            timestamp = trade.get('t')
+
+            total = totals.get(symbol)
+            if total is None:
+                totals[symbol] = [price, volume, price * volume, price, 1, price, price, timestamp]
+                continue
+
+            total[0] = price
+            total[1] += volume
+            total[2] += price * volume
+            total[3] += price
+            total[4] += 1
+            if price > total[5]:
+                total[5] = price
+            elif price < total[6]:
+                total[6] = price
+            if timestamp is not None:
+                total[7] = timestamp
+
+        # 直接填充 __slots__，省去 __init__ 的重复赋值
+        new = SymbolUpdate.__new__
+        updates = []
+        for symbol, (price, volume, notional, price_sum, count, high, low, timestamp) in totals.items():
+            update = new(SymbolUpdate)
+            update.symbol = symbol
+            update.price = price
+            # 没有成交量信息时退化为简单平均价
+            update.vwap = notional / volume if volume > 0 else price_sum / count
+            update.volume = volume
+            update.count = count
+            update.high = high
+            update.low = low
+            update.timestamp = timestamp
+            updates.append(update)
+
+        return cls(updates, received_ns)
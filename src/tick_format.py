@@ -0,0 +1,126 @@
+"""
+Compact binary tick file format shared by replay and the tick journal.
+
+A file is a 64-byte header followed by fixed-width 32-byte records::
+
+    header:  magic (8s) | version (u4) | record_size (u4) | record_count (u8) | padding
+    record:  symbol_id (u4) | flags (u4) | ts_ns (i8) | price (f8) | volume (f8)
+
+Symbol ids index into a JSON list stored next to the file
+(``<file>.symbols.json``), or shared by all segments of a tick journal
+(``symbols.json`` in the same directory). ``FLAG_FRAME_END`` marks the
+last trade of a WebSocket frame so frames can be rebuilt on replay.
+"""
+import json
+import mmap
+import os
+import struct
+from typing import Iterable, Iterator, List, Tuple
+
+MAGIC = b'TICKS\x00\x00\x01'
+VERSION = 1
+HEADER = struct.Struct('<8sIIQ')
+HEADER_SIZE = 64
+RECORD = struct.Struct('<IIqdd')
+RECORD_SIZE = RECORD.size
+
+# 记录标志位
+FLAG_FRAME_END = 1
+
+# 头部中 record_count 字段的偏移量（写入方原地更新）
+COUNT_OFFSET = 16
+
+# 回放时每次解码的记录数（约2MB），大文件不整体读入内存
+READ_CHUNK_RECORDS = 65536
+
+
+def symbols_path(path: str) -> str:
+    return f"{path}.symbols.json"
+
+
+def pack_header(record_count: int) -> bytes:
+    return HEADER.pack(MAGIC, VERSION, RECORD_SIZE, record_count).ljust(HEADER_SIZE, b'\x00')
+
+
+def unpack_header(data: bytes) -> int:
+    """Validate a header and return its record count."""
+    magic, version, record_size, record_count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("不是有效的tick文件")
+    if version != VERSION or record_size != RECORD_SIZE:
+        raise ValueError(f"不支持的tick文件版本: {version} (记录长度 {record_size})")
+    return record_count
+
+
+def load_symbols(path: str) -> List[str]:
+    sidecar = symbols_path(path)
+    if not os.path.exists(sidecar):
+        # tick日志的所有分段共用同一个符号表
+        sidecar = os.path.join(os.path.dirname(path), 'symbols.json')
+    with open(sidecar, 'r') as file:
+        return json.load(file)
+
+
+def write_tick_file(path: str, frames: Iterable[dict]):
+    """
+    Write Finnhub ``trade`` frames to a tick file.
+
+    Args:
+        path: Output file
+        frames: Decoded WebSocket messages; non-trade messages are skipped
+    """
+    symbol_ids = {}
+    count = 0
+    with open(path, 'wb') as file:
+        file.write(pack_header(0))
+        for frame in frames:
+            if frame.get('type') != 'trade' or not frame.get('data'):
+                continue
+            trades = frame['data']
+            last = len(trades) - 1
+            for i, trade in enumerate(trades):
+                symbol = trade['s']
+                symbol_id = symbol_ids.setdefault(symbol, len(symbol_ids))
+                file.write(RECORD.pack(
+                    symbol_id,
+                    FLAG_FRAME_END if i == last else 0,
+                    int(trade.get('t') or 0) * 1_000_000,
+                    float(trade['p']),
+                    float(trade.get('v') or 0.0),
+                ))
+                count += 1
+        file.seek(0)
+        file.write(pack_header(count))
+    with open(symbols_path(path), 'w') as file:
+        json.dump(list(symbol_ids), file)
+
+
+def read_tick_file(path: str, chunk_records: int = READ_CHUNK_RECORDS) -> Iterator[Tuple[int, dict]]:
+    """
+    Rebuild trade frames from a tick file.
+
+    The file is memory-mapped and decoded ``chunk_records`` records at a
+    time, so memory use does not grow with the file size.
+
+    Yields:
+        ``(ts_ns, frame)`` where ``frame`` has the same shape as a decoded
+        Finnhub ``trade`` message and ``ts_ns`` is its last trade time
+    """
+    symbols = load_symbols(path)
+    trades = []
+    ts_ns = 0
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        count = unpack_header(data[:HEADER_SIZE])
+        # 写入中断时文件可能短于头部记录的数量，只读取完整的记录
+        end = HEADER_SIZE + min(count, (len(data) - HEADER_SIZE) // RECORD_SIZE) * RECORD_SIZE
+        step = chunk_records * RECORD_SIZE
+        for start in range(HEADER_SIZE, end, step):
+            # 切片复制出一块数据，生成器暂停期间不持有对映射的引用
+            chunk = data[start:min(start + step, end)]
+            for symbol_id, flags, ts_ns, price, volume in RECORD.iter_unpack(chunk):
+                trades.append({'s': symbols[symbol_id], 'p': price, 't': ts_ns // 1_000_000, 'v': volume})
+                if flags & FLAG_FRAME_END:
+                    yield ts_ns, {'type': 'trade', 'data': trades}
+                    trades = []
+    if trades:
+        yield ts_ns, {'type': 'trade', 'data': trades}
@@ -0,0 +1,214 @@
+import glob
+import json
+import logging
+import mmap
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from tick_format import (COUNT_OFFSET, FLAG_FRAME_END, HEADER_SIZE, RECORD, RECORD_SIZE,
+                         pack_header, unpack_header)
+
+logger = logging.getLogger(__name__)
+
+# 与 tick_format.RECORD 对应的 NumPy 结构化类型
+RECORD_DTYPE = np.dtype([
+    ('symbol_id', '<u4'),
+    ('flags', '<u4'),
+    ('ts_ns', '<i8'),
+    ('price', '<f8'),
+    ('volume', '<f8'),
+])
+assert RECORD_DTYPE.itemsize == RECORD_SIZE
+
+SYMBOLS_FILE = 'symbols.json'
+SEGMENT_PATTERN = 'ticks-{:06d}.ticks'
+
+
+class TickJournal:
+    """
+    Appends every received trade to segmented, memory-mapped tick files.
+
+    Trades are written as they arrive, before frame aggregation and price
+    buffer coalescing, so replaying the journal reproduces the exact stream
+    the monitor received.
+
+    Each segment is preallocated and mapped once, so appending a record is a
+    ``struct.pack_into`` into the mapping plus an in-place update of the
+    header's record count. A background thread flushes dirty pages and the
+    symbol dictionary; full segments are trimmed and a new one is started.
+    """
+
+    def __init__(self, directory: str, segment_records: int = 1 << 20, flush_interval: float = 1.0):
+        """
+        Args:
+            directory: Directory holding the segments and ``symbols.json``
+            segment_records: Records per segment before rotating
+            flush_interval: Seconds between background flushes
+        """
+        self.directory = directory
+        self.segment_records = segment_records
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self.symbol_ids: Dict[str, int] = {}
+        symbols_file = os.path.join(directory, SYMBOLS_FILE)
+        if os.path.exists(symbols_file):
+            with open(symbols_file, 'r') as file:
+                self.symbol_ids = {symbol: i for i, symbol in enumerate(json.load(file))}
+        self._symbols_dirty = False
+
+        self._lock = threading.Lock()
+        # 刷盘（msync）不持有 _lock，只与关闭分段互斥，不阻塞追加记录
+        self._flush_lock = threading.Lock()
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._count = 0
+        self.segment_index = self._next_segment_index()
+        self.records_written = 0
+        self._open_segment()
+
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name='tick-journal-flusher', daemon=True)
+        self._flusher.start()
+
+    def _next_segment_index(self) -> int:
+        existing = sorted(glob.glob(os.path.join(self.directory, 'ticks-*.ticks')))
+        if not existing:
+            return 0
+        return int(os.path.basename(existing[-1])[6:12]) + 1
+
+    @property
+    def segment_path(self) -> str:
+        return os.path.join(self.directory, SEGMENT_PATTERN.format(self.segment_index))
+
+    def _open_segment(self):
+        size = HEADER_SIZE + self.segment_records * RECORD_SIZE
+        self._file = open(self.segment_path, 'w+b')
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._map[:HEADER_SIZE] = pack_header(0)
+        self._count = 0
+
+    def _write_count(self):
+        self._map[COUNT_OFFSET:COUNT_OFFSET + 8] = self._count.to_bytes(8, 'little')
+
+    def _close_segment(self):
+        """Flush the current segment and trim the unused preallocated space."""
+        # 段在一批记录的中途写满时，头部的记录数还没有更新
+        self._write_count()
+        with self._flush_lock:
+            self._map.flush()
+            self._map.close()
+        self._file.truncate(HEADER_SIZE + self._count * RECORD_SIZE)
+        self._file.close()
+        self._map = None
+        self._file = None
+
+    def _rotate(self):
+        self._close_segment()
+        self.segment_index += 1
+        self._open_segment()
+
+    def append_trades(self, trades: List[dict]):
+        """Append the trades of one Finnhub ``trade`` frame; the last one is flagged as the frame end."""
+        if not trades:
+            return
+        now_ns = time.time_ns()
+        last = len(trades) - 1
+        pack_into = RECORD.pack_into
+        with self._lock:
+            symbol_ids = self.symbol_ids
+            for i, trade in enumerate(trades):
+                if self._count >= self.segment_records:
+                    self._rotate()
+                symbol = trade['s']
+                symbol_id = symbol_ids.get(symbol)
+                if symbol_id is None:
+                    symbol_id = symbol_ids[symbol] = len(symbol_ids)
+                    self._symbols_dirty = True
+                timestamp = trade.get('t')
+                pack_into(
+                    self._map, HEADER_SIZE + self._count * RECORD_SIZE,
+                    symbol_id,
+                    FLAG_FRAME_END if i == last else 0,
+                    int(timestamp) * 1_000_000 if timestamp else now_ns,
+                    float(trade['p']),
+                    float(trade.get('v') or 0.0),
+                )
+                self._count += 1
+            # 头部记录数在写完记录后更新，读取方不会看到写了一半的记录
+            self._write_count()
+            self.records_written += len(trades)
+
+    def _write_symbols(self, symbols: List[str]):
+        path = os.path.join(self.directory, SYMBOLS_FILE)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(symbols, file)
+        os.replace(tmp_path, path)
+
+    def flush(self):
+        """Write dirty pages and the symbol dictionary to disk."""
+        # 只在锁内取出当前分段和符号表，耗时的 msync 和文件写入在锁外进行
+        with self._lock:
+            segment_map = self._map
+            symbols = list(self.symbol_ids) if self._symbols_dirty else None
+            self._symbols_dirty = False
+        with self._flush_lock:
+            if segment_map is not None and not segment_map.closed:
+                # 期间切换了分段时，旧分段在关闭前已经刷盘
+                segment_map.flush()
+            if symbols is not None:
+                try:
+                    self._write_symbols(symbols)
+                except Exception:
+                    with self._lock:
+                        self._symbols_dirty = True
+                    raise
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Tick journal flush failed: {str(e)}")
+
+    def close(self):
+        """Stop the flusher and finalize the current segment."""
+        self._stop.set()
+        self._flusher.join()
+        with self._lock:
+            if self._symbols_dirty:
+                self._write_symbols(list(self.symbol_ids))
+                self._symbols_dirty = False
+            if self._map is not None:
+                self._close_segment()
+
+
+def list_segments(directory: str) -> List[str]:
+    """Segment files of a journal, oldest first."""
+    return sorted(glob.glob(os.path.join(directory, 'ticks-*.ticks')))
+
+
+def open_segment(path: str) -> np.ndarray:
+    """
+    Map a segment as a NumPy structured array without copying.
+
+    Only records counted in the header are exposed, so a segment that is
+    still being written can be read safely.
+    """
+    with open(path, 'rb') as file:
+        count = unpack_header(file.read(HEADER_SIZE))
+    if count == 0:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+
+
+def load_journal_symbols(directory: str) -> List[str]:
+    """Symbol dictionary of a journal: ``symbols[record['symbol_id']]``."""
+    with open(os.path.join(directory, SYMBOLS_FILE), 'r') as file:
+        return json.load(file)
@@ -1,26 +1,27 @@
 import yaml
-from datetime import datetime
-import pytz
 
-def load_config(config_path='config/config.yaml'):
+DEFAULT_CONFIG_PATH = 'config/config.yaml'
+DEFAULT_CALENDAR_PATH = 'config/market_calendar.yaml'
+
+_market_calendar = None
+
+def load_config(config_path=DEFAULT_CONFIG_PATH):
     """加载配置文件"""
     with open(config_path, 'r') as file:
         return yaml.safe_load(file)
 
+def get_market_calendar(calendar_path=DEFAULT_CALENDAR_PATH):
+    """返回共享的交易日历（首次调用时从日历文件加载）"""
+    global _market_calendar
+    if _market_calendar is None:
+        # 交易日历依赖 pytz，首次使用时才导入
+        from market_calendar import MarketCalendar
+        _market_calendar = MarketCalendar.from_file(calendar_path)
+    return _market_calendar
+
 def is_market_open():
-    """检查美股市场是否开市"""
-    ny_tz = pytz.timezone('America/New_York')
-    ny_time = datetime.now(ny_tz)
-    
-    # 检查是否为工作日
-    if ny_time.weekday() >= 5:  # 5是周六，6是周日
-        return False
-    
-    # 检查是否在交易时间内（9:30 - 16:00）
-    market_start = ny_time.replace(hour=9, minute=30, second=0, microsecond=0)
-    market_end = ny_time.replace(hour=16, minute=0, second=0, microsecond=0)
-    
-    return market_start <= ny_time <= market_end
+    """检查美股市场是否开市（正常交易时段，已考虑节假日和提前收盘）"""
+    return get_market_calendar().is_open()
 
 def format_price_change(change, percentage_change):
     """格式化价格变动信息"""
@@ -0,0 +1,248 @@
+import json
+import logging
+import random
+import ssl
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import websocket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WS_URL = "wss://ws.finnhub.io"
+
+
+class ExponentialBackoff:
+    """Full-jitter exponential backoff: ``uniform(0, min(cap, base * 2**attempt))``."""
+
+    def __init__(self, base: float = 1.0, cap: float = 60.0, rng: Optional[random.Random] = None):
+        self.base = base
+        self.cap = cap
+        self.attempt = 0
+        self._rng = rng or random.Random()
+
+    def next_delay(self) -> float:
+        delay = self._rng.uniform(0, min(self.cap, self.base * (2 ** self.attempt)))
+        self.attempt += 1
+        return delay
+
+    def reset(self):
+        self.attempt = 0
+
+
+class WebSocketShard:
+    """One WebSocket connection serving a subset of the watchlist."""
+
+    def __init__(self, shard_id: int, url: str, on_message: Callable, backoff: ExponentialBackoff,
+                 sslopt: Optional[dict] = None, ping_interval: float = 0):
+        """
+        Args:
+            shard_id: Index of the shard, used in logs and stats
+            url: Full WebSocket URL including the token
+            on_message: ``callback(ws, message)`` for every received message
+            backoff: Reconnect delay policy for this connection
+            sslopt: Options passed to ``run_forever``
+            ping_interval: Seconds between client pings (0 disables them)
+        """
+        self.shard_id = shard_id
+        self.url = url
+        self.symbols: List[str] = []
+        self._on_message = on_message
+        self.backoff = backoff
+        self.sslopt = sslopt
+        self.ping_interval = ping_interval
+
+        self._app: Optional[websocket.WebSocketApp] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.connected = False
+
+        self.messages = 0
+        self.reconnects = 0
+        self.last_message_at: Optional[float] = None
+        self._rate_messages = 0
+        self._rate_since = time.monotonic()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"ws-shard-{self.shard_id}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._app is not None:
+            self._app.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        # 每个连接只在自己的线程中重连，不会从回调中递归创建新线程
+        while not self._stop.is_set():
+            self._app = websocket.WebSocketApp(
+                self.url,
+                on_open=self._handle_open,
+                on_message=self._handle_message,
+                on_error=self._handle_error,
+                on_close=self._handle_close
+            )
+            self._app.run_forever(sslopt=self.sslopt, ping_interval=self.ping_interval)
+            self.connected = False
+            if self._stop.is_set():
+                break
+            delay = self.backoff.next_delay()
+            self.reconnects += 1
+            logger.warning(f"WebSocket shard {self.shard_id} disconnected, reconnecting in {delay:.1f}s")
+            self._stop.wait(delay)
+
+    def _send(self, message_type: str, symbol: str):
+        try:
+            self._app.send(json.dumps({'type': message_type, 'symbol': symbol}))
+        except websocket.WebSocketException as e:
+            # 连接已断开时忽略，重连后会重新订阅
+            logger.warning(f"WebSocket shard {self.shard_id} failed to {message_type} {symbol}: {e}")
+
+    def _handle_open(self, ws):
+        self.connected = True
+        with self._lock:
+            symbols = list(self.symbols)
+        for symbol in symbols:
+            self._send('subscribe', symbol)
+        logger.info(f"WebSocket shard {self.shard_id} connected, subscribed {len(symbols)} symbols")
+
+    def _handle_message(self, ws, message):
+        if self.backoff.attempt:
+            # 收到数据才算恢复，避免连上即断的连接不断以最小间隔重连
+            self.backoff.reset()
+        self.messages += 1
+        self.last_message_at = time.monotonic()
+        self._on_message(ws, message)
+
+    def _handle_error(self, ws, error):
+        logger.error(f"WebSocket shard {self.shard_id} error: {error}")
+
+    def _handle_close(self, ws, close_status_code, close_msg):
+        self.connected = False
+        logger.warning(f"WebSocket shard {self.shard_id} closed. Status: {close_status_code}, message: {close_msg}")
+
+    def subscribe(self, symbol: str):
+        """Add a symbol; sent immediately if connected, otherwise on the next open."""
+        with self._lock:
+            if symbol in self.symbols:
+                return
+            self.symbols.append(symbol)
+        if self.connected:
+            self._send('subscribe', symbol)
+
+    def unsubscribe(self, symbol: str):
+        with self._lock:
+            if symbol not in self.symbols:
+                return
+            self.symbols.remove(symbol)
+        if self.connected:
+            self._send('unsubscribe', symbol)
+
+    def stats(self) -> dict:
+        """Message rate since the previous call, staleness and reconnect count."""
+        now = time.monotonic()
+        elapsed = now - self._rate_since
+        rate = (self.messages - self._rate_messages) / elapsed if elapsed > 0 else 0.0
+        self._rate_messages = self.messages
+        self._rate_since = now
+        return {
+            'shard': self.shard_id,
+            'connected': self.connected,
+            'symbols': len(self.symbols),
+            'messages': self.messages,
+            'messages_per_s': rate,
+            'staleness_s': now - self.last_message_at if self.last_message_at is not None else None,
+            'reconnects': self.reconnects,
+        }
+
+
+class ShardedWebSocketManager:
+    """
+    Spreads the watchlist over several WebSocket connections.
+
+    Each connection carries at most ``max_symbols_per_connection`` symbols.
+    A dropped connection reconnects on its own with jittered exponential
+    backoff and only resubscribes its own symbols; the other shards keep
+    streaming.
+    """
+
+    def __init__(self, api_key: str, symbols: List[str], on_message: Callable,
+                 url: str = DEFAULT_WS_URL, max_symbols_per_connection: int = 50,
+                 backoff_base: float = 1.0, backoff_cap: float = 60.0, verify_ssl: bool = False):
+        """
+        Args:
+            api_key: Finnhub API key
+            symbols: Initial watchlist
+            on_message: ``callback(ws, message)`` shared by all shards
+            url: WebSocket base URL (point it at a local stub server for testing)
+            max_symbols_per_connection: Subscription cap per connection
+            backoff_base: First reconnect delay ceiling in seconds
+            backoff_cap: Maximum reconnect delay in seconds
+            verify_ssl: Verify the server certificate for wss:// URLs
+        """
+        separator = '&' if '?' in url else '?'
+        self.url = f"{url}{separator}token={api_key}"
+        self.on_message = on_message
+        self.max_symbols_per_connection = max_symbols_per_connection
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.sslopt = None
+        if url.startswith('wss://') and not verify_ssl:
+            self.sslopt = {"cert_reqs": ssl.CERT_NONE}
+
+        self.shards: List[WebSocketShard] = []
+        self.assignments: Dict[str, WebSocketShard] = {}
+        self._lock = threading.Lock()
+        self._running = False
+        for symbol in symbols:
+            self.subscribe(symbol)
+
+    def _new_shard(self) -> WebSocketShard:
+        shard = WebSocketShard(
+            len(self.shards),
+            self.url,
+            self.on_message,
+            ExponentialBackoff(self.backoff_base, self.backoff_cap),
+            sslopt=self.sslopt
+        )
+        self.shards.append(shard)
+        if self._running:
+            shard.start()
+        return shard
+
+    def subscribe(self, symbol: str):
+        """Assign a symbol to the least loaded shard with spare capacity."""
+        with self._lock:
+            if symbol in self.assignments:
+                return
+            candidates = [s for s in self.shards if len(s.symbols) < self.max_symbols_per_connection]
+            shard = min(candidates, key=lambda s: len(s.symbols)) if candidates else self._new_shard()
+            self.assignments[symbol] = shard
+        shard.subscribe(symbol)
+
+    def unsubscribe(self, symbol: str):
+        with self._lock:
+            shard = self.assignments.pop(symbol, None)
+        if shard is not None:
+            shard.unsubscribe(symbol)
+
+    def start(self):
+        with self._lock:
+            self._running = True
+            for shard in self.shards:
+                shard.start()
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            shards = list(self.shards)
+        for shard in shards:
+            shard.stop()
+
+    def stats(self) -> List[dict]:
+        """Per-shard connection statistics."""
+        return [shard.stats() for shard in self.shards]
@@ -0,0 +1,7 @@
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_DIR not in sys.path:
+    # src/ 下的模块使用平铺导入（与 python src/monitor.py 的运行方式一致）
+    sys.path.insert(0, SRC_DIR)
@@ -0,0 +1,117 @@
+import threading
+import time
+
+from alert_dispatcher import Alert, AlertDispatcher, AlertSink
+from metrics import PipelineMetrics
+
+
+class RecordingSink(AlertSink):
+    def __init__(self):
+        super().__init__()
+        self.alerts = []
+
+    def emit(self, alert):
+        self.alerts.append(alert)
+
+
+def test_collapsed_followups_keep_every_article():
+    sink = RecordingSink()
+    dispatcher = AlertDispatcher([sink], workers=1)
+    dispatcher.submit(Alert('AAPL', 105.0, 5.0, 5.0, news='1. first'))
+    dispatcher.submit(Alert('AAPL', 105.0, 5.0, 5.0, news='2. second', followup=True))
+    dispatcher.submit(Alert('AAPL', 105.0, 5.0, 5.0, news='3. third', followup=True))
+    dispatcher.start()
+    dispatcher.stop()
+
+    [alert] = sink.alerts
+    assert alert.news == '1. first\n2. second\n3. third'
+    # 合并了尚未发出的首条警报，仍按首条警报输出（播放警报音）
+    assert not alert.followup
+    assert alert.collapsed == 2
+
+
+class SlowSink(RecordingSink):
+    name = 'slow'
+    slow = True
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def emit(self, alert):
+        self.release.wait(5)
+        super().emit(alert)
+
+
+def test_slow_sink_does_not_delay_fast_sinks():
+    fast, slow = RecordingSink(), SlowSink()
+    delivered = threading.Event()
+    dispatcher = AlertDispatcher([slow, fast], workers=1, on_delivered=lambda alert, ns: delivered.set())
+    dispatcher.start()
+    try:
+        dispatcher.submit(Alert('AAPL', 105.0, 5.0, 5.0))
+        assert delivered.wait(1)
+        assert [alert.symbol for alert in fast.alerts] == ['AAPL']
+        assert slow.alerts == []
+    finally:
+        slow.release.set()
+        dispatcher.stop()
+    assert [alert.symbol for alert in slow.alerts] == ['AAPL']
+
+
+def test_slow_lane_latency_is_recorded_separately():
+    fast, slow = RecordingSink(), SlowSink()
+    metrics = PipelineMetrics()
+    dispatcher = AlertDispatcher([slow, fast], workers=1, on_delivered=metrics.record_alert,
+                                 on_lane_delivered=metrics.record_lane)
+    dispatcher.start()
+    dispatcher.submit(Alert('AAPL', 105.0, 5.0, 5.0))
+    time.sleep(0.2)
+    slow.release.set()
+    dispatcher.stop()
+
+    # dispatch 只统计快速输出；慢速输出组的等待时间单独记录
+    assert metrics.stages['dispatch'].count == 1
+    assert metrics.stages['dispatch'].max < 100_000_000
+    assert metrics.lanes['main'].count == 1
+    assert metrics.lanes['slow-0'].max >= 200_000_000
+    lanes = dispatcher.stats()['lanes']
+    assert lanes['slow-0']['dispatch_latency']['max_ms'] >= 200
+    assert 'lane="slow-0"' in metrics.render_prometheus()
+
+
+class BlockingSink(RecordingSink):
+    """第一条警报阻塞到 release，之后的立即输出"""
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def emit(self, alert):
+        if not self.started.is_set():
+            self.started.set()
+            self.release.wait(5)
+        super().emit(alert)
+
+
+def test_alerts_for_one_symbol_are_delivered_in_order():
+    sink = BlockingSink()
+    dispatcher = AlertDispatcher([sink], workers=2)
+    dispatcher.start()
+    try:
+        dispatcher.submit(Alert('AAPL', 101.0, 1.0, 1.0))
+        assert sink.started.wait(1)
+        # 第一条仍在输出时，另一个线程不能先发出同一股票的新警报
+        dispatcher.submit(Alert('AAPL', 102.0, 2.0, 2.0))
+        dispatcher.submit(Alert('MSFT', 201.0, 1.0, 1.0))
+        deadline = time.monotonic() + 1
+        while not sink.alerts and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert [alert.symbol for alert in sink.alerts] == ['MSFT']
+    finally:
+        sink.release.set()
+        dispatcher.stop()
+    assert [(alert.symbol, alert.current_price) for alert in sink.alerts] == [
+        ('MSFT', 201.0), ('AAPL', 101.0), ('AAPL', 102.0)
+    ]
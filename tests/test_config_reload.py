@@ -0,0 +1,103 @@
+import copy
+
+import pytest
+
+import monitor as monitor_module
+from monitor import StockMonitor
+from tick_batch import SymbolUpdate
+
+
+def make_config():
+    return {
+        'stocks': [{'symbol': 'AAA', 'type': 'stock', 'alerts': {'price_change': 1.0, 'percentage_change': 1.0}}],
+        'settings': {'finnhub_api_key': 'test', 'sound_file': None, 'interval': 10},
+        'alert_dispatch': {'sinks': []},
+        'logging': {'level': 'WARNING'},
+        'news_alert': {'enabled': False},
+    }
+
+
+class StubConnections:
+    """代替 WebSocket 连接管理器，测试不连接 Finnhub"""
+
+    def subscribe(self, symbol):
+        pass
+
+    def unsubscribe(self, symbol):
+        pass
+
+
+def test_restart_required_sections_warn_once_per_change(monkeypatch):
+    warnings = []
+    monkeypatch.setattr(monitor_module.logger, 'warning', lambda message, *args: warnings.append(args))
+    monitor = StockMonitor(make_config())
+    monitor.ws_manager = StubConnections()
+    try:
+        changed = make_config()
+        changed['settings']['interval'] = 30
+        monitor.apply_config(copy.deepcopy(changed))
+        # 同一份文件再次加载（例如只修改了 stocks）不再重复提示
+        changed['stocks'][0]['alerts']['price_change'] = 2.0
+        monitor.apply_config(copy.deepcopy(changed))
+        monitor.apply_config(copy.deepcopy(changed))
+        assert warnings == [('settings',)]
+
+        changed['settings']['interval'] = 60
+        monitor.apply_config(copy.deepcopy(changed))
+        assert warnings == [('settings',), ('settings',)]
+
+        # 改回运行中的值不需要重启
+        monitor.apply_config(make_config())
+        assert len(warnings) == 2
+    finally:
+        monitor.alert_manager.close()
+
+
+def test_reload_keeps_prices_evaluated_while_compiling(monkeypatch):
+    config = make_config()
+    config['stocks'][0]['rules'] = [{'type': 'absolute', 'up': 50.0, 'down': -50.0}]
+    monitor = StockMonitor(copy.deepcopy(config))
+    monitor.ws_manager = StubConnections()
+    try:
+        monitor._process_updates([SymbolUpdate('AAA', 100.0)])
+        rebuild = monitor.rules.rebuild
+
+        def rebuild_then_process(*args, **kwargs):
+            engine = rebuild(*args, **kwargs)
+            # 编译新规则期间处理线程又评估了一批价格
+            with monitor._tables_lock:
+                monitor._process_updates([SymbolUpdate('AAA', 110.0)])
+            return engine
+
+        monkeypatch.setattr(monitor.rules, 'rebuild', rebuild_then_process)
+        config['stocks'][0]['alerts']['price_change'] = 2.0
+        config['stocks'][0]['rules'][0]['up'] = 40.0
+        monitor.apply_config(copy.deepcopy(config))
+
+        evaluator = monitor.evaluator
+        assert evaluator.last_prices[evaluator.symbol_ids['AAA']] == 110.0
+        assert monitor.rules.compiled['AAA'].previous == 110.0
+    finally:
+        monitor.alert_manager.close()
+
+
+def test_rejected_config_is_not_treated_as_loaded(monkeypatch):
+    warnings = []
+    monkeypatch.setattr(monitor_module.logger, 'warning', lambda message, *args: warnings.append(args))
+    monitor = StockMonitor(make_config())
+    monitor.ws_manager = StubConnections()
+    try:
+        changed = make_config()
+        changed['settings']['interval'] = 30
+        changed['stocks'][0]['rules'] = [{'type': 'unknown'}]
+        with pytest.raises(ValueError):
+            monitor.apply_config(copy.deepcopy(changed))
+        assert monitor.rules.compiled == {}
+
+        # 修正后的配置再次提示需要重启的修改
+        del changed['stocks'][0]['rules']
+        changed['stocks'][0]['alerts']['price_change'] = 2.0
+        monitor.apply_config(copy.deepcopy(changed))
+        assert warnings == [('settings',), ('settings',)]
+    finally:
+        monitor.alert_manager.close()
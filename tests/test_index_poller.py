@@ -0,0 +1,48 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from index_poller import IndexPoller
+
+
+class QuoteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps({'c': 100.0, 't': 1_700_000_000}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def quote_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), QuoteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_poll_shares_one_deadline_across_symbols(quote_server):
+    # 每秒一次调用：一轮 1.5 秒内最多拿到 2 个令牌
+    poller = IndexPoller('test', [f"IDX{i}" for i in range(8)], calls_per_minute=60,
+                         base_url=quote_server, max_workers=2)
+    try:
+        started = time.monotonic()
+        updates = poller.poll(deadline=1.5)
+        elapsed = time.monotonic() - started
+    finally:
+        poller.close()
+
+    # 排队较晚的请求不会再从自己开始时重新计时
+    assert elapsed < 2.0
+    assert len(updates) == 2
+    assert poller.skipped_rate_limited == 6
+    assert poller.errors == 0
@@ -0,0 +1,59 @@
+import pickle
+from datetime import datetime, timezone
+
+from indicators import VWAP
+from market_calendar import MarketCalendar
+from parallel import _ShardWorker
+from rules import RuleEngine
+from tick_batch import SymbolUpdate
+
+# 常规时段 12:00-13:00 (UTC) 的日历，与默认的纽约时段不同
+CALENDAR = {
+    'timezone': 'UTC',
+    'sessions': {'pre_market_open': '11:00', 'regular_open': '12:00',
+                 'regular_close': '13:00', 'post_market_close': '14:00'},
+}
+
+
+def at(day, hour, minute=0):
+    return int(datetime(2026, 3, day, hour, minute, tzinfo=timezone.utc).timestamp() * 1e9)
+
+
+def trade(price, volume=1.0):
+    return SymbolUpdate('AAA', price, volume)
+
+
+def test_session_vwap_follows_the_given_calendar():
+    vwap = VWAP(calendar=MarketCalendar(CALENDAR))
+    vwap.update(trade(100.0), None, at(2, 12, 10))
+    vwap.update(trade(110.0), 100.0, at(2, 13, 30))
+    assert vwap.value == 105.0
+    # 次日 12:00 开盘后重新累计（默认日历在这一时刻仍处于盘前）
+    vwap.update(trade(200.0), 110.0, at(3, 12, 5))
+    assert vwap.value == 200.0
+
+
+def test_replayed_ticks_do_not_move_the_shared_calendar_state():
+    calendar = MarketCalendar(CALENDAR)
+    calendar.session()
+    state, refreshes = calendar._state, calendar.refreshes
+    vwap = VWAP(calendar=calendar)
+    for day in (2, 3, 4):
+        vwap.update(trade(100.0), 100.0, at(day, 12, 30))
+    assert calendar._state == state
+    assert calendar.refreshes == refreshes
+
+
+def test_rules_and_workers_use_the_monitor_calendar():
+    calendar = MarketCalendar(CALENDAR)
+    rules = {'AAA': [{'type': 'vwap', 'threshold': 1.0}]}
+    engine = RuleEngine(rules, calendar)
+    assert engine.compiled['AAA'].indicators.get('vwap').calendar is calendar
+    rebuilt = engine.rebuild({'AAA': [{'type': 'vwap', 'threshold': 2.0}]})
+    assert rebuilt.compiled['AAA'].indicators.get('vwap').calendar is calendar
+
+    # 评估进程收到的是序列化后的同一份日历配置
+    worker = _ShardWorker(['AAA'], {'AAA': {'price_change': 1.0, 'percentage_change': 1.0}}, rules, [], None,
+                          pickle.loads(pickle.dumps(calendar)))
+    vwap = worker.rules.compiled['AAA'].indicators.get('vwap')
+    assert vwap.calendar.regular_open == calendar.regular_open
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from aiohttp import web
+
+from enrichment import NewsEnrichmentStage
+from news_searcher import NewsSearcher
+
+# 三篇新闻，按文章分段发送；每段之间的间隔模拟模型逐篇生成
+SEGMENTS = [
+    "Here is the news:\n\nTitle: \"Apple beats estimates\"\nSource: Reuters | Time: 2026-10-17 10:00\n"
+    "Summary: Revenue up 8%.\n\n",
+    "Title: \"Supplier expands\"\nSource: Bloomberg | Time: 2026-10-17 11:00\nSummary: Foxconn adds capacity.\n\n",
+    "Title: \"Analysts raise targets\"\nSource: WSJ | Time: 2026-10-17 12:00\nSummary: Three upgrades.\n",
+]
+GAP = 0.2
+MOVEMENT = {'current_price': 105.0, 'absolute_change': 5.0, 'percentage_change': 5.0}
+
+
+class SSEServer:
+    """本地 chat-completions 服务：/ok 完整发送三篇新闻，/fail 在第三篇中途断开连接"""
+
+    def __init__(self):
+        self.requests = 0
+        self.url = None
+        self._ready = threading.Event()
+        self._stopped = None
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+
+    async def _chunk(self, response, text):
+        payload = {'choices': [{'delta': {'content': text}}]}
+        await response.write(f"data: {json.dumps(payload)}\n\n".encode())
+
+    async def _handle(self, request):
+        self.requests += 1
+        body = await request.json()
+        if not body.get('stream'):
+            return web.json_response({'choices': [{'message': {'content': ''.join(SEGMENTS)}}]})
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        fail = request.path.endswith('/fail')
+        for i, segment in enumerate(SEGMENTS):
+            if i:
+                await asyncio.sleep(GAP)
+            for start in range(0, len(segment), 16):
+                if fail and i == 2 and start >= len(segment) // 2:
+                    request.transport.close()
+                    return response
+                await self._chunk(response, segment[start:start + 16])
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    def _run(self):
+        async def serve():
+            app = web.Application()
+            app.router.add_post('/{tail:.*}', self._handle)
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            site = web.TCPSite(runner, '127.0.0.1', 0)
+            await site.start()
+            self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+            self._stopped = asyncio.Event()
+            self._ready.set()
+            await self._stopped.wait()
+            await runner.cleanup()
+
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(serve())
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._stopped.set)
+
+
+@pytest.fixture
+def server():
+    server = SSEServer()
+    yield server
+    server.stop()
+
+
+def make_searcher(server, path='/ok'):
+    return NewsSearcher({'api_key': 'test', 'base_url': server.url + path, 'stream': True})
+
+
+async def collect(searcher, symbol):
+    started = time.perf_counter()
+    received = []
+    async for article in searcher.search_news_stream(symbol):
+        received.append((time.perf_counter() - started, article))
+    return received
+
+
+def test_stream_emits_each_article_as_it_arrives(server):
+    async def run():
+        searcher = make_searcher(server)
+        try:
+            streamed = await collect(searcher, 'AAPL')
+            searcher.cache.clear()
+            batch = await searcher.search_news('AAPL')
+        finally:
+            await searcher.close()
+        return streamed, batch
+
+    streamed, batch = asyncio.run(run())
+    times = [elapsed for elapsed, _ in streamed]
+    assert [article for _, article in streamed] == batch
+    assert [article['title'] for article in batch] == [
+        'Apple beats estimates', 'Supplier expands', 'Analysts raise targets'
+    ]
+    # 第一篇在第二段到达时即可发出，不等待整个回复（约 2 * GAP）
+    assert times[0] < 1.5 * GAP
+    assert times[1] - times[0] > 0.5 * GAP
+    assert times[-1] - times[0] > 1.5 * GAP
+
+
+def test_stream_shares_cache_and_inflight_requests(server):
+    async def run():
+        searcher = make_searcher(server)
+        try:
+            first, second, batch = await asyncio.gather(
+                collect(searcher, 'MSFT'), collect(searcher, 'MSFT'), searcher.search_news('MSFT')
+            )
+            requests_after_gather = server.requests
+            cached = await collect(searcher, 'MSFT')
+        finally:
+            await searcher.close()
+        return first, second, batch, requests_after_gather, cached
+
+    first, second, batch, requests_after_gather, cached = asyncio.run(run())
+    assert requests_after_gather == 1
+    assert server.requests == 1
+    assert [article for _, article in first] == [article for _, article in second] == batch
+    assert [article for _, article in cached] == batch
+    # 缓存命中时立即输出全部文章
+    assert cached[-1][0] < GAP / 2
+
+
+def test_stream_failing_partway_keeps_emitted_articles_uncached(server):
+    async def run():
+        searcher = make_searcher(server, '/fail')
+        try:
+            first = await collect(searcher, 'TSLA')
+            retry = await collect(searcher, 'TSLA')
+        finally:
+            await searcher.close()
+        return first, retry
+
+    first, retry = asyncio.run(run())
+    # 已经完整解析的文章照常发出，中断的第三篇被丢弃
+    assert [article['title'] for _, article in first] == ['Apple beats estimates', 'Supplier expands']
+    # 失败的响应不写入缓存，下一次触发重新请求
+    assert [article for _, article in retry] == [article for _, article in first]
+    assert server.requests == 2
+
+
+class RecordingAlertManager:
+    def __init__(self):
+        self.alerts = []
+        self.done = threading.Event()
+
+    def trigger_alert(self, symbol, current_price, price_change, percentage_change, news=None, followup=False):
+        self.alerts.append({'symbol': symbol, 'news': news, 'followup': followup})
+        if len(self.alerts) == len(SEGMENTS):
+            self.done.set()
+
+
+def test_enrichment_sends_one_alert_then_one_followup_per_article(server):
+    alert_manager = RecordingAlertManager()
+    stage = NewsEnrichmentStage(make_searcher(server), alert_manager)
+    stage.start()
+    try:
+        stage.submit('NVDA', MOVEMENT)
+        assert alert_manager.done.wait(5)
+    finally:
+        stage.stop()
+
+    first, *followups = alert_manager.alerts
+    assert not first['followup']
+    assert first['news'].startswith('[PRICE ALERT] NVDA')
+    assert 'Apple beats estimates' in first['news']
+    assert [alert['followup'] for alert in followups] == [True, True]
+    for alert, title in zip(followups, ('Supplier expands', 'Analysts raise targets')):
+        assert title in alert['news']
+        assert 'Apple beats estimates' not in alert['news']
+    assert stage.stats()['first_article']['count'] == 1
+
+
+def test_coalescing_with_stream_warns_that_streaming_is_off(monkeypatch):
+    import monitor as monitor_module
+    from news_coalescer import NewsCoalescer
+
+    warnings = []
+    monkeypatch.setattr(monitor_module.logger, 'warning', lambda message, *args: warnings.append(message))
+    config = {
+        'stocks': [{'symbol': 'AAA', 'type': 'stock', 'alerts': {'price_change': 1.0, 'percentage_change': 1.0}}],
+        'settings': {'finnhub_api_key': 'test', 'sound_file': None},
+        'alert_dispatch': {'sinks': []},
+        'logging': {'level': 'WARNING'},
+        'news_alert': {
+            'enabled': True,
+            'deepseek': {'api_key': 'test', 'stream': True},
+            'trigger_conditions': {
+                'time_window_minutes': 2,
+                'min_data_points': 3,
+                'price_movement': {'absolute': {'up': 1.0, 'down': -1.0}, 'percentage': {'up': 1.0, 'down': -1.0}},
+                'debounce': {'cool_down_minutes': 30},
+            },
+            'enrichment': {'coalesce_window_ms': 200},
+        },
+    }
+    monitor = monitor_module.StockMonitor(config)
+    try:
+        assert isinstance(monitor.enrichment, NewsCoalescer)
+        assert any('deepseek.stream' in message for message in warnings)
+    finally:
+        monitor.alert_manager.close()
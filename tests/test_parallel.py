@@ -0,0 +1,50 @@
+import queue
+import threading
+
+import numpy as np
+
+from parallel import CONTROL_POLL_CHUNKS, TICK_DTYPE, SharedRing, _worker_main, _TAIL
+
+
+def make_records(count, symbol_id=0):
+    records = np.zeros(count, dtype=TICK_DTYPE)
+    records['symbol_id'] = symbol_id
+    records['count'] = 1
+    records['price'] = 100.0
+    records['high'] = records['low'] = records['vwap'] = 100.0
+    return records
+
+
+def run_worker(ring, control, symbols):
+    thread = threading.Thread(target=_worker_main, args=(
+        ring.name, ring.lock, ring.capacity, symbols, {symbol: {'price_change': 1.0, 'percentage_change': 1.0} for symbol in symbols},
+        {}, [], None, None, control, queue.Queue(), 1
+    ), daemon=True)
+    thread.start()
+    thread.join(5)
+    return not thread.is_alive()
+
+
+def test_busy_worker_checks_control_messages():
+    ring = SharedRing(1024)
+    try:
+        ring.put(make_records(CONTROL_POLL_CHUNKS * 4))
+        control = queue.Queue()
+        control.put(('stop',))
+        assert run_worker(ring, control, ['AAA'])
+        # 一直有积压的tick时，最多处理 CONTROL_POLL_CHUNKS 批后就会看到停止消息
+        assert ring.counter(_TAIL) == CONTROL_POLL_CHUNKS
+    finally:
+        ring.close()
+
+
+def test_stop_while_waiting_for_unknown_symbol():
+    ring = SharedRing(16)
+    try:
+        ring.put(make_records(1, symbol_id=1))
+        control = queue.Queue()
+        control.put(('stop',))
+        assert run_worker(ring, control, ['AAA'])
+        assert ring.counter(_TAIL) == 0
+    finally:
+        ring.close()
@@ -0,0 +1,62 @@
+import json
+import os
+import subprocess
+import sys
+
+import yaml
+
+from conftest import SRC_DIR
+
+
+def write_recording(path):
+    # 两只股票交替大幅涨跌，每帧都会触发警报（alerts 分类记录 INFO 日志）
+    with open(path, 'w') as f:
+        for i in range(20):
+            price = 100.0 if i % 2 else 110.0
+            trades = [{'p': price, 's': symbol, 't': 1_700_000_000_000 + i, 'v': 1} for symbol in ('AAA', 'BBB')]
+            f.write(json.dumps({'type': 'trade', 'data': trades}) + "\n")
+
+
+def test_json_report_is_not_mixed_with_logs(tmp_path):
+    recording = tmp_path / 'recording.jsonl'
+    write_recording(recording)
+    config = tmp_path / 'config.yaml'
+    config.write_text(yaml.safe_dump({
+        'stocks': [{'symbol': symbol, 'type': 'stock', 'alerts': {'price_change': 1.0, 'percentage_change': 1.0}}
+                   for symbol in ('AAA', 'BBB')],
+        'settings': {'finnhub_api_key': 'test', 'sound_file': None},
+        'logging': {'level': 'INFO', 'categories': {'alerts': 'INFO'}},
+        'news_alert': {'enabled': False},
+    }))
+
+    result = subprocess.run(
+        [sys.executable, os.path.join(SRC_DIR, 'replay.py'), str(recording), '--config', str(config), '--json'],
+        capture_output=True, text=True, timeout=60, check=True
+    )
+    [report] = json.loads(result.stdout)
+    assert report['ticks'] == 40
+    assert report['alerts_triggered'] > 0
+    assert '触发警报' in result.stderr
+
+
+def test_tick_file_frames_survive_chunked_reads(tmp_path):
+    from tick_format import RECORD_SIZE, read_tick_file, write_tick_file
+
+    frames = [
+        {'type': 'trade', 'data': [{'s': f"S{(i + j) % 3}", 'p': 100.0 + i, 't': 1_700_000_000_000 + i, 'v': float(j)}
+                                   for j in range(1 + i % 4)]}
+        for i in range(10)
+    ]
+    path = str(tmp_path / 'ticks.bin')
+    write_tick_file(path, [{'type': 'ping'}] + frames)
+
+    # 每块3条记录，帧跨越块边界时仍然完整
+    assert [frame for _, frame in read_tick_file(path, chunk_records=3)] == frames
+    assert [ts for ts, _ in read_tick_file(path)] == [frame['data'][-1]['t'] * 1_000_000 for frame in frames]
+
+    # 文件尾部被截断时只读取完整的记录
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - RECORD_SIZE // 2)
+    *complete, partial = [frame for _, frame in read_tick_file(path, chunk_records=3)]
+    assert complete == frames[:-1]
+    assert partial['data'] == frames[-1]['data'][:-1]
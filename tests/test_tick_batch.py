@@ -0,0 +1,19 @@
+from tick_batch import TickBatch
+
+
+def test_from_trades_folds_each_symbol_into_one_update():
+    batch = TickBatch.from_trades([
+        {'s': 'AAPL', 'p': 100.0, 'v': 10, 't': 1},
+        {'s': 'MSFT', 'p': 300.0, 'v': 0, 't': 2},
+        {'s': 'AAPL', 'p': 102.0, 'v': 30, 't': 3},
+        {'s': 'MSFT', 'p': 310.0, 't': None},
+        {'s': 'AAPL', 'p': 99.0, 'v': 10, 't': 4},
+    ], received_ns=5)
+
+    aapl, msft = batch.updates
+    assert batch.received_ns == 5
+    assert (aapl.symbol, aapl.price, aapl.volume, aapl.count) == ('AAPL', 99.0, 50.0, 3)
+    assert (aapl.high, aapl.low, aapl.timestamp) == (102.0, 99.0, 4)
+    assert aapl.vwap == (100.0 * 10 + 102.0 * 30 + 99.0 * 10) / 50
+    # 没有成交量时 VWAP 为简单平均价；没有时间戳的成交不覆盖已有时间戳
+    assert (msft.price, msft.vwap, msft.count, msft.timestamp) == (310.0, 305.0, 2, 2)
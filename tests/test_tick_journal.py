@@ -0,0 +1,78 @@
+import threading
+
+from tick_format import FLAG_FRAME_END, read_tick_file
+from tick_journal import TickJournal, list_segments, load_journal_symbols, open_segment
+
+
+def make_trades(start, count=2):
+    return [
+        {'s': f"SYM{i}", 'p': 100.0 + i, 'v': 10.0, 't': 1_700_000_000_000 + i}
+        for i in range(start, start + count)
+    ]
+
+
+def test_rotation_mid_batch_keeps_every_record(tmp_path):
+    journal = TickJournal(str(tmp_path), segment_records=5, flush_interval=60)
+    for start in (0, 2, 4):
+        journal.append_trades(make_trades(start))
+    journal.close()
+
+    segments = [open_segment(path) for path in list_segments(str(tmp_path))]
+    assert [len(segment) for segment in segments] == [5, 1]
+
+    symbols = load_journal_symbols(str(tmp_path))
+    records = [record for segment in segments for record in segment]
+    assert [symbols[record['symbol_id']] for record in records] == [f"SYM{i}" for i in range(6)]
+    assert [record['price'] for record in records] == [100.0 + i for i in range(6)]
+
+
+def test_journal_keeps_every_trade_of_a_frame(tmp_path):
+    # 同一帧内同一股票的多笔成交不合并，回放得到原始的帧
+    frame = [
+        {'s': 'AAA', 'p': 100.0, 'v': 1.0, 't': 1_700_000_000_000},
+        {'s': 'AAA', 'p': 95.0, 'v': 2.0, 't': 1_700_000_000_001},
+        {'s': 'BBB', 'p': 50.0, 'v': 3.0, 't': 1_700_000_000_002},
+        {'s': 'AAA', 'p': 101.0, 'v': 4.0, 't': 1_700_000_000_003},
+    ]
+    journal = TickJournal(str(tmp_path), flush_interval=60)
+    journal.append_trades(frame)
+    journal.append_trades(frame[:1])
+    journal.close()
+
+    [path] = list_segments(str(tmp_path))
+    segment = open_segment(path)
+    assert [int(flags) for flags in segment['flags']] == [0, 0, 0, FLAG_FRAME_END, FLAG_FRAME_END]
+    frames = [frame_data['data'] for _, frame_data in read_tick_file(path)]
+    assert frames == [frame, frame[:1]]
+
+
+def test_flush_does_not_block_appends(tmp_path, monkeypatch):
+    journal = TickJournal(str(tmp_path), flush_interval=60)
+    journal.append_trades(make_trades(0))
+    writing = threading.Event()
+    release = threading.Event()
+    write_symbols = journal._write_symbols
+
+    def slow_write_symbols(symbols):
+        writing.set()
+        release.wait(5)
+        write_symbols(symbols)
+
+    monkeypatch.setattr(journal, '_write_symbols', slow_write_symbols)
+    flusher = threading.Thread(target=journal.flush)
+    flusher.start()
+    try:
+        assert writing.wait(1)
+        # 刷盘进行中仍可追加记录
+        appended = threading.Thread(target=journal.append_trades, args=(make_trades(2),))
+        appended.start()
+        appended.join(1)
+        assert not appended.is_alive()
+    finally:
+        release.set()
+        flusher.join()
+    monkeypatch.undo()
+    journal.close()
+
+    assert load_journal_symbols(str(tmp_path)) == [f"SYM{i}" for i in range(4)]
+    assert sum(len(open_segment(path)) for path in list_segments(str(tmp_path))) == 4